@@ -1,18 +1,13 @@
 import networkx as nx
 import matplotlib.pyplot as plt
-import csv
 import os
+import sys
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
 
-def open_csv(path):
-    try:
-        with open(path, "rb") as f:
-            data = f.read()
-            return data.decode("cp1252").splitlines()
-    except Exception as e:
-        raise RuntimeError(f"Failed to open {path}: {e}")
+sys.path.insert(0, DATA_DIR)
+from graph_snapshot import load_snapshot
 
 
 def load_graph(dataset):
@@ -22,11 +17,13 @@ def load_graph(dataset):
     if not os.path.isfile(edges_path):
         raise FileNotFoundError(f"Couldn't find edges.csv in '{folder}'")
 
-    G = nx.DiGraph()
-    edge_reader = csv.DictReader(open_csv(edges_path))
+    # Reads the binary snapshot of the CSV (built on first use, rebuilt when the CSV changes)
+    snapshot = load_snapshot(edges_path)
+    titles = snapshot.titles.tolist()
+    sources, targets = snapshot.edge_arrays()
 
-    for row in edge_reader:
-        G.add_edge(row["Source"], row["Target"])
+    G = nx.DiGraph()
+    G.add_edges_from(zip(map(titles.__getitem__, sources.tolist()), map(titles.__getitem__, targets.tolist())))
 
     return G
 
@@ -0,0 +1,69 @@
+# Dequeue latency vs queue size for BFS and priority-queue mode, with and without the queue_priority index
+# Usage: python benchmarks/bench_dequeue.py [max_queue_size]
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
+sys.path.insert(0, DATA_DIR)
+
+from sqlite_interface import GraphInterface
+
+
+def fill_queue(g: GraphInterface, size: int, seed: int = 0):
+    rng = random.Random(seed)
+    with g.conn:
+        g.cursor.executemany(
+            "INSERT INTO queue (url, priority_rank) VALUES (?, ?)",
+            ((f"https://en.wikipedia.org/wiki/Page_{i}", rng.random()) for i in range(size)),
+        )
+
+
+def time_dequeues(g: GraphInterface, priority_queue_mode: bool, count: int) -> float:
+    # Mean seconds per dequeue_and_mark_visited (its per-call print is swallowed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(count):
+            g.dequeue_and_mark_visited(priority_queue_mode=priority_queue_mode)
+        return (time.perf_counter() - start) / count
+
+
+def bench_dequeue(sizes: list[int], dequeues: int = 200) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            for indexed in (True, False):
+                db_path = os.path.join(tmp, f"queue_{size}_{indexed}.db")
+                g = GraphInterface(db_path)
+                g.create_tables()
+                if not indexed:
+                    g.cursor.execute("DROP INDEX queue_priority")
+                fill_queue(g, size)
+
+                results.append({
+                    "queue_size": size,
+                    "indexed": indexed,
+                    "bfs_ms": time_dequeues(g, False, dequeues) * 1000,
+                    "priority_ms": time_dequeues(g, True, dequeues) * 1000,
+                })
+                g.close_conn()
+    return results
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sizes = [size for size in (1_000, 10_000, 100_000, 1_000_000) if size <= max_size]
+
+    print(f"{'queue size':>10} {'index':>6} {'BFS ms':>8} {'priority ms':>12}")
+    for r in bench_dequeue(sizes):
+        print(f"{r['queue_size']:>10} {str(r['indexed']):>6} {r['bfs_ms']:>8.3f} {r['priority_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Parse throughput of the link/category extractor backends over the saved HTML fixtures
+# Usage: python benchmarks/bench_extract.py [repeats]
+
+import glob
+import gzip
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
+sys.path.insert(0, DATA_DIR)
+
+from wiki_interface import EXTRACTORS
+
+
+def load_fixtures():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(DATA_DIR, "fixtures", "html", "*.html.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            pages[os.path.basename(path).split(".")[0]] = f.read()
+    return pages
+
+
+def bench_extractors(pages: dict[str, str], repeats: int = 5) -> dict:
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages.values())
+    results = {}
+
+    for name, extractor in EXTRACTORS.items():
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for title, html in pages.items():
+                extractor(html, "https://en.wikipedia.org/wiki/" + title)
+            best = min(best, time.perf_counter() - start)
+
+        results[name] = {
+            "seconds_per_page": best / len(pages),
+            "pages_per_second": len(pages) / best,
+            "mb_per_second": total_bytes / best / 1e6,
+        }
+    return results
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    pages = load_fixtures()
+    print(f"{len(pages)} fixtures, {sum(len(h) for h in pages.values()) / 1e6:.1f} MB of HTML, best of {repeats}\n")
+
+    results = bench_extractors(pages, repeats)
+    baseline = results["soup"]["seconds_per_page"]
+    for name, r in results.items():
+        print(
+            f"{name:>8}: {r['seconds_per_page'] * 1000:7.1f} ms/page  {r['pages_per_second']:6.1f} pages/s  "
+            f"{r['mb_per_second']:5.1f} MB/s  ({baseline / r['seconds_per_page']:.1f}x vs soup)"
+        )
+
+
+if __name__ == "__main__":
+    main()
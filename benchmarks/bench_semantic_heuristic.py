@@ -0,0 +1,114 @@
+# Embedding-guided search vs plain search: nodes expanded, time per query and path length for heap
+# Dijkstra, admissible semantic A* (a few scales), greedy best-first and BFS over the CSR snapshot,
+# plus the one-off cost of embedding every title. Needs torch/transformers for titles not yet cached.
+# Usage: python benchmarks/bench_semantic_heuristic.py [pairs] [dataset ...]
+
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
+sys.path.insert(0, DATA_DIR)
+
+import numpy as np
+
+from graph_snapshot import load_snapshot
+from semantic_heuristic import (
+    TitleEmbeddings, build_title_embeddings, embeddings_path, greedy_path, semantic_heuristic,
+)
+from shortest_path import bfs_path, shortest_path
+
+DEFAULT_DATASETS = ["Harry_Potter", "Taylor_Swift"]
+SCALES = [1.0, 4.0, 16.0]
+
+
+def sample_pairs(graph, count: int, seed: int = 0) -> list[tuple[str, str]]:
+    # Sources that have out-links, targets anywhere in the graph
+    rng = random.Random(seed)
+    sources = np.flatnonzero(graph.out_degrees() > 0).tolist()
+    return [(graph.titles[rng.choice(sources)], graph.titles[rng.randrange(graph.num_nodes)]) for _ in range(count)]
+
+
+def run_engine(queries, search, optimal) -> dict:
+    stats = {}
+    expanded = 0
+    hops = []
+    start = time.perf_counter()
+    for (u, v), best in zip(queries, optimal):
+        distance, _ = search(u, v, stats)
+        expanded += stats["expanded"]
+        if best != float("inf"):
+            hops.append(distance)
+    elapsed = time.perf_counter() - start
+
+    reachable = [best for best in optimal if best != float("inf")]
+    return {
+        "ms_per_query": elapsed / len(queries) * 1000,
+        "expanded_per_query": expanded / len(queries),
+        "mean_hops": sum(hops) / len(hops) if hops else 0.0,
+        "optimal_share": sum(1 for a, b in zip(hops, reachable) if a == b) / len(hops) if hops else 1.0,
+    }
+
+
+def bench_dataset(dataset: str, pairs: int) -> dict:
+    csv_path = os.path.join(DATA_DIR, dataset, "WikiGraph_edges.csv")
+    graph = load_snapshot(csv_path)
+
+    # One-off model cost: only titles missing from the shared embedding cache go through the model
+    start = time.perf_counter()
+    counts = {"titles": graph.num_nodes, "cached": graph.num_nodes, "embedded": 0}
+    if not os.path.exists(embeddings_path(graph)):
+        counts = build_title_embeddings(graph)
+    build_time = time.perf_counter() - start
+    embeddings = TitleEmbeddings(graph, np.load(embeddings_path(graph), mmap_mode="r"))
+
+    queries = sample_pairs(graph, pairs)
+    optimal = [bfs_path(graph, u, v)[0] for u, v in queries]
+
+    engines = {
+        "dijkstra": lambda u, v, stats: shortest_path(graph, u, v, stats=stats),
+    }
+    for scale in SCALES:
+        engines[f"A* scale {scale:g}"] = lambda u, v, stats, scale=scale: shortest_path(
+            graph, u, v, heuristic=semantic_heuristic(embeddings, v, scale=scale), stats=stats
+        )
+    engines["greedy"] = lambda u, v, stats: greedy_path(graph, embeddings, u, v, stats)
+    engines["bfs (CSR)"] = lambda u, v, stats: bfs_path(graph, u, v, stats)
+
+    return {
+        "dataset": dataset,
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "pairs": pairs,
+        "reachable": sum(1 for best in optimal if best != float("inf")),
+        "embed_s": build_time,
+        "embedded": counts["embedded"],
+        "cached": counts["cached"],
+        "engines": {name: run_engine(queries, search, optimal) for name, search in engines.items()},
+    }
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    datasets = sys.argv[2:] or DEFAULT_DATASETS
+
+    for dataset in datasets:
+        r = bench_dataset(dataset, pairs)
+        print(f"{r['dataset']}: {r['nodes']} nodes, {r['edges']} edges, {r['reachable']}/{r['pairs']} pairs reachable")
+        print(
+            f"  embeddings {r['embed_s']:8.1f} s   ({r['cached']} titles from the cache, "
+            f"{r['embedded']} through the model)"
+        )
+        base = r["engines"]["dijkstra"]
+        for name, e in r["engines"].items():
+            print(
+                f"  {name:>14} {e['ms_per_query']:8.2f} ms  {e['expanded_per_query']:9.1f} nodes expanded"
+                f"  ({base['expanded_per_query'] / max(e['expanded_per_query'], 1e-9):5.1f}x fewer)"
+                f"   mean hops {e['mean_hops']:.2f}, optimal {e['optimal_share']:.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
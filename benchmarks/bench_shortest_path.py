@@ -0,0 +1,101 @@
+# Point-to-point query time: heap Dijkstra over the old dict-of-tuples graph vs forward and bidirectional
+# BFS over the CSR snapshot, with nodes expanded per query
+# Usage: python benchmarks/bench_shortest_path.py [pairs] [dataset ...]
+
+import csv
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
+sys.path.insert(0, DATA_DIR)
+
+from graph_snapshot import load_snapshot
+from shortest_path import bfs_path, bidirectional_bfs_path, shortest_path
+
+DEFAULT_DATASETS = ["Harry_Potter", "Taylor_Swift"]
+
+
+def read_edge_list_dict(csv_file):
+    # The previous read_edge_list: one (neighbor, 1.0) tuple per CSV row
+    graph = {}
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            graph.setdefault(row["Source"], []).append((row["Target"], 1.0))
+    return graph
+
+
+def sample_pairs(graph: dict, count: int, seed: int = 0) -> list[tuple[str, str]]:
+    # Sources that have out-links, targets anywhere in the graph
+    rng = random.Random(seed)
+    sources = sorted(graph)
+    targets = sorted({v for edges in graph.values() for v, _ in edges} | set(sources))
+    return [(rng.choice(sources), rng.choice(targets)) for _ in range(count)]
+
+
+def bench_dataset(dataset: str, pairs: int) -> dict:
+    csv_path = os.path.join(DATA_DIR, dataset, "WikiGraph_edges.csv")
+
+    start = time.perf_counter()
+    graph = read_edge_list_dict(csv_path)
+    dict_load = time.perf_counter() - start
+
+    load_snapshot(csv_path)  # build once if missing
+    start = time.perf_counter()
+    snapshot = load_snapshot(csv_path)
+    snapshot_load = time.perf_counter() - start
+
+    queries = sample_pairs(graph, pairs)
+
+    start = time.perf_counter()
+    expected = [shortest_path(graph, u, v) for u, v in queries]
+    dijkstra_time = time.perf_counter() - start
+
+    engines = {}
+    for name, engine in (("bfs", bfs_path), ("bidirectional", bidirectional_bfs_path)):
+        expanded = 0
+        stats = {}
+        start = time.perf_counter()
+        found = []
+        for u, v in queries:
+            found.append(engine(snapshot, u, v, stats))
+            expanded += stats["expanded"]
+        engines[name] = {
+            "ms_per_query": (time.perf_counter() - start) / pairs * 1000,
+            "expanded_per_query": expanded / pairs,
+            "same_paths": found == expected,
+        }
+
+    return {
+        "dataset": dataset,
+        "nodes": snapshot.num_nodes,
+        "edges": snapshot.num_edges,
+        "pairs": pairs,
+        "reachable": sum(1 for _, path in expected if path),
+        "dict_load_ms": dict_load * 1000,
+        "snapshot_load_ms": snapshot_load * 1000,
+        "dijkstra_ms_per_query": dijkstra_time / pairs * 1000,
+        "engines": engines,
+    }
+
+
+def main():
+    pairs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    datasets = sys.argv[2:] or DEFAULT_DATASETS
+
+    for dataset in datasets:
+        r = bench_dataset(dataset, pairs)
+        print(f"{r['dataset']}: {r['nodes']} nodes, {r['edges']} edges, {r['reachable']}/{r['pairs']} pairs reachable")
+        print(f"  load   CSV -> dict {r['dict_load_ms']:8.1f} ms   snapshot {r['snapshot_load_ms']:8.2f} ms")
+        print(f"  query  {'Dijkstra':>13} {r['dijkstra_ms_per_query']:8.2f} ms")
+        for name, e in r["engines"].items():
+            print(
+                f"         {name:>13} {e['ms_per_query']:8.2f} ms  {e['expanded_per_query']:9.1f} nodes expanded"
+                f"   ({r['dijkstra_ms_per_query'] / e['ms_per_query']:.1f}x, same paths: {e['same_paths']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
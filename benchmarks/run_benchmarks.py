@@ -0,0 +1,319 @@
+# Benchmark suite over the bundled datasets and synthetic power-law graphs, saved as JSON so runs
+# can be compared against each other:
+#   shortest_path    CSR snapshot build (cold read_edge_list) and load (warm), bidirectional BFS and
+#                    Dijkstra query times over random page pairs
+#   graph_interface  replaying the graph into a fresh WikiGraph.db (record_page throughput), dequeue
+#                    latency on the resulting queue and export_to_csv, for both database schemas
+#   load_graph       networkx_analysis.load_graph (skipped when networkx / matplotlib are missing)
+#   extract          link extraction backends over the HTML fixtures (see bench_extract.py)
+# Usage: python benchmarks/run_benchmarks.py [--scales 1e5 1e6 1e7] [--compare benchmarks/results/<old>.json]
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "src", "data"))
+ANALYSIS_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "analysis"))
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "results")
+sys.path.insert(0, DATA_DIR)
+
+import numpy as np
+
+from graph_snapshot import load_snapshot
+from shortest_path import bidirectional_bfs_path, read_edge_list, shortest_path
+from sqlite_interface import GraphInterface, InternedGraphInterface
+from synthetic_graph import synthetic_dataset
+
+DEFAULT_DATASETS = ["Harry_Potter", "Taylor_Swift"]
+DEFAULT_SCALES = ["1e5", "1e6"]
+SUITES = ("shortest_path", "graph_interface", "load_graph", "extract")
+SCHEMAS = {"legacy": GraphInterface, "interned": InternedGraphInterface}
+
+WIKI_URL = "https://en.wikipedia.org/wiki/"
+
+# A metric slower / lower by more than this against the compared run is reported as a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def sample_pairs(snapshot, count: int, seed: int = 0) -> list[tuple[str, str]]:
+    # Random (start, goal) titles with an outlink and an inlink respectively, so most pairs are connected
+    rng = random.Random(seed)
+    starts = np.flatnonzero(snapshot.out_degrees()).tolist()
+    goals = np.flatnonzero(snapshot.in_degrees()).tolist()
+    return [(snapshot.titles[rng.choice(starts)], snapshot.titles[rng.choice(goals)]) for _ in range(count)]
+
+
+def bench_shortest_path(edges_csv: str, pairs: int, dijkstra_pairs: int) -> dict:
+    _, build_s = _timed(load_snapshot, edges_csv, rebuild=True)
+    graph, load_s = _timed(read_edge_list, edges_csv)
+    queries = sample_pairs(graph, pairs)
+
+    bfs_times, reachable = [], 0
+    for start, goal in queries:
+        (distance, _), seconds = _timed(bidirectional_bfs_path, graph, start, goal)
+        bfs_times.append(seconds)
+        reachable += distance != float("inf")
+
+    dijkstra_times = [_timed(shortest_path, graph, start, goal)[1] for start, goal in queries[:dijkstra_pairs]]
+
+    bfs_times.sort()
+    return {
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "build_s": build_s,
+        "load_s": load_s,
+        "pairs": len(queries),
+        "reachable": reachable,
+        "bfs_ms": sum(bfs_times) / len(bfs_times) * 1000 if bfs_times else 0.0,
+        "bfs_p90_ms": bfs_times[int(0.9 * len(bfs_times))] * 1000 if bfs_times else 0.0,
+        "dijkstra_pairs": len(dijkstra_times),
+        "dijkstra_ms": sum(dijkstra_times) / len(dijkstra_times) * 1000 if dijkstra_times else 0.0,
+    }
+
+
+def replay_graph(g: GraphInterface, snapshot, max_edges: int = None) -> tuple[int, int]:
+    # Record every page with outlinks the way a crawl does: node, edges, and a queue entry per outlink.
+    # Returns (pages, edges) recorded.
+    titles = snapshot.titles.tolist()
+    offsets, targets = snapshot.offsets, snapshot.targets
+    pages = edges = 0
+    for node in np.flatnonzero(snapshot.out_degrees()).tolist():
+        children = [titles[child] for child in targets[offsets[node]:offsets[node + 1]].tolist()]
+        g.record_page(titles[node], set(), children, {WIKI_URL + child: 0.0 for child in children})
+        pages += 1
+        edges += len(children)
+        if max_edges is not None and edges >= max_edges:
+            break
+    return pages, edges
+
+
+def time_dequeues(g: GraphInterface, priority_queue_mode: bool, count: int) -> float:
+    # Mean seconds per dequeue_and_mark_visited (its per-call print is swallowed)
+    count = min(count, g.get_queue_size())
+    if not count:
+        return 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(count):
+            g.dequeue_and_mark_visited(priority_queue_mode=priority_queue_mode)
+        return (time.perf_counter() - start) / count
+
+
+def bench_graph_interface(edges_csv: str, dequeues: int, max_edges: int = None) -> dict:
+    snapshot = load_snapshot(edges_csv)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for schema, cls in SCHEMAS.items():
+            db_path = os.path.join(tmp, f"{schema}.db")
+            g = cls(db_path)
+            g.create_tables()
+
+            (pages, edges), insert_s = _timed(replay_graph, g, snapshot, max_edges)
+            queued = g.get_queue_size()
+            dequeue_bfs_s = time_dequeues(g, False, dequeues)
+            dequeue_priority_s = time_dequeues(g, True, dequeues)
+            _, export_s = _timed(g.export_to_csv)
+            g.close_conn()
+
+            results[schema] = {
+                "pages": pages,
+                "edges": edges,
+                "queued": queued,
+                "insert_s": insert_s,
+                "insert_pages_per_s": pages / insert_s if insert_s else 0.0,
+                "insert_edges_per_s": edges / insert_s if insert_s else 0.0,
+                "dequeue_bfs_us": dequeue_bfs_s * 1e6,
+                "dequeue_priority_us": dequeue_priority_s * 1e6,
+                "export_s": export_s,
+                "export_edges_per_s": edges / export_s if export_s else 0.0,
+                "db_bytes": os.path.getsize(db_path),
+            }
+    return results
+
+
+def bench_load_graph(folder: str) -> dict:
+    # networkx_analysis imports networkx and matplotlib at module level
+    sys.path.insert(0, ANALYSIS_DIR)
+    try:
+        from networkx_analysis import load_graph
+    except ImportError as e:
+        return {"skipped": str(e)}
+    finally:
+        sys.path.remove(ANALYSIS_DIR)
+
+    # load_graph joins its argument onto DATA_DIR, so an absolute folder works for synthetic graphs too
+    G, load_s = _timed(load_graph, os.path.abspath(folder))
+    return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges(), "load_s": load_s}
+
+
+def bench_extract(repeats: int) -> dict:
+    from bench_extract import bench_extractors, load_fixtures
+
+    pages = load_fixtures()
+    if not pages:
+        return {"skipped": "no HTML fixtures"}
+    return bench_extractors(pages, repeats)
+
+
+def run_graph(folder: str, args) -> dict:
+    edges_csv = os.path.join(folder, "WikiGraph_edges.csv")
+    results = {}
+    if "shortest_path" in args.suites:
+        results["shortest_path"] = bench_shortest_path(edges_csv, args.pairs, args.dijkstra_pairs)
+    if "graph_interface" in args.suites:
+        results["graph_interface"] = bench_graph_interface(edges_csv, args.dequeues, args.db_edges)
+    if "load_graph" in args.suites:
+        results["load_graph"] = bench_load_graph(folder)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "graphs": {},
+    }
+
+    graphs = [(dataset, os.path.join(DATA_DIR, dataset)) for dataset in args.datasets]
+    for scale in args.scales:
+        num_edges = int(float(scale))
+        folder, generate_s = _timed(synthetic_dataset, num_edges)
+        print(f"Synthetic graph with {num_edges} edges ready in {generate_s:.1f} s")
+        graphs.append((f"powerlaw_{num_edges}", folder))
+
+    for name, folder in graphs:
+        print(f"Benchmarking {name}...")
+        results["graphs"][name] = run_graph(folder, args)
+        print_graph(name, results["graphs"][name])
+
+    if "extract" in args.suites:
+        results["extract"] = bench_extract(args.repeats)
+        for name, r in results["extract"].items():
+            print(f"  extract {name}: {r['seconds_per_page'] * 1000:.1f} ms/page, {r['mb_per_second']:.1f} MB/s" if isinstance(r, dict) else f"  extract: {r}")
+    return results
+
+
+def print_graph(name: str, results: dict):
+    sp = results.get("shortest_path")
+    if sp:
+        print(
+            f"  {sp['nodes']} nodes, {sp['edges']} edges: snapshot build {sp['build_s']:.2f} s, load {sp['load_s'] * 1000:.1f} ms, "
+            f"bidirectional BFS {sp['bfs_ms']:.2f} ms (p90 {sp['bfs_p90_ms']:.2f}), Dijkstra {sp['dijkstra_ms']:.1f} ms"
+        )
+    for schema, r in results.get("graph_interface", {}).items():
+        print(
+            f"  {schema:>8} db: {r['insert_pages_per_s']:.0f} pages/s ({r['insert_edges_per_s']:.0f} edges/s), "
+            f"dequeue {r['dequeue_bfs_us']:.0f} us BFS / {r['dequeue_priority_us']:.0f} us priority, "
+            f"export {r['export_s']:.2f} s, {r['db_bytes'] / 1e6:.1f} MB"
+        )
+    if "load_graph" in results:
+        r = results["load_graph"]
+        print(f"  load_graph: {r['skipped']!r} (skipped)" if "skipped" in r else f"  load_graph: {r['load_s']:.2f} s")
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def lower_is_better(metric: str):
+    # True for times, False for throughputs, None for counts (not compared)
+    name = metric.rsplit(".", 1)[-1]
+    if "per_s" in name:
+        return False
+    if name.endswith(("_s", "_ms", "_us")) or name.startswith("seconds"):
+        return True
+    return None
+
+
+def compare(old: dict, new: dict) -> list[tuple[str, float, float, float]]:
+    # (metric, old, new, change) for every timing / throughput in both runs; change > 0 is worse
+    old_flat, new_flat = flatten(old.get("graphs", {}), "graphs."), flatten(new.get("graphs", {}), "graphs.")
+    old_flat.update(flatten(old.get("extract", {}), "extract."))
+    new_flat.update(flatten(new.get("extract", {}), "extract."))
+
+    rows = []
+    for metric, new_value in new_flat.items():
+        direction = lower_is_better(metric)
+        old_value = old_flat.get(metric)
+        if direction is None or not old_value or not new_value:
+            continue
+        change = new_value / old_value - 1 if direction else old_value / new_value - 1
+        rows.append((metric, old_value, new_value, change))
+    return rows
+
+
+def print_comparison(rows, threshold: float = REGRESSION_THRESHOLD):
+    print(f"\n{'metric':<60} {'old':>12} {'new':>12} {'worse by':>9}")
+    for metric, old_value, new_value, change in rows:
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{metric:<60} {old_value:12.4g} {new_value:12.4g} {change:+9.1%}{flag}")
+    regressions = sum(change > threshold for *_, change in rows)
+    print(f"\n{regressions} of {len(rows)} metrics more than {threshold:.0%} worse")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite; results are saved as JSON for comparing runs")
+    parser.add_argument("--datasets", nargs="*", default=DEFAULT_DATASETS, help="crawled dataset folders under src/data")
+    parser.add_argument("--scales", nargs="*", default=DEFAULT_SCALES, help="synthetic graph sizes in edges, e.g. 1e6 1e7")
+    parser.add_argument("--suites", nargs="*", default=list(SUITES), choices=SUITES)
+    parser.add_argument("--pairs", type=int, default=50, help="shortest path queries per graph")
+    parser.add_argument("--dijkstra-pairs", type=int, default=5, help="of those, how many also run Dijkstra")
+    parser.add_argument("--dequeues", type=int, default=1000, help="dequeues timed per queue mode")
+    parser.add_argument("--db-edges", type=lambda s: int(float(s)), default=None, help="replay at most this many edges into the databases")
+    parser.add_argument("--repeats", type=int, default=3, help="extraction repeats (best of)")
+    parser.add_argument("--output", help="results JSON (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(compare(json.load(f), results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Synthetic link graphs with Wikipedia-like heavy-tailed degrees, for benchmarking past the size of the
+# crawled datasets. Writes a WikiGraph_edges.csv (Source,Target, titles Node_<i>) that everything
+# reading crawl output (read_edge_list, load_snapshot, networkx_analysis.load_graph) accepts.
+# Usage: python benchmarks/synthetic_graph.py <edges> [output folder] [avg degree] [exponent]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNTHETIC_DIR = os.path.join(SCRIPT_DIR, "synthetic")
+
+AVG_DEGREE = 20
+# In- and out-degree tail exponent, P(k) ~ k^-exponent; Wikipedia's in-degrees are around 2.1
+EXPONENT = 2.1
+
+# Edges written to the CSV per chunk
+_WRITE_CHUNK = 1_000_000
+
+
+def power_law_edges(
+    num_edges: int, avg_degree: int = AVG_DEGREE, exponent: float = EXPONENT, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    num_edges distinct directed edges (no self loops) over num_edges / avg_degree nodes, as
+    (sources, targets) int arrays. Endpoints are drawn from a Zipf popularity ranking,
+    weight(rank r) ~ r^(-1 / (exponent - 1)), which gives degrees a power-law tail with that
+    exponent; sources and targets use independent rankings, so big hubs and big link lists are
+    different pages, as on Wikipedia.
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = max(2, num_edges // avg_degree)
+    weights = np.arange(1, num_nodes + 1, dtype=np.float64) ** (-1.0 / (exponent - 1.0))
+    cdf = np.cumsum(weights)
+    cdf /= cdf[-1]
+    source_rank = rng.permutation(num_nodes)
+    target_rank = rng.permutation(num_nodes)
+
+    keys = np.empty(0, dtype=np.int64)
+    draw = num_edges
+    # Duplicates among the hubs are dropped, so draw more until there are enough distinct edges
+    for _ in range(20):
+        sources = source_rank[np.searchsorted(cdf, rng.random(draw), side="right").clip(max=num_nodes - 1)]
+        targets = target_rank[np.searchsorted(cdf, rng.random(draw), side="right").clip(max=num_nodes - 1)]
+        fresh = sources.astype(np.int64) * num_nodes + targets
+        keys = np.unique(np.concatenate([keys, fresh[sources != targets]]))
+        if len(keys) >= num_edges:
+            break
+        draw = int((num_edges - len(keys)) * 1.5) + 1000
+    else:
+        raise ValueError(f"Couldn't draw {num_edges} distinct edges over {num_nodes} nodes; raise avg_degree")
+
+    keys = rng.choice(keys, size=num_edges, replace=False)
+    keys.sort()  # grouped by source, like a crawl export
+    return keys // num_nodes, keys % num_nodes
+
+
+def write_edges_csv(path: str, sources: np.ndarray, targets: np.ndarray):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        f.write("Source,Target\n")
+        for start in range(0, len(sources), _WRITE_CHUNK):
+            chunk = zip(sources[start:start + _WRITE_CHUNK].tolist(), targets[start:start + _WRITE_CHUNK].tolist())
+            f.write("".join(f"Node_{s},Node_{t}\n" for s, t in chunk))
+    os.replace(tmp_path, path)
+
+
+def synthetic_dataset(
+    num_edges: int, folder: str = None, avg_degree: int = AVG_DEGREE, exponent: float = EXPONENT, seed: int = 0
+) -> str:
+    # Folder holding the WikiGraph_edges.csv for these parameters, generated on first use
+    if folder is None:
+        folder = os.path.join(SYNTHETIC_DIR, f"powerlaw_{num_edges}_d{avg_degree}_a{exponent:g}_s{seed}")
+    path = os.path.join(folder, "WikiGraph_edges.csv")
+    if not os.path.exists(path):
+        sources, targets = power_law_edges(num_edges, avg_degree, exponent, seed)
+        write_edges_csv(path, sources, targets)
+    return folder
+
+
+def main():
+    num_edges = int(float(sys.argv[1])) if len(sys.argv) > 1 else 1_000_000
+    folder = sys.argv[2] if len(sys.argv) > 2 else None
+    avg_degree = int(sys.argv[3]) if len(sys.argv) > 3 else AVG_DEGREE
+    exponent = float(sys.argv[4]) if len(sys.argv) > 4 else EXPONENT
+
+    start = time.perf_counter()
+    folder = synthetic_dataset(num_edges, folder, avg_degree, exponent)
+    print(f"{num_edges} edges in {os.path.join(folder, 'WikiGraph_edges.csv')} ({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+One spelling per Wikipedia page, shared by the fetch layer, the page cache, the graph database
+and the crawler.
+
+The same article turns up under several URLs: percent-encoded or not (%C3%89mile_Boutroux /
+Émile_Boutroux), with spaces or underscores, with a lower-case first letter (MediaWiki upper-cases
+it), with a #fragment. canonical_url() maps all of those to the form Wikipedia uses in its own
+/wiki/ hrefs:
+    https://en.wikipedia.org/wiki/Émile Boutroux#Work  ->  https://en.wikipedia.org/wiki/%C3%89mile_Boutroux
+    https://EN.wikipedia.org/wiki/five_Nights_at_Freddy's  ->  https://en.wikipedia.org/wiki/Five_Nights_at_Freddy%27s
+Strings that aren't /wiki/ URLs only get their encoding and fragment normalized.
+
+Redirects (Poem -> Poetry) can't be seen in the URL. A redirect page is served with the target's
+content and a <link rel="canonical"> pointing at the target (or, off Wikipedia, an HTTP redirect),
+so the fetch layer learns them from the pages it reads, see declared_url() and
+wiki_interface.resolve_url().
+"""
+
+import re
+from functools import lru_cache
+from urllib.parse import quote, unquote, urljoin, urlsplit, urlunsplit
+
+# Characters Wikipedia leaves unescaped in its own /wiki/ hrefs (MediaWiki's wfUrlencode)
+SAFE_PATH_CHARS = ";@$!*(),/~:"
+
+WIKI_PREFIX = "/wiki/"
+
+_UNDERSCORES = re.compile(r"_+")
+# <link rel="canonical" href="..."> in the page head, either attribute order
+_CANONICAL_LINK = re.compile(r"<link\b[^>]*\brel=[\"']canonical[\"'][^>]*>", re.IGNORECASE)
+_HREF = re.compile(r"\bhref=[\"']([^\"']*)[\"']", re.IGNORECASE)
+
+
+def canonical_title(title: str) -> str:
+    # Page title as it appears after /wiki/ in Wikipedia's links: no fragment, underscores for
+    # spaces (runs collapsed, none at the ends), first letter upper-cased, percent-encoded
+    title = unquote(title.split("#", 1)[0]).replace(" ", "_")
+    title = _UNDERSCORES.sub("_", title).strip("_")
+    return quote(title[:1].upper() + title[1:], safe=SAFE_PATH_CHARS)
+
+
+@lru_cache(maxsize=1 << 16)
+def canonical_url(url: str) -> str:
+    # One URL per page: lower-case scheme/host, canonical title for /wiki/ paths, no #fragment
+    parts = urlsplit(url.strip())
+    if parts.path.startswith(WIKI_PREFIX):
+        path = WIKI_PREFIX + canonical_title(parts.path[len(WIKI_PREFIX):])
+    else:
+        path = quote(unquote(parts.path), safe=SAFE_PATH_CHARS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def declared_url(html: str, url: str) -> str:
+    # Canonical URL of the page the HTML belongs to: its <link rel="canonical"> if it has one
+    # (a redirect page names its target there), otherwise url itself
+    match = _CANONICAL_LINK.search(html)
+    href = _HREF.search(match.group(0)) if match else None
+    if href is None or not href.group(1):
+        return canonical_url(url)
+    return canonical_url(urljoin(url, href.group(1)))
+
+
+def test_canonical():
+    print("Testing canonicalization...")
+
+    fnaf = "https://en.wikipedia.org/wiki/Five_Nights_at_Freddy%27s"
+    for url in [
+        fnaf,
+        "https://en.wikipedia.org/wiki/Five_Nights_at_Freddy's",
+        "https://en.wikipedia.org/wiki/Five Nights at Freddy's#Gameplay",
+        "HTTPS://EN.WIKIPEDIA.ORG/wiki/five_Nights__at_Freddy%27s",
+    ]:
+        assert(canonical_url(url) == fnaf)
+
+    assert(canonical_url("https://en.wikipedia.org/wiki/Émile_Boutroux") == "https://en.wikipedia.org/wiki/%C3%89mile_Boutroux")
+    assert(canonical_url("https://en.wikipedia.org/wiki/%c3%a9mile_Boutroux") == "https://en.wikipedia.org/wiki/%C3%89mile_Boutroux")
+    # Characters MediaWiki doesn't escape stay as they are
+    url = "https://en.wikipedia.org/wiki/Garbage_collection_(computer_science)"
+    assert(canonical_url(url) == url)
+    assert(canonical_url("https://en.wikipedia.org/wiki/AC/DC") == "https://en.wikipedia.org/wiki/AC/DC")
+    assert(canonical_title("Tyler, the Creator") == "Tyler,_the_Creator")
+    # Anything that isn't an article URL keeps its case
+    assert(canonical_url("d") == "d")
+    assert(canonical_url("http://127.0.0.1:8000/w/index.php?title=x") == "http://127.0.0.1:8000/w/index.php?title=x")
+
+    html = '<head><link rel="canonical" href="https://en.wikipedia.org/wiki/Poetry"></head>'
+    assert(declared_url(html, "https://en.wikipedia.org/wiki/Poem") == "https://en.wikipedia.org/wiki/Poetry")
+    html = "<head><link href='/wiki/Poetry' rel='canonical'/></head>"
+    assert(declared_url(html, "http://127.0.0.1:8000/wiki/poem") == "http://127.0.0.1:8000/wiki/Poetry")
+    assert(declared_url("<p>no head</p>", "https://en.wikipedia.org/wiki/poem") == "https://en.wikipedia.org/wiki/Poem")
+
+
+if __name__ == '__main__':
+    test_canonical()
+    print("Tests passed good job!")
@@ -0,0 +1,203 @@
+"""
+Where a crawl spends its time, per crawled page and stage:
+    fetch        get_wiki_html: page cache lookup or network request (including rate limiter waits)
+    parse        link / category extraction and canonicalizing the links
+    membership   filter_unseen over the page's outlinks
+    scoring      embedding the new outlinks' titles (target races only)
+    db           record_page / record_redirect and the counts reported in the progress event
+    callback     progress_callback (or the printout that replaces it)
+fetch and parse run on the fetch worker threads, the rest on the crawl thread.
+
+CrawlTimings keeps the last `window` pages of each stage for rolling percentiles, a cumulative
+histogram over fixed buckets and totals, and can append every page's timings to a JSONL trace.
+Recording a page is a handful of deque appends; the trace and the profilers are off by default.
+
+    python crawl_timing.py <trace.jsonl>    summary of a saved trace
+"""
+
+import bisect
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ("fetch", "parse", "membership", "scoring", "db", "callback")
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, math.inf)
+
+# Pages the rolling percentiles are taken over
+WINDOW = 1000
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CrawlTimings:
+    def __init__(self, window: int = WINDOW, trace_path: str = None):
+        self.window = window
+        self.pages = 0
+        self.recent = {stage: deque(maxlen=window) for stage in STAGES}
+        self.totals = dict.fromkeys(STAGES, 0.0)
+        self.histograms = {stage: [0] * len(BUCKETS_MS) for stage in STAGES}
+
+        self.trace_path = trace_path
+        self._trace = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def record(self, page: str, timings: dict, **fields):
+        # timings: stage -> seconds for one crawled page (missing stages count as 0);
+        # fields (index, worker, ...) only go to the trace
+        self.pages += 1
+        for stage in STAGES:
+            seconds = timings.get(stage, 0.0)
+            self.recent[stage].append(seconds)
+            self.totals[stage] += seconds
+            self.histograms[stage][bisect.bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+        if self._trace is not None:
+            line = {"time": time.time(), "page": page, **fields, **{stage: timings.get(stage, 0.0) for stage in STAGES}}
+            self._trace.write(json.dumps(line) + "\n")
+
+    def summary(self) -> dict:
+        # Per stage: totals over the crawl, percentiles over the last `window` pages, histogram
+        total = sum(self.totals.values())
+        stages = {}
+        for stage in STAGES:
+            ordered = sorted(self.recent[stage])
+            stages[stage] = {
+                "total": self.totals[stage],
+                "share": self.totals[stage] / total if total else 0.0,
+                "mean": self.totals[stage] / self.pages if self.pages else 0.0,
+                "p50": _percentile(ordered, 0.5),
+                "p90": _percentile(ordered, 0.9),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1] if ordered else 0.0,
+                "histogram": dict(zip([str(bound) for bound in BUCKETS_MS], self.histograms[stage])),
+            }
+        return {"pages": self.pages, "window": self.window, "stages": stages}
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = [
+            f"Stage timings over {summary['pages']} pages (percentiles over the last {min(summary['pages'], self.window)}):",
+            f"  {'stage':>10} {'total s':>9} {'share':>6} {'mean ms':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}",
+        ]
+        for stage, s in summary["stages"].items():
+            lines.append(
+                f"  {stage:>10} {s['total']:9.2f} {s['share']:6.1%} {s['mean'] * 1000:8.2f} {s['p50'] * 1000:8.2f}"
+                f" {s['p90'] * 1000:8.2f} {s['p99'] * 1000:8.2f} {s['max'] * 1000:8.2f}"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+
+def read_trace(trace_path: str, window: int = WINDOW) -> CrawlTimings:
+    # Rebuild the summary of a JSONL trace written by CrawlTimings
+    timings = CrawlTimings(window)
+    with open(trace_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                timings.record(record["page"], record)
+    return timings
+
+
+@contextmanager
+def profiled(profiler: str, output_path: str):
+    """
+    Profile the block with cProfile (stats saved to output_path, top functions printed) or
+    pyinstrument (HTML report at output_path; needs the pyinstrument package). Both only see
+    the thread that enters the block; fetch / parse on the worker threads show up in the stage
+    timings instead.
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler '{profiler}', expected one of {PROFILERS}")
+
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise ImportError("profile='pyinstrument' needs the pyinstrument package (pip install pyinstrument)") from e
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            print(f"Profile written to {output_path}")
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(output_path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(20)
+        print(out.getvalue())
+        print(f"Profile written to {output_path}")
+
+
+def test_crawl_timings():
+    import tempfile
+
+    print("Testing crawl timings...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path = os.path.join(tmp, "trace.jsonl")
+        timings = CrawlTimings(window=10, trace_path=trace_path)
+        for i in range(20):
+            timings.record(f"Page_{i}", {"fetch": 0.101 + i / 1000, "parse": 0.003, "db": 0.0005}, index=i)
+        timings.close()
+
+        summary = timings.summary()
+        assert(summary["pages"] == 20)
+        fetch = summary["stages"]["fetch"]
+        assert(abs(fetch["total"] - sum(0.101 + i / 1000 for i in range(20))) < 1e-9)
+        # Percentiles only over the last 10 pages
+        assert(fetch["p50"] == 0.101 + 15 / 1000 and fetch["max"] == 0.101 + 19 / 1000)
+        assert(fetch["histogram"]["200"] == 20)
+        assert(summary["stages"]["parse"]["histogram"]["5"] == 20)
+        assert(summary["stages"]["db"]["histogram"]["1"] == 20)
+        assert(summary["stages"]["callback"]["total"] == 0.0)
+        assert(abs(sum(s["share"] for s in summary["stages"].values()) - 1) < 1e-9)
+        assert("fetch" in timings.format_summary())
+
+        # The trace replays to the same totals
+        with open(trace_path, encoding="utf-8") as f:
+            first = json.loads(f.readline())
+        assert(first["page"] == "Page_0" and first["index"] == 0 and first["scoring"] == 0.0)
+        replayed = read_trace(trace_path, window=10).summary()
+        assert(replayed["stages"]["fetch"]["total"] == fetch["total"])
+
+        profile_path = os.path.join(tmp, "crawl.prof")
+        with profiled("cprofile", profile_path):
+            sum(range(1000))
+        assert(os.path.exists(profile_path))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        print(read_trace(sys.argv[1]).format_summary())
+    else:
+        test_crawl_timings()
+        print("Tests passed good job!")
@@ -2,35 +2,93 @@
 # Uses a queue data structure
 # Keep track of visited pages and directed edges via a SQLite database
 
+import heapq
+import multiprocessing
 import os
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+import queue
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Callable, Optional
 
-from wiki_interface import get_wiki_data
-from sqlite_interface import GraphInterface
-from sentence_transformer import cos_sim
+import wiki_interface
+from canonical import canonical_url
+from wiki_interface import FetchError, get_wiki_data, configure_cache, configure_session, set_offline, POOL_SIZE
+from sqlite_interface import LEASE_SECONDS, open_graph
+from sentence_transformer import TargetScorer, load_model, BATCH_SIZE, MODEL_NAME
+from embedding_cache import EmbeddingCache
+from crawl_timing import CrawlTimings, profiled
 from shortest_path import find_shortest_path
 
 global_cancel_check = False
 
-device = torch.device('cpu' if torch.cuda.is_available() else 'cpu')
-print("Using device:", device)
+# How often an idle crawl process looks for claimable work / the coordinator checks the cancel flag
+_IDLE_POLL = 0.1
 
-def get_lowest_sim_score(data_list, remove=True):
-    """Temporary placeholder: pick and remove the lowest sim score entry."""
-    if not data_list:
+# A page whose fetch keeps failing (FetchError) is tried this many times per session, then left
+# in the queue for a later crawl. Attempt counts stay in memory; a failed page always goes back
+# with the rank it was queued with, so a transient failure doesn't demote it in later sessions.
+MAX_FETCH_ATTEMPTS = 3
+
+
+def pop_most_similar(heap: list):
+    # Pop the best scored entry from a heap of (-sim_score, url), as {"url", "sim_score"}; None if empty
+    if not heap:
         return None
+    neg_score, url = heapq.heappop(heap)
+    return {"url": url, "sim_score": -neg_score}
 
-    lowest_score_dict = data_list[0]
-    for item in data_list:
-        if item["sim_score"] > lowest_score_dict["sim_score"]:
-            lowest_score_dict = item
 
-    if remove: 
-        data_list.remove(lowest_score_dict)
-    return lowest_score_dict
+def discovery_path(discovered_from: dict, page: str):
+    # Seed -> page by following each page back to the page it was first found on;
+    # None if the chain leaves this session (pages discovered by an earlier, resumed crawl)
+    path = [page]
+    while discovered_from.get(path[-1]) is not None:
+        path.append(discovered_from[path[-1]])
+    if path[-1] not in discovered_from:
+        return None
+    path.reverse()
+    return path
+
+
+def crawl_location(enter_page: str, target_page: str = ""):
+    # (search topic, target topic or None, crawl folder, WikiGraph.db path) for a seed / target pair;
+    # names come from the canonical URLs, so another spelling of the seed resumes the same crawl
+    search_topic_name = canonical_url(enter_page).split("/")[-1]
+    target_topic_name = None
+    if target_page != "":
+        target_topic_name = canonical_url(target_page).split("/")[-1]
+
+    if target_topic_name != None:
+        folder = search_topic_name + "_to_" + target_topic_name
+    else:
+        folder = search_topic_name
+    return search_topic_name, target_topic_name, folder, folder + "/WikiGraph.db"
+
+
+def fetch_summary(requeued: int, deferred: int, redirects: int, duplicates: int) -> dict:
+    # Fetch counters for progress events and results: rate limiter, pages queued again, page cache
+    # hits and deduplication (outlinks folded into their canonical page, fetched pages that were
+    # redirects and, of those, redirects to a page already crawled)
+    cache = wiki_interface.get_page_cache()
+    cache_stats = cache.stats() if cache is not None else {"hits": 0, "misses": 0}
+    return _fetch_rates({
+        **wiki_interface.rate_limiter.stats(),
+        "requeued": requeued,
+        "deferred": deferred,
+        "cache_hits": cache_stats["hits"],
+        "cache_misses": cache_stats["misses"],
+        **wiki_interface.link_stats.summary(),
+        "redirects": redirects,
+        "duplicates": duplicates,
+    })
+
+
+def _fetch_rates(fetch: dict) -> dict:
+    lookups = fetch.get("cache_hits", 0) + fetch.get("cache_misses", 0)
+    fetch["cache_hit_rate"] = fetch.get("cache_hits", 0) / lookups if lookups else 0.0
+    fetch["dedup_rate"] = fetch.get("links_rewritten", 0) / fetch["links"] if fetch.get("links") else 0.0
+    return fetch
 
 
 def crawl(
@@ -38,130 +96,524 @@ def crawl(
     nodes_to_search: int,
     progress_callback: Optional[Callable[[dict], None]] = None,
     target_page: str = "",
+    workers: int = 1,
+    offline: bool = False,
+    batch_size: int = BATCH_SIZE,
+    export_csv: bool = True,
+    processes: int = 1,
+    trace_path: str = None,
+    profile: str = None,
 ):
 
     #  Seed URL is queued
     #  Loop until node budget hit or queue empty
     #    - dequeue next page URL; mark visited in DB
-    #    - fetch page, extract categories + outbound links
+    #    - fetch page (up to `workers` fetches in flight), extract categories + outbound links
+    #      (a fetch that fails for now goes back to the queue, see MAX_FETCH_ATTEMPTS)
+    #    - a page that turned out to be a redirect is stored as an edge to its target, and the
+    #      target recorded with the fetched content unless it was crawled already
     #    - add a node record; add an edge for each outbound link
     #    - queue each child with priority score placeholder
-    #  export nodes/edges to CSV and the DB
+    #  stop early once a page links to the target; its path comes from discovery parents
+    #  export nodes/edges to CSV (optional) and the DB
+    #  each page's stage timings (see crawl_timing.py) go into its progress event under "timings",
+    #  to the JSONL trace at trace_path if given, and into the summary returned under "timings"
     """Run the crawl, optionally emitting per-page progress via callback."""
 
+    # Whole crawl under cProfile / pyinstrument ("cprofile" / "pyinstrument"), report saved in the crawl folder
+    if profile is not None:
+        folder = crawl_location(enter_page, target_page)[2]
+        os.makedirs(folder, exist_ok=True)
+        output_path = os.path.join(folder, "crawl_profile" + (".html" if profile == "pyinstrument" else ".prof"))
+        with profiled(profile, output_path):
+            return crawl(
+                enter_page, nodes_to_search, progress_callback=progress_callback, target_page=target_page,
+                workers=workers, offline=offline, batch_size=batch_size, export_csv=export_csv,
+                processes=processes, trace_path=trace_path,
+            )
+
+    # Several processes sharing the database, see crawl_processes()
+    if processes > 1:
+        return crawl_processes(
+            enter_page, nodes_to_search, progress_callback=progress_callback, target_page=target_page,
+            processes=processes, offline=offline, batch_size=batch_size, export_csv=export_csv,
+            trace_path=trace_path,
+        )
+
     #Initialize
-    search_topic_name = enter_page.split("/")[-1]
-    target_topic_name = None
-    if target_page != "":
-        target_topic_name = target_page.split("/")[-1]
+    search_topic_name, target_topic_name, folder, db_path = crawl_location(enter_page, target_page)
 
     g = None
 
-    if target_topic_name != None:
-        os.makedirs(search_topic_name + "_to_" + target_topic_name, exist_ok=True)
-        g = GraphInterface(search_topic_name + "_to_" + target_topic_name + "/WikiGraph.db")
-    else:
-        os.makedirs(search_topic_name, exist_ok=True)
-        g = GraphInterface(search_topic_name + "/WikiGraph.db")
+    os.makedirs(folder, exist_ok=True)
+    g = open_graph(db_path, mirror_seen=True)
 
     g.create_tables()
+    # Pages an earlier crawl gave up on get another try
+    g.release_deferred()
+
+    # Keep one pooled keep-alive connection per fetch worker
+    if workers > POOL_SIZE:
+        configure_session(pool_size=workers)
+
+    # Offline replays the race purely from the shared page cache
+    set_offline(offline)
 
     if enter_page != "":
         g.check_if_visited_then_enqueue(enter_page)
 
     count = 0
 
-    # TEMP FOR TESTING:
-    # Will not work for resumed sessions, just to see if priority rankings are being pulled accurately
-    similarity_dictionary = []
-
-    # Load model from HuggingFace Hub
-    tokenizer = AutoTokenizer.from_pretrained('sentence-transformers/all-mpnet-base-v2')
-    model = AutoModel.from_pretrained('sentence-transformers/all-mpnet-base-v2')
-    model.to(device)  # move model to GPU
-
-    # Current page will be a page url
-    while count < nodes_to_search and global_cancel_check is False:
-        current_page = g.dequeue_and_mark_visited(priority_queue_mode=(target_topic_name != None))
-        if not current_page:
-            break
-
-        curr_page_data = get_wiki_data(current_page)
-        curr_page_name = current_page.split("/")[-1]
-
-        g.add_node(curr_page_name, curr_page_data["cats"])
-        edges_added = 0
-        children_names = []
-        for link in curr_page_data["links"]:
-            child_name = link.split("/")[-1]
-            g.add_edge(from_page_name=curr_page_name, to_page_name=child_name)
-            children_names.append(child_name)
-
-            sim_score=0
-            # priority rank here
-            # if target_topic_name != None:
-            #     sim_score = cos_sim(target_topic_name, child_name, tokenizer, model, device)
-            #     similarity_dictionary.append({"url": link, "sim_score": sim_score})
-
-            if g.check_if_visited(link):
-                # priority rank here
-                if target_topic_name != None:
-                    sim_score = cos_sim(target_topic_name, child_name, tokenizer, model, device)
-                    similarity_dictionary.append({"url": link, "sim_score": sim_score})
-
-                g.enqueue(link, sim_score)
+    # Page name -> page it was first found on (None for the seed), so the path to the
+    # target is known the moment a page links to it
+    discovered_from = {search_topic_name: None}
+    target_found = False
+    target_path = None
 
-
-            #g.check_if_visited_then_enqueue(link, sim_score)
-            edges_added += 1
-
-            if target_topic_name != None:
-                print("Current page: ", curr_page_name)
-                print("Current most similar edge: ", get_lowest_sim_score(similarity_dictionary, remove=False))
-
-            if link == target_page:
-                print("TARGET LINK FOUND; EXITING PROGRAM")
-                g.export_to_csv()
-
-                path = None
-
-                if target_topic_name != None:
-                    path = search_topic_name + "_to_" + target_topic_name + '/WikiGraph_edges.csv'
+    # TEMP FOR TESTING:
+    # Will not work for resumed sessions, just to see if priority rankings are being pulled accurately.
+    # A heap of (-sim_score, url), so each page's push and pop cost O(log n) instead of a scan
+    similarity_heap = []
+
+    # Target is embedded once for the whole race; titles embedded by earlier crawls come from the shared cache.
+    # The model is only loaded for priority-queue mode, and only once per process.
+    scorer = None
+    embedding_cache = None
+    if target_topic_name != None:
+        tokenizer, model, device = load_model(MODEL_NAME)
+        embedding_cache = EmbeddingCache(MODEL_NAME)
+        scorer = TargetScorer(target_topic_name, tokenizer, model, device, batch_size=batch_size, cache=embedding_cache)
+
+    # Pages are dequeued (and marked visited) in queue order, then fetched by a pool of
+    # `workers` threads so up to N requests are in flight. All DB reads/writes stay on
+    # this thread; the workers only run get_wiki_data. workers=1 is the sequential crawl.
+    in_flight = {}
+    dispatched = 0
+
+    # Throttled / failed fetches: page URL -> failures this session, and how many pages were given up on
+    # for now (deferred in the queue, so they survive a crash). Ranks of pages in flight, for requeueing.
+    fetch_failures = {}
+    deferred = 0
+    queued_ranks = {}
+    requeued = 0
+    # Fetched pages that were redirects, and how many of those led to a page already crawled
+    redirects = 0
+    duplicates = 0
+
+    crawl_timings = CrawlTimings(trace_path=trace_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Top up the pool from the frontier
+            while (
+                len(in_flight) < workers
+                and dispatched < nodes_to_search
+                and global_cancel_check is False
+                and not target_found
+            ):
+                next_page, next_rank = g.dequeue_and_mark_visited(
+                    priority_queue_mode=(target_topic_name != None), with_rank=True
+                )
+                if not next_page:
+                    break
+                queued_ranks[next_page] = next_rank
+                # fetch / parse timings are filled in by the worker thread
+                timings = {}
+                in_flight[pool.submit(get_wiki_data, next_page, timings)] = (next_page, timings)
+                dispatched += 1
+
+            # Queue empty (or budget / cancel hit) and nothing left to wait on
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                current_page, timings = in_flight.pop(future)
+                priority_rank = queued_ranks.pop(current_page)
+                try:
+                    curr_page_data = future.result()
+                except FetchError as e:
+                    # Not a dead end, just not now: queue it again instead of recording it without links
+                    print(f"Fetch failed, queued again: {e}")
+                    fetch_failures[current_page] = fetch_failures.get(current_page, 0) + 1
+                    deferring = fetch_failures[current_page] >= MAX_FETCH_ATTEMPTS
+                    g.requeue(current_page, priority_rank, deferred=deferring)
+                    deferred += deferring
+                    requeued += 1
+                    dispatched -= 1
+                    continue
+
+                # The fetch may have landed on another page (a redirect); that page is what gets recorded
+                started = time.perf_counter()
+                source_url = canonical_url(current_page)
+                page_url = wiki_interface.resolve_url(source_url)
+                if page_url != source_url:
+                    g.record_redirect(source_url, page_url)
+                    redirects += 1
+                    discovered_from.setdefault(page_url.split("/")[-1], source_url.split("/")[-1])
+                    if not g.check_if_visited(page_url):
+                        # Crawled already (or in flight): nothing new, and it doesn't use up the budget
+                        duplicates += 1
+                        dispatched -= 1
+                        continue
+                curr_page_name = page_url.split("/")[-1]
+
+                children_names = [link.split("/")[-1] for link in curr_page_data["links"]]
+                # Outlinks not visited or queued yet, checked as one set
+                checked = time.perf_counter()
+                new_links = g.filter_unseen(curr_page_data["links"])
+                scored = time.perf_counter()
+                timings["membership"] = scored - checked
+
+                # priority rank here: every unvisited child of the page is embedded in batched forward passes
+                sim_scores = [0] * len(new_links)
+                if scorer is not None:
+                    sim_scores = scorer.score([link.split("/")[-1] for link in new_links])
+                    for link, sim_score in zip(new_links, sim_scores):
+                        heapq.heappush(similarity_heap, (-sim_score, link))
+                recorded = time.perf_counter()
+                timings["scoring"] = recorded - scored
+
+                # Node, edges and queue entries for this page in a single transaction
+                # (a redirect's target leaves the queue for visited in the same one)
+                g.record_page(
+                    curr_page_name, curr_page_data["cats"], children_names, dict(zip(new_links, sim_scores)),
+                    claimed_url=page_url if page_url != source_url else None,
+                )
+                # Redirect bookkeeping before the membership check counts as a DB write too
+                timings["db"] = time.perf_counter() - recorded + (checked - started)
+                edges_added = len(children_names)
+                for link in new_links:
+                    discovered_from.setdefault(link.split("/")[-1], curr_page_name)
+
+                # Stop dispatching once the target is linked; pages already in flight are still recorded
+                if (
+                    not target_found
+                    and target_page != ""
+                    and wiki_interface.resolve_url(target_page) in curr_page_data["links"]
+                ):
+                    target_found = True
+                    target_path = discovery_path(discovered_from, curr_page_name)
+                    if target_path is not None:
+                        target_path.append(target_topic_name)
+                    else:
+                        # Resumed crawl: part of the way was found in an earlier session, search the saved graph
+                        target_path = find_shortest_path(db_path, search_topic_name, target_topic_name)
+                    print("TARGET LINK FOUND: ", " -> ".join(target_path))
+
+                most_similar = pop_most_similar(similarity_heap)
+
+                if progress_callback:
+                    # The counts are DB reads; the callback's own time is only known once it returns,
+                    # so it is in the trace and the summary but not in this event
+                    counted = time.perf_counter()
+                    event = {
+                        "index": count,
+                        "current_page": curr_page_name,
+                        "categories": curr_page_data["cats"],
+                        "children": children_names,
+                        "edges_added": edges_added,
+                        "queue_size": g.get_queue_size(),
+                        "visited_size": g.get_visited_size(),
+                        "node_count": g.get_node_count(),
+                        "edge_count": g.get_edge_count(),
+                        "most_similar": most_similar["url"].split("/")[-1]
+                        if most_similar
+                        else None,
+                        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+                        "target_path": target_path,
+                        "fetch": fetch_summary(requeued, deferred, redirects, duplicates),
+                    }
+                    called = time.perf_counter()
+                    timings["db"] += called - counted
+                    event["timings"] = dict(timings)
+                    progress_callback(event)
                 else:
-                    path = search_topic_name + '/WikiGraph_edges.csv'
-
-                shortest_pth = find_shortest_path(path, search_topic_name, target_topic_name)
-                print("Shortest path: ", shortest_pth)
-
-                exit()
-
-        most_similar = get_lowest_sim_score(similarity_dictionary)
+                    called = time.perf_counter()
+                    print(f"{count}. Currently working on: {curr_page_name}")
+                    print("Most similar: ", most_similar)
+                timings["callback"] = time.perf_counter() - called
+                crawl_timings.record(curr_page_name, timings, index=count)
+
+                count += 1
+
+    if export_csv:
+        g.export_to_csv()
+    g.close_conn()
+    if embedding_cache is not None:
+        print("Embedding cache:", embedding_cache.stats())
+        embedding_cache.close_conn()
+    fetch = fetch_summary(requeued, deferred, redirects, duplicates)
+    print("Fetches:", fetch)
+    crawl_timings.close()
+    print(crawl_timings.format_summary())
+    return {
+        "search_topic_name": search_topic_name,
+        "nodes_processed": count,
+        "target_found": target_found,
+        "path": target_path,
+        "fetch": fetch,
+        "timings": crawl_timings.summary(),
+    }
+
+
+def _crawl_worker(
+    worker_id: str,
+    db_path: str,
+    nodes_to_search: int,
+    target_page: str,
+    target_topic_name: Optional[str],
+    offline: bool,
+    batch_size: int,
+    lease_seconds: float,
+    cache_settings: dict,
+    claimed,
+    stop,
+    events,
+):
+    # One crawl process: claim a queue entry, fetch it, record it, repeat. claimed (shared counter of
+    # pages claimed by all processes) enforces the node budget; stop is set on cancel / target found.
+    # Progress goes back to the coordinator through events. target_topic_name comes from crawl_location(),
+    # so every worker scores against the same canonical title as a single-process crawl.
+    configure_cache(**cache_settings)
+    set_offline(offline)
+    # A forked worker starts with the parent's counters; its events should only count its own fetches
+    wiki_interface.rate_limiter.reset()
+    wiki_interface.link_stats.reset()
+
+    # Other processes write to the same file: no mirrored seen-set, and wait out their write locks
+    g = open_graph(db_path, timeout=60.0)
+
+    scorer = None
+    embedding_cache = None
+    if target_topic_name != None:
+        tokenizer, model, device = load_model(MODEL_NAME)
+        embedding_cache = EmbeddingCache(MODEL_NAME)
+        scorer = TargetScorer(target_topic_name, tokenizer, model, device, batch_size=batch_size, cache=embedding_cache)
+
+    # Failed fetches of this worker per page; a page given up on is deferred in the queue for every worker
+    fetch_failures = {}
+    deferred = 0
+    requeued = 0
+    redirects = 0
+    duplicates = 0
+
+    try:
+        while not stop.is_set():
+            with claimed.get_lock():
+                if claimed.value >= nodes_to_search:
+                    break
+                claimed.value += 1
+
+            current_page = g.claim_next(worker_id, lease_seconds, priority_queue_mode=(scorer is not None))
+            if current_page is None:
+                with claimed.get_lock():
+                    claimed.value -= 1
+                # Claimed entries stay queued until recorded, so no pending entries (deferred ones aside)
+                # means nothing is in flight in any worker either
+                if g.get_pending_count() == 0:
+                    break
+                time.sleep(_IDLE_POLL)
+                continue
+
+            timings = {}
+            try:
+                curr_page_data = get_wiki_data(current_page, timings)
+            except FetchError as e:
+                print(f"Fetch failed, queued again: {e}")
+                fetch_failures[current_page] = fetch_failures.get(current_page, 0) + 1
+                if fetch_failures[current_page] >= MAX_FETCH_ATTEMPTS:
+                    g.defer_claim(current_page, worker_id)
+                    deferred += 1
+                else:
+                    # Claimable again right away, with the rank it was queued with
+                    g.release_claim(current_page, worker_id)
+                requeued += 1
+                with claimed.get_lock():
+                    claimed.value -= 1
+                continue
+
+            # A redirect: store it as an edge and record the page it led to, unless that was crawled already
+            started = time.perf_counter()
+            claimed_url = current_page
+            source_url = canonical_url(current_page)
+            page_url = wiki_interface.resolve_url(source_url)
+            if page_url != source_url:
+                g.record_redirect(source_url, page_url, claimed_url=current_page)
+                redirects += 1
+                if not g.check_if_visited(page_url):
+                    duplicates += 1
+                    with claimed.get_lock():
+                        claimed.value -= 1
+                    continue
+                claimed_url = page_url
+            curr_page_name = page_url.split("/")[-1]
+
+            children_names = [link.split("/")[-1] for link in curr_page_data["links"]]
+            checked = time.perf_counter()
+            new_links = g.filter_unseen(curr_page_data["links"])
+            scored = time.perf_counter()
+            sim_scores = [0] * len(new_links)
+            if scorer is not None:
+                sim_scores = scorer.score([link.split("/")[-1] for link in new_links])
+            recorded = time.perf_counter()
+
+            g.record_page(
+                curr_page_name, curr_page_data["cats"], children_names, dict(zip(new_links, sim_scores)),
+                claimed_url=claimed_url,
+            )
+            timings["membership"] = scored - checked
+            timings["scoring"] = recorded - scored
+            timings["db"] = time.perf_counter() - recorded + (checked - started)
+
+            target_found = target_page != "" and wiki_interface.resolve_url(target_page) in curr_page_data["links"]
+            if target_found:
+                stop.set()
+
+            best = max(zip(sim_scores, new_links), default=None) if scorer is not None else None
+            counted = time.perf_counter()
+            event = {
+                "worker": worker_id,
+                "current_page": curr_page_name,
+                "categories": curr_page_data["cats"],
+                "children": children_names,
+                "edges_added": len(children_names),
+                "queue_size": g.get_queue_size(),
+                "visited_size": g.get_visited_size(),
+                "node_count": g.get_node_count(),
+                "edge_count": g.get_edge_count(),
+                "most_similar": best[1].split("/")[-1] if best else None,
+                "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+                "fetch": fetch_summary(requeued, deferred, redirects, duplicates),
+                "target_found": target_found,
+            }
+            timings["db"] += time.perf_counter() - counted
+            # The callback runs in the coordinator, which times it
+            event["timings"] = timings
+            events.put(event)
+    finally:
+        g.close_conn()
+        if embedding_cache is not None:
+            embedding_cache.close_conn()
+
+
+def crawl_processes(
+    enter_page: str,
+    nodes_to_search: int,
+    progress_callback: Optional[Callable[[dict], None]] = None,
+    target_page: str = "",
+    processes: int = 2,
+    offline: bool = False,
+    batch_size: int = BATCH_SIZE,
+    export_csv: bool = True,
+    lease_seconds: float = LEASE_SECONDS,
+    trace_path: str = None,
+):
+    """
+    crawl() with `processes` worker processes sharing one WikiGraph.db.
+
+    Workers lease queue entries (GraphInterface.claim_next), so each page is fetched by one of them;
+    a worker that dies mid-page loses its lease after lease_seconds and the page is crawled by
+    another. The node budget counts pages claimed by all workers together, and global_cancel_check
+    (or finding the target) stops every worker after the page it is on. Progress events are
+    forwarded to progress_callback from this process, with the worker's id under "worker".
+    Each worker fetches one page at a time through its own rate limiter, so the per-host rate adds
+    up across workers. Target races load the model once per worker and take the path from the saved graph.
+    Stage timings are taken in the workers (the callback's in this process) and summarized / traced here.
+    """
+    search_topic_name, target_topic_name, folder, db_path = crawl_location(enter_page, target_page)
+    os.makedirs(folder, exist_ok=True)
+
+    g = open_graph(db_path, timeout=60.0)
+    g.create_tables()
+    if enter_page != "":
+        g.check_if_visited_then_enqueue(enter_page)
+    # Leases left by workers of an earlier run that crashed, and pages it gave up on
+    leases_requeued = g.release_expired_leases()
+    g.release_deferred()
+
+    claimed = multiprocessing.Value("i", 0)
+    stop = multiprocessing.Event()
+    events = multiprocessing.Queue()
+    cache_settings = dict(wiki_interface._cache_settings)
+    workers = [
+        multiprocessing.Process(
+            target=_crawl_worker,
+            args=(
+                f"{socket.gethostname()}-{os.getpid()}-{i}", db_path, nodes_to_search, target_page,
+                target_topic_name, offline, batch_size, lease_seconds, cache_settings, claimed, stop, events,
+            ),
+            daemon=True,
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
 
+    count = 0
+    target_found = False
+    running = True
+    # Latest fetch / rate limiter stats of each worker
+    worker_fetch = {}
+    crawl_timings = CrawlTimings(trace_path=trace_path)
+    while True:
+        if global_cancel_check is True:
+            stop.set()
+        try:
+            event = events.get(timeout=_IDLE_POLL)
+        except queue.Empty:
+            if not running:
+                break
+            # One more pass after the last worker exits picks up events it sent on the way out
+            running = any(worker.is_alive() for worker in workers)
+            leases_requeued += g.release_expired_leases()
+            continue
+
+        target_found = target_found or event.pop("target_found")
+        worker_fetch[event["worker"]] = event["fetch"]
+        timings = dict(event["timings"])
+        called = time.perf_counter()
         if progress_callback:
-            progress_callback(
-                {
-                    "index": count,
-                    "current_page": curr_page_name,
-                    "categories": curr_page_data["cats"],
-                    "children": children_names,
-                    "edges_added": edges_added,
-                    "queue_size": g.get_queue_size(),
-                    "visited_size": g.get_visited_size(),
-                    "node_count": g.get_node_count(),
-                    "edge_count": g.get_edge_count(),
-                    "most_similar": most_similar["url"].split("/")[-1]
-                    if most_similar
-                    else None,
-                }
-            )
+            progress_callback({"index": count, **event, "target_path": None})
         else:
-            print(f"{count}. Currently working on: {curr_page_name}")
-            print("Most similar: ", most_similar)
-
+            print(f"{count}. Worker {event['worker']} finished: {event['current_page']}")
+        timings["callback"] = time.perf_counter() - called
+        crawl_timings.record(event["current_page"], timings, index=count, worker=event["worker"])
         count += 1
-
-    g.export_to_csv()
-    return {"search_topic_name": search_topic_name, "nodes_processed": count}
+        if global_cancel_check is True:
+            stop.set()
+
+    for worker in workers:
+        worker.join()
+
+    target_path = None
+    if target_found:
+        target_path = find_shortest_path(db_path, search_topic_name, target_topic_name)
+        print("TARGET LINK FOUND: ", " -> ".join(target_path))
+
+    if export_csv:
+        g.export_to_csv()
+    g.close_conn()
+
+    fetch = {}
+    for stats in worker_fetch.values():
+        for name, value in stats.items():
+            if name not in ("rates", "cache_hit_rate", "dedup_rate"):
+                fetch[name] = fetch.get(name, 0) + value
+    fetch = _fetch_rates(fetch)
+    print("Fetches:", fetch)
+    crawl_timings.close()
+    print(crawl_timings.format_summary())
+    return {
+        "search_topic_name": search_topic_name,
+        "nodes_processed": count,
+        "target_found": target_found,
+        "path": target_path,
+        "leases_requeued": leases_requeued,
+        "fetch": fetch,
+        "timings": crawl_timings.summary(),
+    }
 
 
 def main():
@@ -174,8 +626,14 @@ def main():
     nodes_to_search = int(
         input("How many nodes should be searched (1 node will take about 1-8 seconds): ")
     )
-    result = crawl(enter_page, nodes_to_search, target_page=target_page)
+    workers = input("How many pages should be fetched at once (Enter for 1): ").strip()
+    workers = int(workers) if workers else 1
+    processes = input("How many crawl processes should share the database (Enter for 1): ").strip()
+    processes = int(processes) if processes else 1
+    result = crawl(enter_page, nodes_to_search, target_page=target_page, workers=workers, processes=processes)
     print(f"Finished. Processed {result['nodes_processed']} nodes into {result['search_topic_name']}.")
+    if result["target_found"]:
+        print("Path: ", " -> ".join(result["path"]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,546 @@
+"""
+Build a WikiGraph.db straight from a Wikipedia database dump instead of crawling it page by page.
+
+Two kinds of input, read as streams and decompressed on the fly (.gz / .bz2 / .xz):
+    SQL table dumps   enwiki-*-page.sql.gz + enwiki-*-pagelinks.sql.gz, optionally
+                      categorylinks.sql.gz (page categories) and linktarget.sql.gz (needed when
+                      pagelinks / categorylinks reference link targets by id, as current dumps do)
+    XML               enwiki-*-pages-articles.xml.bz2: links and categories parsed from the wikitext
+
+Only main-namespace pages are kept, and titles are stored the way the crawler names pages (the
+percent-encoded path after /wiki/), passed through the same is_article_href() filter as
+get_wiki_links, so an ingested database can be searched, exported, analysed and even resumed by
+crawl() like a crawled one. It is always written in the interned schema, with Wikipedia's page ids
+as page_id; every article becomes a visited node.
+
+Rows go to SQLite in fixed-size batches; links and categories are staged in scratch tables and
+joined at the end, so memory use doesn't grow with the dump.
+
+Differences from a crawl: links that templates add (navboxes etc.) are only in the SQL pagelinks
+table, not in the XML wikitext; pagelinks has no fragments, so [[A#Section]] counts as a link to A
+there while the crawler drops it; hidden categories are included. Redirect pages are pages with a
+single edge to their target, but not nodes.
+
+Usage: python dump_ingest.py [--overwrite] <output folder> <dump file> [<dump file> ...]
+An existing WikiGraph.db in the output folder (a crawl, say) is only replaced with --overwrite.
+"""
+
+import bz2
+import gzip
+import lzma
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
+
+from canonical import SAFE_PATH_CHARS
+from sqlite_interface import InternedGraphInterface
+from wiki_extract import is_article_href
+
+# Rows per executemany
+BATCH_SIZE = 10000
+
+MAIN_NAMESPACE = 0
+CATEGORY_NAMESPACE = 14
+
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def open_dump(path: str, mode: str = "rt"):
+    # Dump file as a stream, decompressed on the fly according to its extension
+    opener = _OPENERS.get(os.path.splitext(path)[1], open)
+    if "t" in mode:
+        return opener(path, mode, encoding="utf-8", errors="replace")
+    return opener(path, mode)
+
+
+def href_title(title: str) -> str:
+    # Dump title ("Five_Nights_at_Freddy's") -> the crawler's page name ("Five_Nights_at_Freddy%27s"),
+    # percent-encoded like MediaWiki's own links
+    return quote(title.replace(" ", "_"), safe=SAFE_PATH_CHARS)
+
+
+def article_title(title: str):
+    # Page name for a main-namespace title, or None if get_wiki_links would skip links to it
+    name = href_title(title)
+    return name if is_article_href("/wiki/" + name) else None
+
+
+def _batched(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---- SQL dumps ----
+
+_CREATE_TABLE = re.compile(r"^CREATE TABLE `(\w+)`")
+_COLUMN = re.compile(r"^\s+`(\w+)`")
+_INSERT = re.compile(r"^INSERT INTO `(\w+)` VALUES ")
+# One value or bracket of an INSERT ... VALUES (...),(...); line
+_SQL_TOKEN = re.compile(r"'((?:[^'\\]|\\.)*)'|([(),])|(NULL)|([^,()'\s;]+)", re.S)
+_SQL_ESCAPE = re.compile(r"\\(.)", re.S)
+_SQL_ESCAPES = {"0": "\0", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "b": "\b"}
+
+
+def _sql_string(value: str) -> str:
+    if "\\" not in value:
+        return value
+    return _SQL_ESCAPE.sub(lambda m: _SQL_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def _sql_number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _sql_rows(line: str, start: int):
+    row = None
+    for match in _SQL_TOKEN.finditer(line, start):
+        string, bracket, null, number = match.groups()
+        if bracket == "(":
+            row = []
+        elif bracket == ")":
+            yield tuple(row)
+            row = None
+        elif row is None:
+            continue
+        elif string is not None:
+            row.append(_sql_string(string))
+        elif null is not None:
+            row.append(None)
+        elif number is not None:
+            row.append(_sql_number(number))
+
+
+def sql_dump_table(path: str) -> str:
+    # Name of the table a mysqldump file creates
+    with open_dump(path) as f:
+        for line in f:
+            match = _CREATE_TABLE.match(line) or _INSERT.match(line)
+            if match:
+                return match.group(1)
+    raise ValueError(f"{path} is not a MySQL table dump")
+
+
+def read_sql_dump(path: str, columns: list[str]):
+    """
+    Stream the rows of a mysqldump file as tuples of the requested columns, found by name in its
+    CREATE TABLE (so older and newer table layouts both work). Missing columns come back as None.
+    """
+    positions = None
+    with open_dump(path) as f:
+        table_columns = []
+        for line in f:
+            if positions is None:
+                if _CREATE_TABLE.match(line):
+                    table_columns = []
+                    continue
+                column = _COLUMN.match(line)
+                if column:
+                    table_columns.append(column.group(1))
+                    continue
+
+            insert = _INSERT.match(line)
+            if not insert:
+                continue
+            if positions is None:
+                positions = [table_columns.index(name) if name in table_columns else None for name in columns]
+            for row in _sql_rows(line, insert.end()):
+                yield tuple(row[i] if i is not None else None for i in positions)
+
+
+def sql_dump_columns(path: str) -> list[str]:
+    with open_dump(path) as f:
+        columns = []
+        for line in f:
+            column = _COLUMN.match(line)
+            if column:
+                columns.append(column.group(1))
+            elif _INSERT.match(line):
+                break
+    return columns
+
+
+# ---- XML dumps ----
+
+# [[Target]], [[Target|label]]; nested [[...]] inside file captions are matched on their own
+_WIKILINK = re.compile(r"\[\[([^\[\]|\n]+)(?:\|[^\[\]]*)?\]\]")
+_CATEGORY_PREFIX = re.compile(r"^\s*category\s*:", re.IGNORECASE)
+
+
+def _normalize_link(target: str) -> str:
+    # Wikitext link target -> title as MediaWiki stores it: underscores, first letter upper case
+    target = re.sub(r"[\s_]+", "_", target.strip()).strip("_")
+    return target[:1].upper() + target[1:]
+
+
+def wikitext_links(text: str):
+    # (article link targets, category names) in wikitext, in order of appearance
+    links, cats = [], []
+    for match in _WIKILINK.finditer(text or ""):
+        target = match.group(1)
+        if _CATEGORY_PREFIX.match(target):
+            name = _normalize_link(_CATEGORY_PREFIX.sub("", target, count=1))
+            if name:
+                cats.append(name.replace("_", " "))
+            continue
+        target = _normalize_link(target)
+        if target:
+            links.append(target)
+    return links, cats
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_xml_pages(path: str):
+    # (page id, namespace, title, redirect target or None, wikitext) per <page>, in constant memory
+    with open_dump(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end" or _local(elem.tag) != "page":
+                continue
+            page = {"id": None, "ns": None, "title": None, "redirect": None, "text": None}
+            for child in elem:
+                name = _local(child.tag)
+                if name in ("id", "ns", "title") and page[name] is None:
+                    page[name] = child.text
+                elif name == "redirect":
+                    page["redirect"] = child.get("title")
+                elif name == "revision":
+                    for field in child:
+                        if _local(field.tag) == "text":
+                            page["text"] = field.text
+            yield int(page["id"]), int(page["ns"]), page["title"], page["redirect"], page["text"]
+            # Drop the parsed page (and the emptied ones before it) from the tree
+            root.clear()
+
+
+# ---- loading ----
+
+class DumpLoader:
+    # Bulk-loads pages, links and categories into an interned WikiGraph.db through scratch tables
+    def __init__(self, db_path: str):
+        self.g = InternedGraphInterface(db_path, synchronous="OFF")
+        self.g.create_tables()
+        self.conn = self.g.conn
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ingest_links (origin_id INTEGER, title TEXT);
+            CREATE TABLE IF NOT EXISTS ingest_link_ids (origin_id INTEGER, target_id INTEGER);
+            CREATE TABLE IF NOT EXISTS ingest_categories (page_id INTEGER, category TEXT);
+            CREATE TABLE IF NOT EXISTS ingest_linktarget (lt_id INTEGER PRIMARY KEY, namespace INTEGER, title TEXT);
+        """)
+        self.counts = {"pages": 0, "redirects": 0, "links": 0, "categories": 0}
+
+    def _insert(self, sql: str, rows):
+        for batch in _batched(rows):
+            with self.conn:
+                self.conn.executemany(sql, batch)
+
+    def add_pages(self, pages):
+        # pages: (page_id, title, is_redirect); titles that fail the article filter are skipped
+        def rows():
+            for page_id, title, is_redirect in pages:
+                name = article_title(title)
+                if name is None:
+                    continue
+                self.counts["pages"] += 1
+                self.counts["redirects"] += bool(is_redirect)
+                yield page_id, name, int(bool(is_redirect))
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS ingest_redirects (page_id INTEGER PRIMARY KEY)")
+        for batch in _batched(rows()):
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO pages (page_id, title) VALUES (?, ?)", [row[:2] for row in batch])
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO ingest_redirects (page_id) VALUES (?)",
+                    [(row[0],) for row in batch if row[2]]
+                )
+
+    def add_links(self, links):
+        # links: (origin page id, target title), resolved against the pages table at the end
+        def rows():
+            for origin_id, title in links:
+                name = article_title(title)
+                if name is not None:
+                    self.counts["links"] += 1
+                    yield origin_id, name
+
+        self._insert("INSERT INTO ingest_links (origin_id, title) VALUES (?, ?)", rows())
+
+    def add_link_ids(self, links):
+        # links: (origin page id, linktarget id) from current pagelinks dumps
+        self._insert("INSERT INTO ingest_link_ids (origin_id, target_id) VALUES (?, ?)", links)
+
+    def add_linktargets(self, targets):
+        # targets: (lt_id, namespace, title); only articles and categories are ever looked up
+        def rows():
+            for lt_id, namespace, title in targets:
+                if namespace == MAIN_NAMESPACE:
+                    name = article_title(title)
+                    if name is not None:
+                        yield lt_id, namespace, name
+                elif namespace == CATEGORY_NAMESPACE:
+                    yield lt_id, namespace, title.replace("_", " ")
+
+        self._insert("INSERT OR REPLACE INTO ingest_linktarget (lt_id, namespace, title) VALUES (?, ?, ?)", rows())
+
+    def add_categories(self, categories):
+        # categories: (page id, category name)
+        def rows():
+            for page_id, category in categories:
+                self.counts["categories"] += 1
+                yield page_id, category.replace("_", " ")
+
+        self._insert("INSERT INTO ingest_categories (page_id, category) VALUES (?, ?)", rows())
+
+    def finish(self, export_csv: bool = True) -> dict:
+        with self.conn:
+            # Edges between kept pages only: links to missing pages (red links) or skipped namespaces drop out
+            self.conn.execute("""
+                INSERT OR IGNORE INTO edges (origin_id, target_id)
+                SELECT links.origin_id, target.page_id FROM ingest_links AS links
+                JOIN pages AS target ON target.title = links.title
+                WHERE links.origin_id IN (SELECT page_id FROM pages)
+            """)
+            self.conn.execute("""
+                INSERT OR IGNORE INTO edges (origin_id, target_id)
+                SELECT links.origin_id, target.page_id FROM ingest_link_ids AS links
+                JOIN ingest_linktarget AS lt ON lt.lt_id = links.target_id AND lt.namespace = ?
+                JOIN pages AS target ON target.title = lt.title
+                WHERE links.origin_id IN (SELECT page_id FROM pages)
+            """, (MAIN_NAMESPACE,))
+
+            # Every article is a crawled node; redirects are only pages
+            self.conn.execute("""
+                INSERT OR IGNORE INTO nodes (page_id, page_cats)
+                SELECT page_id, ? FROM pages WHERE page_id NOT IN (SELECT page_id FROM ingest_redirects)
+            """, (str(set()),))
+            self.conn.execute("INSERT OR IGNORE INTO visited (page_id) SELECT page_id FROM nodes")
+
+        # Categories in the crawler's format (str of a set), one page at a time
+        grouped = self.conn.execute("""
+            SELECT page_id, group_concat(category, char(31)) FROM ingest_categories
+            WHERE page_id IN (SELECT page_id FROM nodes)
+            GROUP BY page_id
+        """)
+        self._insert(
+            "UPDATE nodes SET page_cats = ? WHERE page_id = ?",
+            ((str(set(cats.split("\x1f"))), page_id) for page_id, cats in grouped),
+        )
+
+        self.conn.executescript("""
+            DROP TABLE ingest_links;
+            DROP TABLE ingest_link_ids;
+            DROP TABLE ingest_categories;
+            DROP TABLE ingest_linktarget;
+            DROP TABLE temp.ingest_redirects;
+        """)
+        self.conn.execute("VACUUM")
+
+        summary = {
+            **self.counts,
+            "nodes": self.g.get_node_count(),
+            "edges": self.g.get_edge_count(),
+        }
+        if export_csv:
+            self.g.export_to_csv()
+        self.g.close_conn()
+        return summary
+
+
+def ingest_sql_dumps(loader: DumpLoader, dumps: dict[str, str]):
+    # dumps: table name -> file; page is required, the others are optional
+    page_columns = ["page_id", "page_namespace", "page_title", "page_is_redirect"]
+    loader.add_pages(
+        (page_id, title, is_redirect)
+        for page_id, namespace, title, is_redirect in read_sql_dump(dumps["page"], page_columns)
+        if namespace == MAIN_NAMESPACE
+    )
+
+    if "linktarget" in dumps:
+        loader.add_linktargets(read_sql_dump(dumps["linktarget"], ["lt_id", "lt_namespace", "lt_title"]))
+
+    if "pagelinks" in dumps:
+        path = dumps["pagelinks"]
+        rows = read_sql_dump(path, ["pl_from", "pl_from_namespace", "pl_namespace", "pl_title", "pl_target_id"])
+        if "pl_title" in sql_dump_columns(path):
+            loader.add_links(
+                (origin, title) for origin, from_ns, ns, title, _ in rows
+                if ns == MAIN_NAMESPACE and from_ns in (MAIN_NAMESPACE, None)
+            )
+        else:
+            if "linktarget" not in dumps:
+                raise ValueError("This pagelinks dump references link targets by id; pass the linktarget dump too")
+            loader.add_link_ids(
+                (origin, target_id) for origin, from_ns, _, _, target_id in rows if from_ns in (MAIN_NAMESPACE, None)
+            )
+
+    if "categorylinks" in dumps:
+        path = dumps["categorylinks"]
+        if "cl_to" in sql_dump_columns(path):
+            loader.add_categories(read_sql_dump(path, ["cl_from", "cl_to"]))
+        else:
+            if "linktarget" not in dumps:
+                raise ValueError("This categorylinks dump references categories by id; pass the linktarget dump too")
+            lookup = loader.conn.cursor()
+
+            def categories():
+                for page_id, target_id in read_sql_dump(path, ["cl_from", "cl_target_id"]):
+                    row = lookup.execute(
+                        "SELECT title FROM ingest_linktarget WHERE lt_id = ? AND namespace = ?",
+                        (target_id, CATEGORY_NAMESPACE),
+                    ).fetchone()
+                    if row is not None:
+                        yield page_id, row[0]
+
+            loader.add_categories(categories())
+
+
+def ingest_xml_dump(loader: DumpLoader, path: str):
+    # Pages, links and categories from a pages-articles XML dump, one page at a time
+    pending_links, pending_cats = [], []
+
+    def pages():
+        for page_id, namespace, title, redirect, text in read_xml_pages(path):
+            if namespace != MAIN_NAMESPACE:
+                continue
+            links, cats = wikitext_links(text)
+            if redirect:
+                links = [_normalize_link(redirect)]
+                cats = []
+            pending_links.extend((page_id, link) for link in links)
+            pending_cats.extend((page_id, cat) for cat in cats)
+            yield page_id, title.replace(" ", "_"), redirect is not None
+
+            if len(pending_links) >= BATCH_SIZE or len(pending_cats) >= BATCH_SIZE:
+                flush()
+
+    def flush():
+        loader.add_links(pending_links)
+        loader.add_categories(pending_cats)
+        pending_links.clear()
+        pending_cats.clear()
+
+    loader.add_pages(pages())
+    flush()
+
+
+def ingest_dumps(output_folder: str, paths: list[str], export_csv: bool = True, overwrite: bool = False) -> dict:
+    """
+    Load dump files (SQL table dumps and/or a pages-articles XML file) into
+    <output_folder>/WikiGraph.db, plus the nodes / edges CSV export unless export_csv is False.
+    Raises FileExistsError if the database already exists, unless overwrite is True.
+    Returns counts of what was read and stored.
+    """
+    sql_dumps = {}
+    xml_dumps = []
+    for path in paths:
+        if ".xml" in os.path.basename(path):
+            xml_dumps.append(path)
+        else:
+            sql_dumps[sql_dump_table(path)] = path
+    if sql_dumps and "page" not in sql_dumps:
+        raise ValueError("SQL dumps need the page table dump to resolve titles")
+
+    os.makedirs(output_folder, exist_ok=True)
+    db_path = os.path.join(output_folder, "WikiGraph.db")
+    if os.path.exists(db_path) and not overwrite:
+        raise FileExistsError(f"{db_path} already exists; pass overwrite=True (--overwrite) to replace it")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    loader = DumpLoader(db_path)
+    if sql_dumps:
+        ingest_sql_dumps(loader, sql_dumps)
+    for path in xml_dumps:
+        ingest_xml_dump(loader, path)
+    return loader.finish(export_csv=export_csv)
+
+
+def test_dump_ingest():
+    import ast
+    import tempfile
+
+    from shortest_path import find_shortest_path
+    from sqlite_interface import open_graph
+
+    print("Testing dump ingestion...")
+
+    fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "dumps")
+    expected_edges = [
+        ("%C3%89mile_Boutroux", "Poetry"),
+        ("Five_Nights_at_Freddy%27s", "Meter"),
+        ("Meter", "Rhyme"),
+        ("Poem", "Poetry"),
+        ("Poetry", "%C3%89mile_Boutroux"),
+        ("Poetry", "Poem"),
+        ("Poetry", "Rhyme"),
+        ("Rhyme", "Meter"),
+        ("Rhyme", "Poetry"),
+    ]
+    inputs = {
+        # Older layout: pagelinks by title, categorylinks by name
+        "legacy_sql": ["page.sql.gz", "pagelinks_legacy.sql.gz", "categorylinks.sql.gz"],
+        # Current layout: pagelinks by linktarget id
+        "sql": ["page.sql.gz", "pagelinks.sql.gz", "linktarget.sql.gz", "categorylinks.sql.gz"],
+        "xml": ["pages-articles.xml.bz2"],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, files in inputs.items():
+            folder = os.path.join(tmp, name)
+            counts = ingest_dumps(folder, [os.path.join(fixtures, file) for file in files])
+            assert(counts["nodes"] == 5 and counts["edges"] == len(expected_edges))
+
+            g = open_graph(os.path.join(folder, "WikiGraph.db"))
+            assert(g.get_all_edges() == expected_edges)
+            nodes = dict(g.get_all_nodes())
+            assert(sorted(nodes) == ["%C3%89mile_Boutroux", "Five_Nights_at_Freddy%27s", "Meter", "Poetry", "Rhyme"])
+            assert(ast.literal_eval(nodes["Poetry"]) == {"Poetry", "Literary genres"})
+            assert(ast.literal_eval(nodes["Meter"]) == set())
+            # Ingested articles count as crawled (check_if_visited is False for them), so a crawl
+            # resuming here won't fetch them again; redirects are left for the crawler to follow
+            assert(not g.check_if_visited("https://en.wikipedia.org/wiki/Rhyme"))
+            assert(g.check_if_visited("https://en.wikipedia.org/wiki/Poem"))
+            g.close_conn()
+
+            # Same CSV export as a crawl, usable by shortest_path and the analysis script
+            edges_csv = os.path.join(folder, "WikiGraph_edges.csv")
+            assert(os.path.exists(edges_csv))
+            assert(find_shortest_path(edges_csv, "Five_Nights_at_Freddy%27s", "%C3%89mile_Boutroux") == [
+                "Five_Nights_at_Freddy%27s", "Meter", "Rhyme", "Poetry", "%C3%89mile_Boutroux"
+            ])
+
+            # An existing database is only replaced when asked to
+            try:
+                ingest_dumps(folder, [os.path.join(fixtures, file) for file in files])
+                assert(False)
+            except FileExistsError:
+                pass
+            counts = ingest_dumps(folder, [os.path.join(fixtures, file) for file in files], overwrite=True)
+            assert(counts["nodes"] == 5)
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != "--overwrite"]
+    if len(args) > 1:
+        start = time.perf_counter()
+        counts = ingest_dumps(args[0], args[1:], overwrite="--overwrite" in sys.argv[1:])
+        print(f"Ingested {', '.join(args[1:])} into {args[0]} in {time.perf_counter() - start:.1f} s: {counts}")
+    else:
+        test_dump_ingest()
+        print("Tests passed good job!")
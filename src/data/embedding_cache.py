@@ -0,0 +1,166 @@
+"""
+Persistent store of title embeddings, shared by every crawl folder and every race.
+
+Titles like United_States or Wikipedia turn up as children on thousands of pages,
+so each one is embedded once per model and read back afterwards:
+    CREATE TABLE IF NOT EXISTS embeddings (
+        model  TEXT,
+        title  TEXT,
+        vector BLOB,     -- float16, unit length
+        PRIMARY KEY (model, title)
+    )
+
+Lookups go through an in-memory LRU of the most recently used vectors first, then one SELECT
+per chunk of titles. Entries are keyed by normalize_title(), which is also the text the model embeds
+(see sentence_transformer.TargetScorer), so every spelling of a title gets the same vector.
+"""
+
+import os
+import sqlite3 as sql
+from collections import OrderedDict
+from urllib.parse import unquote
+
+import numpy as np
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache.db")
+
+# SQLite caps the number of ? parameters per statement
+_CHUNK = 500
+
+# Vectors kept in memory (about 3 KB each for a 768-dim model)
+MEMORY_ENTRIES = 20_000
+
+
+def normalize_title(title: str) -> str:
+    # Harry_Potter, Harry Potter and Harry%20Potter share one entry
+    return unquote(title).strip().replace(" ", "_")
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, db_path: str = DEFAULT_EMBEDDING_CACHE_PATH, memory_entries: int = MEMORY_ENTRIES):
+        self.model_name = model_name
+        self.db_path = db_path
+        self.conn = sql.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT,
+            title TEXT,
+            vector BLOB,
+            PRIMARY KEY (model, title)
+        ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+        self.memory_entries = memory_entries
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def close_conn(self):
+        self.conn.close()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, titles: list[str]) -> dict[str, np.ndarray]:
+        # Cached float32 vectors for whichever of titles have one (keyed by the title as given)
+        keys = {title: normalize_title(title) for title in titles}
+        vectors = {}
+        to_load = []
+        for key in dict.fromkeys(keys.values()):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                vectors[key] = self._memory[key]
+            else:
+                to_load.append(key)
+
+        for i in range(0, len(to_load), _CHUNK):
+            chunk = to_load[i:i + _CHUNK]
+            rows = self.conn.execute(
+                f"SELECT title, vector FROM embeddings WHERE model = ? AND title IN ({','.join('?' * len(chunk))})",
+                (self.model_name, *chunk),
+            ).fetchall()
+            for key, blob in rows:
+                vectors[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                self._remember(key, vectors[key])
+
+        found = {title: vectors[key] for title, key in keys.items() if key in vectors}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, embeddings: dict[str, np.ndarray]):
+        rows = []
+        for title, vector in embeddings.items():
+            key = normalize_title(title)
+            vector = np.asarray(vector, dtype=np.float16)
+            self._remember(key, vector.astype(np.float32))
+            rows.append((self.model_name, key, vector.tobytes()))
+
+        self.conn.executemany("INSERT OR REPLACE INTO embeddings (model, title, vector) VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?", (self.model_name,)).fetchone()
+        return count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def test_embedding_cache():
+    print("Testing embedding cache...")
+
+    if os.path.exists("test_embeddings.db"):
+        os.remove("test_embeddings.db")
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((3, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    cache = EmbeddingCache("model-a", "test_embeddings.db")
+    assert(cache.get_many(["United_States"]) == {})
+    cache.put_many({"United_States": vectors[0], "Harry Potter": vectors[1]})
+
+    found = cache.get_many(["United_States", "Harry_Potter", "Harry%20Potter", "Wikipedia"])
+    assert(set(found) == {"United_States", "Harry_Potter", "Harry%20Potter"})
+    # float16 storage, close enough for ranking
+    assert(np.abs(found["United_States"] - vectors[0]).max() < 1e-3)
+    assert(cache.stats()["hits"] == 3)
+    assert(cache.stats()["misses"] == 2)
+    cache.close_conn()
+
+    # Persisted, and kept apart per model
+    cache = EmbeddingCache("model-a", "test_embeddings.db")
+    assert(len(cache) == 2)
+    assert(np.abs(cache.get_many(["Harry_Potter"])["Harry_Potter"] - vectors[1]).max() < 1e-3)
+    cache.close_conn()
+
+    # Memory is capped; evicted vectors are read back from SQLite
+    cache = EmbeddingCache("model-a", "test_embeddings.db", memory_entries=1)
+    found = cache.get_many(["United_States", "Harry_Potter"])
+    assert(len(cache._memory) == 1 and set(found) == {"United_States", "Harry_Potter"})
+    assert(np.abs(cache.get_many(["United_States"])["United_States"] - vectors[0]).max() < 1e-3)
+    cache.close_conn()
+
+    cache = EmbeddingCache("model-b", "test_embeddings.db")
+    assert(cache.get_many(["Harry_Potter"]) == {})
+    cache.close_conn()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_embeddings.db" + suffix):
+            os.remove("test_embeddings.db" + suffix)
+
+
+if __name__ == '__main__':
+    test_embedding_cache()
+    print("Tests passed good job!")
@@ -0,0 +1,425 @@
+"""
+Binary CSR snapshot of a crawl's link graph, shared by shortest_path and the analysis script.
+
+Parsing WikiGraph_edges.csv row by row into dicts costs seconds on the larger crawls,
+so the graph is written once to a folder next to its source
+(WikiGraph_edges.csv -> WikiGraph_edges.csr/, WikiGraph.db -> WikiGraph.csr/).
+Each build goes to its own build-*/ subfolder and the "current" file names the live one:
+    meta.json          source stamp (mtime / size), node and edge counts
+    titles.npy         uint8, every title utf-8 encoded, "\n" separated, in sorted order
+    title_offsets.npy  int64[n + 1], byte offset of each title in titles.npy
+    offsets.npy        int64[n + 1], CSR row offsets: node i links to targets[offsets[i]:offsets[i + 1]]
+    targets.npy        int32[m], target node ids, sorted within each row, no duplicates
+    reverse_offsets.npy, reverse_targets.npy
+                       the same for in-links (node i is linked from reverse_targets[...]), for backward search
+    weights.npy        float32[m], only when the CSV has a Weight column
+
+Node ids are ranks in sorted title order, so lower ids sort first exactly like the titles.
+Arrays are memory-mapped on load and the snapshot is rebuilt whenever the source
+file (or its -wal file) changes. A rebuild only swaps the "current" file, since Windows
+won't delete or rename the folder of a snapshot that is still mapped; older builds are
+removed once nothing has them open.
+"""
+
+import csv
+import json
+import os
+import shutil
+import sqlite3 as sql
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = ".csr"
+CURRENT_FILE = "current"
+
+
+def snapshot_path(source: str) -> str:
+    return os.path.splitext(source)[0] + SNAPSHOT_SUFFIX
+
+
+def current_build(path: str) -> str:
+    # Folder of the live build under a snapshot folder, or path itself when it is a build folder
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except OSError:
+        return path
+
+
+def source_stamp(source: str) -> list:
+    # mtime and size of the source, plus its WAL file so uncheckpointed writes count too
+    stamp = []
+    for path in (source, source + "-wal"):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stamp.append([os.path.basename(path), stat.st_mtime_ns, stat.st_size])
+    return stamp
+
+
+class TitleTable(Sequence):
+    # Node id -> title over the packed title blob, without decoding every title up front
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def _raw(self, i: int) -> bytes:
+        # Each title is followed by a "\n" (or the end of the blob)
+        return self._blob[self._offsets[i]:self._offsets[i + 1] - 1].tobytes()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._raw(i).decode("utf-8")
+
+    def index(self, title: str) -> int:
+        # Binary search; titles are stored in sorted order
+        key = title.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._raw(lo) == key:
+            return lo
+        raise ValueError(f"{title!r} is not in the graph")
+
+    def __contains__(self, title) -> bool:
+        try:
+            self.index(title)
+        except ValueError:
+            return False
+        return True
+
+    def tolist(self) -> list[str]:
+        if not len(self):
+            return []
+        return self._blob.tobytes().decode("utf-8").split("\n")
+
+
+class GraphSnapshot(Mapping):
+    """
+    Directed graph over integer node ids (CSR arrays), with titles kept in a TitleTable.
+
+    It is also a read-only mapping title -> [(neighbor title, weight), ...], the same shape
+    read_edge_list used to return, so shortest_path() runs on it unchanged.
+    """
+
+    def __init__(self, path: str, weighted: bool = False):
+        path = current_build(path)
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.offsets = load("offsets.npy")
+        self.targets = load("targets.npy")
+        self.reverse_offsets = load("reverse_offsets.npy")
+        self.reverse_targets = load("reverse_targets.npy")
+        self.titles = TitleTable(load("titles.npy"), load("title_offsets.npy"))
+        self.weights = load("weights.npy") if weighted and self.meta["weighted"] else None
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def node_id(self, title: str) -> int:
+        try:
+            return self.titles.index(title)
+        except ValueError:
+            raise KeyError(title) from None
+
+    def neighbors(self, node: int) -> np.ndarray:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def out_degrees(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def in_degrees(self) -> np.ndarray:
+        return np.diff(self.reverse_offsets)
+
+    def gather(self, nodes: np.ndarray, reverse: bool = False) -> tuple[np.ndarray, np.ndarray]:
+        # Every out-edge (in-edge if reverse) of nodes as parallel (node, neighbor) arrays,
+        # nodes in the order given and neighbors sorted within each node
+        offsets, targets = (self.reverse_offsets, self.reverse_targets) if reverse else (self.offsets, self.targets)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = offsets[nodes]
+        counts = offsets[nodes + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        # Position of each edge in targets: its row start plus its place within the row
+        run_starts = np.cumsum(counts) - counts
+        index = np.repeat(starts - run_starts, counts) + np.arange(total)
+        return np.repeat(nodes, counts), targets[index]
+
+    def edge_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        # (sources, targets) as parallel id arrays
+        sources = np.repeat(np.arange(self.num_nodes, dtype=np.int32), self.out_degrees())
+        return sources, np.asarray(self.targets)
+
+    def __getitem__(self, title: str) -> list[tuple[str, float]]:
+        node = self.node_id(title)
+        start, end = self.offsets[node], self.offsets[node + 1]
+        titles = self.titles
+        if self.weights is None:
+            return [(titles[int(j)], 1.0) for j in self.targets[start:end]]
+        return [(titles[int(j)], float(w)) for j, w in zip(self.targets[start:end], self.weights[start:end])]
+
+    def __contains__(self, title) -> bool:
+        return title in self.titles
+
+    def __iter__(self):
+        return iter(self.titles.tolist())
+
+    def __len__(self) -> int:
+        return self.num_nodes
+
+
+def _read_csv_edges(csv_file: str):
+    # (source, target, weight or None) rows; exports are utf-8 but older ones were saved as cp1252
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            with open(csv_file, newline="", encoding=encoding) as f:
+                rows = []
+                reader = csv.DictReader(f)
+                has_weight = "Weight" in (reader.fieldnames or [])
+                for row in reader:
+                    rows.append((row["Source"], row["Target"], float(row["Weight"]) if has_weight else None))
+                return rows, has_weight
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Could not decode {csv_file}")
+
+
+def _read_db_edges(db_path: str):
+    # Title pairs from either WikiGraph.db schema
+    from sqlite_interface import is_interned_db
+
+    conn = sql.connect(db_path)
+    try:
+        if is_interned_db(db_path):
+            rows = conn.execute("""
+                SELECT origin.title, target.title FROM edges
+                JOIN pages AS origin ON origin.page_id = edges.origin_id
+                JOIN pages AS target ON target.page_id = edges.target_id
+            """).fetchall()
+        else:
+            rows = conn.execute("SELECT origin_page, referenced_page FROM edge_list").fetchall()
+    finally:
+        conn.close()
+    return [(u, v, None) for u, v in rows], False
+
+
+def build_snapshot(source: str, path: str = None) -> str:
+    """
+    Write the CSR snapshot for a WikiGraph_edges.csv or WikiGraph.db and return its folder.
+    """
+    path = path or snapshot_path(source)
+    stamp = source_stamp(source)
+    if source.endswith(".db"):
+        rows, weighted = _read_db_edges(source)
+    else:
+        rows, weighted = _read_csv_edges(source)
+
+    # Intern titles in first-seen order, then renumber by sorted title
+    ids = {}
+    sources = array("q")
+    targets = array("q")
+    weights = array("f")
+    for u, v, w in rows:
+        sources.append(ids.setdefault(u, len(ids)))
+        targets.append(ids.setdefault(v, len(ids)))
+        if weighted:
+            weights.append(w)
+    del rows
+
+    titles = sorted(ids)
+    if any("\n" in title for title in titles):
+        raise ValueError("Page titles cannot contain newlines")
+    n = len(titles)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.fromiter((ids[title] for title in titles), dtype=np.int64, count=n)] = np.arange(n)
+    del ids
+
+    # Sort edges by (source, target) and drop duplicates (older databases repeat re-crawled edges)
+    src = rank[np.frombuffer(sources, dtype=np.int64)] if n else np.zeros(0, dtype=np.int64)
+    dst = rank[np.frombuffer(targets, dtype=np.int64)] if n else np.zeros(0, dtype=np.int64)
+    keys, first = np.unique(src * n + dst, return_index=True)
+    src, dst = keys // max(n, 1), keys % max(n, 1)
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+
+    reverse_order = np.lexsort((src, dst))
+    reverse_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=n), out=reverse_offsets[1:])
+
+    encoded = [title.encode("utf-8") for title in titles]
+    title_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(t) + 1 for t in encoded), dtype=np.int64, count=n), out=title_offsets[1:])
+    blob = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+
+    # Write a new build folder and point "current" at it, so readers never see half a snapshot
+    os.makedirs(path, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix="build-", dir=path)
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_path, "targets.npy"), dst.astype(np.int32))
+    np.save(os.path.join(tmp_path, "reverse_offsets.npy"), reverse_offsets)
+    np.save(os.path.join(tmp_path, "reverse_targets.npy"), src[reverse_order].astype(np.int32))
+    np.save(os.path.join(tmp_path, "titles.npy"), blob)
+    np.save(os.path.join(tmp_path, "title_offsets.npy"), title_offsets)
+    if weighted:
+        np.save(os.path.join(tmp_path, "weights.npy"), np.frombuffer(weights, dtype=np.float32)[first])
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "source": os.path.basename(source),
+            "source_stamp": stamp,
+            "nodes": n,
+            "edges": len(keys),
+            "weighted": weighted,
+        }, f)
+
+    pointer = os.path.join(path, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(tmp_path))
+    os.replace(pointer + ".tmp", pointer)
+    _remove_old_builds(path, os.path.basename(tmp_path))
+    return path
+
+
+def _remove_old_builds(path: str, keep: str):
+    # Everything but the live build; what is still mapped (on Windows) stays until a later rebuild
+    for entry in os.listdir(path):
+        if entry in (CURRENT_FILE, keep):
+            continue
+        entry_path = os.path.join(path, entry)
+        if os.path.isdir(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+        else:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+
+
+def is_snapshot_current(source: str, path: str = None) -> bool:
+    path = path or snapshot_path(source)
+    try:
+        with open(os.path.join(current_build(path), "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == SNAPSHOT_VERSION and meta.get("source_stamp") == source_stamp(source)
+
+
+def load_snapshot(source: str, weighted: bool = False, rebuild: bool = False) -> GraphSnapshot:
+    """
+    Open the snapshot for source (a WikiGraph_edges.csv or WikiGraph.db), building it first if it
+    is missing or older than the source.
+    """
+    if not os.path.isfile(source):
+        raise FileNotFoundError(source)
+    path = snapshot_path(source)
+    if rebuild or not is_snapshot_current(source, path):
+        build_snapshot(source, path)
+    return GraphSnapshot(path, weighted=weighted)
+
+
+def test_graph_snapshot():
+    import tempfile
+    import time
+
+    from sqlite_interface import GraphInterface, InternedGraphInterface
+
+    print("Testing graph snapshot...")
+
+    edges = [("b", "c"), ("a", "b"), ("a", "c"), ("a", "b"), ("c", "%C3%86thelstan"), ("Z", "a")]
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "WikiGraph_edges.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Source", "Target"])
+            writer.writerows(edges)
+
+        graph = load_snapshot(csv_path)
+        assert(os.path.isdir(os.path.join(tmp, "WikiGraph_edges.csr")))
+        assert(graph.titles.tolist() == ["%C3%86thelstan", "Z", "a", "b", "c"])
+        assert(graph.num_nodes == 5)
+        # The duplicate a -> b is dropped
+        assert(graph.num_edges == 5)
+        assert(graph["a"] == [("b", 1.0), ("c", 1.0)])
+        assert(graph.get("%C3%86thelstan", []) == [])
+        assert(graph.get("missing", []) == [])
+        assert("Z" in graph and "missing" not in graph)
+        assert(graph.titles[graph.node_id("c")] == "c")
+        sources, targets = graph.edge_arrays()
+        pairs = {(graph.titles[int(u)], graph.titles[int(v)]) for u, v in zip(sources, targets)}
+        assert(pairs == set(edges))
+        # In-links of b (from a) and of c (from a and b)
+        nodes, linked_from = graph.gather([graph.node_id("b"), graph.node_id("c")], reverse=True)
+        assert([graph.titles[int(u)] for u in linked_from] == ["a", "a", "b"])
+        assert(graph.in_degrees().sum() == graph.num_edges)
+
+        # Unchanged source -> reused, touched source -> rebuilt
+        assert(is_snapshot_current(csv_path))
+        time.sleep(0.01)
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(["c", "d"])
+        assert(not is_snapshot_current(csv_path))
+        assert(load_snapshot(csv_path)["c"] == [("%C3%86thelstan", 1.0), ("d", 1.0)])
+        # The rebuild went to a new folder: the open snapshot still reads, and only one build is left
+        assert(graph["c"] == [("%C3%86thelstan", 1.0)])
+        snapshot_dir = os.path.join(tmp, "WikiGraph_edges.csr")
+        assert(sorted(os.listdir(snapshot_dir))[1:] == [CURRENT_FILE])
+        # A build folder opens directly, as the shortest_path workers do
+        assert(GraphSnapshot(load_snapshot(csv_path).path).num_nodes == 6)
+
+        # Weight column
+        weighted_path = os.path.join(tmp, "weighted.csv")
+        with open(weighted_path, "w", newline="", encoding="utf-8") as f:
+            f.write("Source,Target,Weight\na,b,2.5\nb,c,1\n")
+        assert(load_snapshot(weighted_path, weighted=True)["a"] == [("b", 2.5)])
+        assert(load_snapshot(weighted_path)["a"] == [("b", 1.0)])
+
+        # Both database schemas give the same graph
+        for cls in (GraphInterface, InternedGraphInterface):
+            db_path = os.path.join(tmp, cls.__name__ + ".db")
+            g = cls(db_path)
+            g.create_tables()
+            for u, v in edges:
+                g.add_edge(u, v)
+            g.close_conn()
+            graph = load_snapshot(db_path)
+            assert(graph.titles.tolist() == ["%C3%86thelstan", "Z", "a", "b", "c"])
+            assert(graph["a"] == [("b", 1.0), ("c", 1.0)])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # python graph_snapshot.py <WikiGraph_edges.csv | WikiGraph.db> ...
+        for source in sys.argv[1:]:
+            path = build_snapshot(source)
+            graph = GraphSnapshot(path)
+            print(f"{source}: {graph.num_nodes} nodes, {graph.num_edges} edges -> {path}")
+    else:
+        test_graph_snapshot()
+        print("Tests passed good job!")
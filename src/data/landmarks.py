@@ -0,0 +1,343 @@
+"""
+Landmark (ALT) distance index for fast repeated path queries on one crawl.
+
+k landmark pages are picked and BFS distances are stored from every landmark to every
+page, d(L, v), and from every page to every landmark, d(v, L). For any landmark L the
+triangle inequality gives
+    d(v, t) >= max(d(L, t) - d(L, v), d(v, L) - d(t, L))
+which is an admissible (and consistent) A* heuristic for reaching t.
+
+The index is written inside the graph snapshot folder, so it is dropped together with
+the snapshot whenever the source CSV / database changes:
+    <snapshot>/landmarks/meta.json           landmark ids and titles, dtype
+    <snapshot>/landmarks/from_landmarks.npy  uint8 or uint16 [n, k], d(L, v)
+    <snapshot>/landmarks/to_landmarks.npy    uint8 or uint16 [n, k], d(v, L)
+The largest value of the dtype stands for "unreachable".
+
+Build and report:  python landmarks.py build <WikiGraph_edges.csv | WikiGraph.db> [k]
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from graph_snapshot import load_snapshot
+from shortest_path import bfs_distances, bfs_path
+
+DEFAULT_LANDMARKS = 8
+LANDMARK_DIR = "landmarks"
+
+
+def select_landmarks(graph, k: int) -> tuple[list[int], list[np.ndarray]]:
+    # Farthest-first over crawled pages (the ones with out-links): start from the best linked page,
+    # then keep adding a page no landmark reaches yet, or else the one farthest from all of them.
+    # Returns the landmark ids and their forward distance arrays.
+    out_degrees = graph.out_degrees()
+    degrees = out_degrees + graph.in_degrees()
+    candidates = out_degrees > 0 if out_degrees.any() else np.ones(graph.num_nodes, dtype=bool)
+
+    unreached = np.iinfo(np.int32).max
+    nearest = np.full(graph.num_nodes, unreached, dtype=np.int64)
+    landmarks, forward = [], []
+
+    while len(landmarks) < min(k, int(candidates.sum())):
+        open_candidates = candidates.copy()
+        open_candidates[landmarks] = False
+        far = open_candidates & (nearest == unreached)
+        if not landmarks or far.any():
+            pick = int(np.argmax(np.where(far if landmarks else open_candidates, degrees, -1)))
+        else:
+            score = np.where(open_candidates, nearest, -1)
+            farthest = score.max()
+            if farthest <= 0:
+                break
+            # Ties (common: crawled pages sit a hop or two from the seed) go to the best linked page
+            pick = int(np.argmax(np.where(score == farthest, degrees, -1)))
+
+        dist = bfs_distances(graph, pick)
+        reached = dist >= 0
+        nearest[reached] = np.minimum(nearest[reached], dist[reached])
+        landmarks.append(pick)
+        forward.append(dist)
+
+    return landmarks, forward
+
+
+def _pack(distances: list[np.ndarray]) -> np.ndarray:
+    # [n, k] array in the smallest unsigned dtype that fits, max value = unreachable
+    stacked = np.stack(distances, axis=1)
+    longest = int(stacked.max()) if stacked.size else 0
+    dtype = np.uint8 if longest < np.iinfo(np.uint8).max else np.uint16
+    if longest >= np.iinfo(np.uint16).max:
+        dtype = np.uint32
+    packed = stacked.astype(dtype)
+    packed[stacked < 0] = np.iinfo(dtype).max
+    return np.ascontiguousarray(packed)
+
+
+def build_landmarks(graph, k: int = DEFAULT_LANDMARKS) -> "LandmarkIndex":
+    path = os.path.join(graph.path, LANDMARK_DIR)
+    landmarks, forward = select_landmarks(graph, k)
+    backward = [bfs_distances(graph, landmark, reverse=True) for landmark in landmarks]
+    from_landmarks, to_landmarks = _pack(forward), _pack(backward)
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "from_landmarks.npy"), from_landmarks)
+    np.save(os.path.join(tmp_path, "to_landmarks.npy"), to_landmarks)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "k": k,
+            "landmarks": landmarks,
+            "titles": [graph.titles[node] for node in landmarks],
+            "dtype": from_landmarks.dtype.name,
+        }, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return LandmarkIndex(graph, path)
+
+
+class LandmarkIndex:
+    # Landmark distance arrays for one GraphSnapshot, memory-mapped
+    def __init__(self, graph, path: str):
+        self.graph = graph
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.landmarks = self.meta["landmarks"]
+        self.from_landmarks = np.load(os.path.join(path, "from_landmarks.npy"), mmap_mode="r")
+        self.to_landmarks = np.load(os.path.join(path, "to_landmarks.npy"), mmap_mode="r")
+        self.unreachable = np.iinfo(self.from_landmarks.dtype).max
+
+    @property
+    def nbytes(self) -> int:
+        return self.from_landmarks.nbytes + self.to_landmarks.nbytes
+
+    def _distances(self, table: np.ndarray, nodes) -> np.ndarray:
+        # Rows of table as float32 with inf for unreachable
+        rows = table[nodes]
+        dist = rows.astype(np.float32)
+        dist[rows == self.unreachable] = np.inf
+        return dist
+
+    def lower_bounds(self, nodes, target: int) -> np.ndarray:
+        # Lower bound on d(v, target) for each id in nodes; inf means target can't be reached from v
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if not self.landmarks:
+            return np.zeros(len(nodes), dtype=np.float32)
+        from_v = self._distances(self.from_landmarks, nodes)
+        to_v = self._distances(self.to_landmarks, nodes)
+        from_t = self._distances(self.from_landmarks, [target])
+        to_t = self._distances(self.to_landmarks, [target])
+
+        # inf - inf (landmark reaches neither / neither reaches it) is NaN and tells nothing; fmax skips it
+        with np.errstate(invalid="ignore"):
+            bounds = np.fmax(from_t - from_v, to_v - to_t)
+        return np.fmax(np.fmax.reduce(bounds, axis=1), 0)
+
+    def heuristic(self, goal: str):
+        # Title -> lower bound on the hops left to goal, for shortest_path(..., heuristic=...)
+        if goal not in self.graph:
+            return lambda title: 0
+        target = self.graph.node_id(goal)
+        cache = {}
+
+        def h(title):
+            if title not in cache:
+                try:
+                    cache[title] = float(self.lower_bounds([self.graph.node_id(title)], target)[0])
+                except KeyError:
+                    cache[title] = 0
+            return cache[title]
+
+        return h
+
+
+def load_landmarks(source: str, k: int = DEFAULT_LANDMARKS, rebuild: bool = False) -> LandmarkIndex:
+    """
+    Open the landmark index for source (a WikiGraph_edges.csv or WikiGraph.db), building the
+    snapshot and / or the index first if they are missing, stale or were built with another k.
+    """
+    graph = load_snapshot(source)
+    path = os.path.join(graph.path, LANDMARK_DIR)
+    if not rebuild:
+        try:
+            index = LandmarkIndex(graph, path)
+            if index.meta["k"] == k:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    return build_landmarks(graph, k)
+
+
+def alt_path(graph, index: LandmarkIndex, start, goal, stats=None):
+    # Unweighted A* with landmark bounds on the CSR arrays. Costs are whole hops, so the open list
+    # is a set of buckets keyed by f = g + h, and every page in the lowest bucket is expanded in one
+    # numpy step (the bounds are consistent, so expanding never adds to a lower bucket). Pages the
+    # bounds prove can't reach goal (h = inf) are never queued. Returns a shortest path, though
+    # among equally short paths it may pick a different one than bfs_path.
+    # stats, if given, gets the number of nodes expanded and edges scanned.
+    if stats is not None:
+        stats.update(expanded=0, edges_scanned=0)
+    if start == goal:
+        return 0, [start]
+    try:
+        source, target = graph.node_id(start), graph.node_id(goal)
+    except KeyError:
+        return float("inf"), []
+
+    start_bound = float(index.lower_bounds([source], target)[0])
+    if start_bound == np.inf:
+        return float("inf"), []
+
+    dist = np.full(graph.num_nodes, -1, dtype=np.int32)
+    dist[source] = 0
+    parent = np.full(graph.num_nodes, -1, dtype=np.int32)
+    parent[source] = source
+    closed = np.zeros(graph.num_nodes, dtype=bool)
+    buckets = {int(start_bound): [np.array([source], dtype=np.int64)]}
+    expanded = scanned = 0
+    found = False
+
+    while buckets and not found:
+        wave = np.unique(np.concatenate(buckets.pop(min(buckets))))
+        wave = wave[~closed[wave]]
+        found = bool((wave == target).any())
+        if found:
+            break
+        closed[wave] = True
+        expanded += wave.size
+
+        nodes, neighbors = graph.gather(wave)
+        scanned += len(neighbors)
+        g_cost = dist[nodes] + 1
+        better = (dist[neighbors] == -1) | (g_cost < dist[neighbors])
+        nodes, neighbors, g_cost = nodes[better], neighbors[better], g_cost[better]
+        # One entry per page: lowest g, then smallest-id parent
+        order = np.lexsort((nodes, g_cost, neighbors))
+        neighbors, first = np.unique(neighbors[order], return_index=True)
+        nodes, g_cost = nodes[order][first], g_cost[order][first]
+        dist[neighbors] = g_cost
+        parent[neighbors] = nodes
+
+        f_cost = g_cost + index.lower_bounds(neighbors, target)
+        reachable = f_cost != np.inf
+        neighbors, f_cost = neighbors[reachable], f_cost[reachable].astype(np.int64)
+        for f in np.unique(f_cost).tolist():
+            buckets.setdefault(f, []).append(neighbors[f_cost == f])
+
+    if stats is not None:
+        stats.update(expanded=expanded, edges_scanned=scanned)
+    if not found:
+        return float("inf"), []
+
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parent[path[-1]]))
+    path.reverse()
+    return float(dist[target]), [graph.titles[node] for node in path]
+
+
+def landmark_report(index: LandmarkIndex, pairs: int = 200, seed: int = 0) -> dict:
+    # Size of the index and how tight its bounds are on random (crawled page, any page) pairs
+    graph = index.graph
+    rng = random.Random(seed)
+    sources = np.flatnonzero(graph.out_degrees() > 0).tolist() or list(range(graph.num_nodes))
+
+    reachable = exact = unreachable = unreachable_detected = 0
+    ratios = []
+    for _ in range(pairs):
+        source, target = rng.choice(sources), rng.randrange(graph.num_nodes)
+        distance, _ = bfs_path(graph, graph.titles[source], graph.titles[target])
+        bound = float(index.lower_bounds([source], target)[0])
+        if distance == float("inf"):
+            unreachable += 1
+            unreachable_detected += bound == np.inf
+        else:
+            reachable += 1
+            if distance:
+                ratios.append(bound / distance)
+            exact += bound == distance
+
+    return {
+        "k": len(index.landmarks),
+        "landmarks": index.meta["titles"],
+        "nodes": graph.num_nodes,
+        "bytes": index.nbytes,
+        "bytes_per_node": index.nbytes / max(graph.num_nodes, 1),
+        "pairs": pairs,
+        "mean_bound_ratio": float(np.mean(ratios)) if ratios else 1.0,
+        "exact_share": exact / reachable if reachable else 1.0,
+        "unreachable_detected_share": unreachable_detected / unreachable if unreachable else 1.0,
+    }
+
+
+def test_landmarks():
+    import tempfile
+
+    from shortest_path import shortest_path
+
+    print("Testing landmark index...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "WikiGraph_edges.csv")
+        shutil.copy(os.path.join("Poetry", "WikiGraph_edges.csv"), csv_path)
+
+        index = load_landmarks(csv_path, k=4)
+        graph = index.graph
+        assert(len(index.landmarks) == 4 and len(set(index.landmarks)) == 4)
+        assert(index.from_landmarks.shape == (graph.num_nodes, 4))
+
+        # Admissible everywhere, and inf only where goal really can't be reached
+        all_nodes = np.arange(graph.num_nodes)
+        for target in range(0, graph.num_nodes, 701):
+            true = bfs_distances(graph, target, reverse=True)
+            bounds = index.lower_bounds(all_nodes, target)
+            reachable = true >= 0
+            assert((bounds[reachable] <= true[reachable]).all())
+            assert((~reachable[bounds == np.inf]).all())
+
+        # Same distances as BFS, through alt_path and through shortest_path's heuristic hook
+        titles = graph.titles.tolist()
+        for start in [titles[i] for i in np.flatnonzero(graph.out_degrees() > 0)[::40]]:
+            for goal in titles[::613]:
+                distance, path = bfs_path(graph, start, goal)
+                alt_distance, alt = alt_path(graph, index, start, goal)
+                assert(alt_distance == distance and len(alt) == len(path))
+                if path:
+                    assert(alt[0] == start and alt[-1] == goal)
+                    assert(all(b in dict(graph[a]) for a, b in zip(alt, alt[1:])))
+                astar_distance, _ = shortest_path(graph, start, goal, heuristic=index.heuristic(goal))
+                assert(astar_distance == distance)
+
+        # Reused as is, rebuilt for another k
+        assert(load_landmarks(csv_path, k=4).landmarks == index.landmarks)
+        assert(len(load_landmarks(csv_path, k=2).landmarks) == 2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == "build":
+        # python landmarks.py build <WikiGraph_edges.csv | WikiGraph.db> [k]
+        source = sys.argv[2]
+        k = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_LANDMARKS
+        start = time.perf_counter()
+        index = load_landmarks(source, k=k, rebuild=True)
+        build_time = time.perf_counter() - start
+        report = landmark_report(index)
+        print(f"Built {report['k']} landmarks for {source} in {build_time:.2f} s: {', '.join(report['landmarks'])}")
+        print(f"  size      {report['bytes'] / 1024:.1f} KiB ({report['bytes_per_node']:.1f} bytes per page)")
+        print(
+            f"  accuracy  bound / true distance {report['mean_bound_ratio']:.2f} on average, "
+            f"exact for {report['exact_share']:.0%} of reachable pairs, "
+            f"{report['unreachable_detected_share']:.0%} of unreachable pairs caught"
+        )
+    else:
+        test_landmarks()
+        print("Tests passed good job!")
@@ -1,24 +1,88 @@
 """
 Graphical UI (Tkinter) for the WikiRace crawl.
 Shows current page, queue/visited counts, and a nested relationships tree.
+
+Long crawls send thousands of progress events, each with a few hundred links, so the tree only
+keeps the last `max_pages` crawled pages (oldest rows are dropped), a page's links are only
+inserted as rows once it is expanded, and each poll handles events for at most FRAME_BUDGET_MS
+before giving the main loop back, updating the labels and rows once for everything it handled.
+Rows that were opened (by the user or "Expand all") are filled in the same budgeted polls.
 """
 
+import sys
 import threading
+import time
 import tkinter as tk
+from itertools import islice
 from tkinter import messagebox, ttk
 from queue import Queue, Empty
 
 from create_wiki_graph import crawl
 import create_wiki_graph
 
+# Crawled pages kept in the tree
+MAX_PAGES = 2000
+# Time spent handling events per poll, and the delay between polls (shorter while events are waiting)
+FRAME_BUDGET_MS = 30
+POLL_MS = 200
+BUSY_POLL_MS = 10
+# Text of the stand-in row that gives a collapsed page its expand arrow
+PLACEHOLDER = "..."
+
+
+class PageWindow:
+    # The last max_pages crawled pages and their children, in crawl order, without any Tk state
+    def __init__(self, max_pages: int = MAX_PAGES):
+        self.max_pages = max_pages
+        self.total = 0
+        # page -> children (a dict as an insertion-ordered set)
+        self.children: dict[str, dict[str, None]] = {}
+
+    def add(self, page: str, children) -> list[str]:
+        # Add a crawled page's children (a page seen again keeps its place and gains the new ones);
+        # returns the pages dropped to stay under max_pages
+        if page not in self.children:
+            self.children[page] = {}
+            self.total += 1
+        self.children[page].update(dict.fromkeys(children))
+
+        evicted = []
+        while len(self.children) > self.max_pages:
+            oldest = next(iter(self.children))
+            del self.children[oldest]
+            evicted.append(oldest)
+        return evicted
+
+    def clear(self):
+        self.total = 0
+        self.children.clear()
+
+    def __contains__(self, page) -> bool:
+        return page in self.children
+
+    def __len__(self) -> int:
+        return len(self.children)
+
 
 class LivePageUI:
     # Tkinter UI renders parent->children tree
-    def __init__(self):
+    def __init__(self, max_pages: int = MAX_PAGES):
         self.events = Queue()
         self.running = False
-        self.seen_edges = set()
-        self.parent_children: dict[str, set[str]] = {}
+        self.pages = PageWindow(max_pages)
+
+        # page -> tree item id, and back
+        self.item_ids: dict[str, str] = {}
+        self.item_pages: dict[str, str] = {}
+        # item id -> how many of the page's children are inserted, for pages that were expanded
+        self.shown_children: dict[str, int] = {}
+        # Opened rows still showing the placeholder, filled a few per poll
+        self.to_fill: dict[str, None] = {}
+
+        # Handled this poll, applied to the widgets once at its end
+        self.dirty_pages: dict[str, None] = {}
+        self.evicted_pages: list[str] = []
+        self.status = None
 
         self.root = tk.Tk()
         self.root.title("WikiRace")
@@ -42,11 +106,15 @@ class LivePageUI:
         self.nodes_var = tk.StringVar(value="25")
         ttk.Entry(frame, textvariable=self.nodes_var, width=15).grid(row=1, column=1, sticky="w", padx=5, pady=5)
 
+        ttk.Label(frame, text="Pages kept in tree:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+        self.max_pages_var = tk.StringVar(value=str(self.pages.max_pages))
+        ttk.Entry(frame, textvariable=self.max_pages_var, width=15).grid(row=2, column=1, sticky="w", padx=5, pady=5)
+
         self.start_btn = ttk.Button(frame, text="Start crawl", command=self.start_crawl)
-        self.start_btn.grid(row=2, column=1, columnspan=2, pady=8,)
+        self.start_btn.grid(row=3, column=1, columnspan=2, pady=8,)
 
         self.cancel_btn = ttk.Button(frame, text="End crawl", command=self.cancel_crawl, state="disabled")
-        self.cancel_btn.grid(row=3, column=1, columnspan=2, pady=8)
+        self.cancel_btn.grid(row=4, column=1, columnspan=2, pady=8)
 
     def _build_status(self):
         frame = ttk.LabelFrame(self.root, text="Status")
@@ -66,11 +134,13 @@ class LivePageUI:
 
 
     def _build_relationships(self):
-        frame = ttk.LabelFrame(self.root, text="Pages")
+        self.pages_frame = frame = ttk.LabelFrame(self.root, text="Pages")
         frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.relation_tree = ttk.Treeview(frame, show="tree", height=16)
         self.relation_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        # Children are only inserted when their page is opened
+        self.relation_tree.bind("<<TreeviewOpen>>", self._on_open)
 
         btn_frame = ttk.Frame(frame)
         btn_frame.pack(fill="x", pady=2)
@@ -92,6 +162,13 @@ class LivePageUI:
         except ValueError:
             messagebox.showerror("Invalid input", "Nodes to visit must be a positive integer.")
             return
+        try:
+            max_pages = int(self.max_pages_var.get().strip())
+            if max_pages <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid input", "Pages kept in tree must be a positive integer.")
+            return
         if not seed_url:
             messagebox.showerror("Invalid input", "Seed URL cannot be empty.")
             return
@@ -104,6 +181,7 @@ class LivePageUI:
         self.cancel_btn.config(state="normal")
 
         self._reset_view()
+        self.pages.max_pages = max_pages
 
         thread = threading.Thread(
             target=self._run_crawl,
@@ -120,10 +198,16 @@ class LivePageUI:
         self.current_label.config(text="-")
         self.visited_label.config(text="0")
         self.queue_label.config(text="0")
-        self.seen_edges.clear()
-        self.parent_children.clear()
-        for item in self.relation_tree.get_children():
-            self.relation_tree.delete(item)
+        self.pages.clear()
+        self.item_ids.clear()
+        self.item_pages.clear()
+        self.shown_children.clear()
+        self.to_fill.clear()
+        self.dirty_pages.clear()
+        self.evicted_pages.clear()
+        self.status = None
+        self.relation_tree.delete(*self.relation_tree.get_children())
+        self.pages_frame.config(text="Pages")
 
     def _run_crawl(self, seed_url: str, nodes: int):
         # Run crawl in worker thread push progress and events into queue for the UI loop
@@ -137,16 +221,25 @@ class LivePageUI:
             self.events.put({"error": str(exc)})
 
     def _poll_events(self):
-        # drain event queue and update UI without blocking main loop
+        # Handle queued events for up to FRAME_BUDGET_MS without blocking the main loop, then apply
+        # them to the widgets in one go; come back sooner if events are still waiting
+        deadline = time.perf_counter() + FRAME_BUDGET_MS / 1000
         try:
-            while True:
+            while time.perf_counter() < deadline:
                 event = self.events.get_nowait()
                 self._handle_event(event)
         except Empty:
             pass
-        self.root.after(200, self._poll_events)
+        self._flush()
+        self._fill_rows(deadline)
+        busy = not self.events.empty() or self.to_fill
+        self.root.after(BUSY_POLL_MS if busy else POLL_MS, self._poll_events)
 
     def _handle_event(self, event: dict):
+        if "error" in event or event.get("done"):
+            # Show everything that came before the crawl ended
+            self._flush()
+
         if "error" in event:
             messagebox.showerror("Crawl error", event["error"])
             self.running = False
@@ -159,55 +252,105 @@ class LivePageUI:
             self.start_btn.config(state="normal")
             self.cancel_btn.config(state="disabled")
             result = event.get("result", {})
-            messagebox.showinfo(
-                "Crawl finished",
-                f"Processed {result.get('nodes_processed', 0)} nodes into {result.get('search_topic_name', '')}.",
-            )
+            message = f"Processed {result.get('nodes_processed', 0)} nodes into {result.get('search_topic_name', '')}."
+            if result.get("path"):
+                message += "\n\nPath: " + " -> ".join(result["path"])
+            messagebox.showinfo("Crawl finished", message)
             return
 
-        current_page = event.get("current_page") or "-"
-        self.current_label.config(text=current_page)
-        self.visited_label.config(text=str(event.get("visited_size", 0)))
-        self.queue_label.config(text=str(event.get("queue_size", 0)))
+        # Only the latest counts are shown
+        self.status = event
 
         # update relationships list (parent -> child)
-        for child in event.get("children", []):
-            edge = (current_page, child)
-            if edge in self.seen_edges:
-                continue
-            self.seen_edges.add(edge)
-            self._insert_edge(parent=current_page, child=child)
-
-    def _insert_edge(self, parent: str, child: str):
-        # insert child under single parent
-        # only supports one level of accordion dropdown
-        if parent not in self.parent_children:
-            parent_id = self.relation_tree.insert("", tk.END, text=parent, open=False)
-            self.parent_children[parent] = set()
-        else:
-            parent_id = self._get_parent_id(parent)
-
-        if child not in self.parent_children[parent]:
-            self.parent_children[parent].add(child)
-            self.relation_tree.insert(parent_id, tk.END, text=child)
+        current_page = event.get("current_page") or "-"
+        self.evicted_pages.extend(self.pages.add(current_page, event.get("children", [])))
+        self.dirty_pages[current_page] = None
+
+    def _flush(self):
+        # Apply the events handled since the last flush to the labels and the tree
+        if self.status is not None:
+            self.current_label.config(text=self.status.get("current_page") or "-")
+            self.visited_label.config(text=str(self.status.get("visited_size", 0)))
+            self.queue_label.config(text=str(self.status.get("queue_size", 0)))
+            self.status = None
+
+        for page in self.evicted_pages:
+            item = self.item_ids.pop(page, None)
+            if item is not None:
+                del self.item_pages[item]
+                self.shown_children.pop(item, None)
+                self.to_fill.pop(item, None)
+                self.relation_tree.delete(item)
+        self.evicted_pages.clear()
+
+        for page in self.dirty_pages:
+            if page in self.pages:
+                self._update_page(page)
+        self.dirty_pages.clear()
+
+        if self.pages.total > len(self.pages):
+            self.pages_frame.config(text=f"Pages (last {len(self.pages)} of {self.pages.total})")
+
+    def _update_page(self, page: str):
+        # one row per crawled page; its children are rows only once it was expanded,
+        # until then a placeholder row gives it an expand arrow
+        item = self.item_ids.get(page)
+        if item is None:
+            item = self.relation_tree.insert("", tk.END, text=page, open=False)
+            self.item_ids[page] = item
+            self.item_pages[item] = page
+            if self.pages.children[page]:
+                self.relation_tree.insert(item, tk.END, text=PLACEHOLDER)
+        elif item in self.shown_children:
+            self._show_children(item)
+
+    def _show_children(self, item: str):
+        # Insert the children of an expanded page that aren't rows yet
+        page = self.item_pages.get(item)
+        if page is None:
+            return
+        if item not in self.shown_children:
+            self.relation_tree.delete(*self.relation_tree.get_children(item))
+            self.shown_children[item] = 0
+
+        children = self.pages.children[page]
+        for child in islice(children, self.shown_children[item], None):
+            self.relation_tree.insert(item, tk.END, text=child)
+        self.shown_children[item] = len(children)
+
+    def _on_open(self, _event):
+        # The opened row isn't necessarily the focused one (keyboard, item(open=True)), so take
+        # every open row that still shows its placeholder
+        for item in self.item_pages:
+            if item not in self.shown_children and item not in self.to_fill and self.relation_tree.item(item, "open"):
+                self.to_fill[item] = None
+        self._fill_rows(time.perf_counter() + FRAME_BUDGET_MS / 1000)
+
+    def _fill_rows(self, deadline: float):
+        # Fill opened rows until the deadline (at least one per call, so filling always moves on)
+        while self.to_fill:
+            item = next(iter(self.to_fill))
+            del self.to_fill[item]
+            self._show_children(item)
+            if time.perf_counter() >= deadline:
+                break
 
     def _expand_collapse_all(self, expand: bool):
+        # Only opens / closes the rows; opened rows are filled by the polls, within their budget
         for item in self.relation_tree.get_children():
             self.relation_tree.item(item, open=expand)
-
-    def _get_parent_id(self, parent: str):
-        # return  tree item id for the given parent
-        for item in self.relation_tree.get_children():
-            if self.relation_tree.item(item, "text") == parent:
-                return item
-        return self.relation_tree.insert("", tk.END, text=parent, open=False)
+            if expand and item not in self.shown_children:
+                self.to_fill[item] = None
+        if not expand:
+            self.to_fill.clear()
 
     def run(self):
         self.root.mainloop()
 
 
 def main():
-    ui = LivePageUI()
+    max_pages = int(sys.argv[1]) if len(sys.argv) > 1 else MAX_PAGES
+    ui = LivePageUI(max_pages)
     ui.run()
 
 
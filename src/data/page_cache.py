@@ -0,0 +1,242 @@
+"""
+On-disk cache of fetched Wikipedia HTML, shared by every crawl folder.
+
+A resumed crawl, or a new race that passes through pages another race already
+visited, reads the raw HTML from here instead of the network. The HTML is stored
+zlib-compressed (so a change in link extraction still applies to cached pages):
+    CREATE TABLE IF NOT EXISTS pages (
+        url_key     TEXT PRIMARY KEY,
+        body        BLOB,
+        size        INTEGER,
+        fetched_at  REAL,
+        accessed_at REAL
+    )
+Pages are keyed by canonical_url(), and redirects seen while fetching (Poem -> Poetry) are kept
+alongside them, so a page reached under another title is read from the cache instead of fetched:
+    CREATE TABLE IF NOT EXISTS redirects (
+        url_key    TEXT PRIMARY KEY,
+        target     TEXT NOT NULL,
+        learned_at REAL
+    )
+
+Entries older than `ttl` seconds count as misses. When the compressed size goes over
+`max_bytes` the least recently read pages are evicted. In offline (replay) mode the
+network is never used: stale entries are still served and a miss raises CacheMiss.
+"""
+
+import os
+import sqlite3 as sql
+import threading
+import time
+import zlib
+
+from canonical import canonical_url
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_cache.db")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 60 * 60  # 30 days
+
+
+class CacheMiss(LookupError):
+    # Raised in offline mode when a page was never cached
+    pass
+
+
+def normalize_url(url: str) -> str:
+    # One key per page, see canonical.py
+    return canonical_url(url)
+
+
+class PageCache:
+    def __init__(
+        self,
+        db_path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl: float = DEFAULT_TTL,
+        offline: bool = False,
+    ):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.offline = offline
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Shared by the crawl's fetch worker threads
+        self._lock = threading.Lock()
+        self.conn = sql.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            url_key TEXT PRIMARY KEY,
+            body BLOB,
+            size INTEGER,
+            fetched_at REAL,
+            accessed_at REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS redirects (
+            url_key TEXT PRIMARY KEY,
+            target TEXT NOT NULL,
+            learned_at REAL
+        )
+        """)
+        self.conn.commit()
+
+        (total,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        self.total_bytes = total
+        # Redirects are looked up for every outlink, so they are all kept in memory
+        self.redirects = dict(self.conn.execute("SELECT url_key, target FROM redirects"))
+
+    def close_conn(self):
+        self.conn.close()
+
+    def get(self, url: str):
+        # Return the cached HTML for url, or None on a miss / expired entry
+        key = normalize_url(url)
+        now = time.time()
+
+        with self._lock:
+            row = self.conn.execute("SELECT body, fetched_at FROM pages WHERE url_key = ?", (key,)).fetchone()
+            if row is None or (not self.offline and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+
+            self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url_key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, url: str, html: str):
+        key = normalize_url(url)
+        body = zlib.compress(html.encode("utf-8"), 6)
+        now = time.time()
+
+        with self._lock:
+            row = self.conn.execute("SELECT size FROM pages WHERE url_key = ?", (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url_key, body, size, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now),
+            )
+            self.total_bytes += len(body)
+
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def get_redirect(self, url: str):
+        # Where url redirects to (canonical URL), or None if no redirect is known
+        return self.redirects.get(normalize_url(url))
+
+    def put_redirect(self, url: str, target: str):
+        key, target = normalize_url(url), normalize_url(target)
+        if key == target or self.redirects.get(key) == target:
+            return
+        with self._lock:
+            self.redirects[key] = target
+            self.conn.execute(
+                "INSERT OR REPLACE INTO redirects (url_key, target, learned_at) VALUES (?, ?, ?)",
+                (key, target, time.time()),
+            )
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently read pages until the cache is back under 90% of its cap
+        target = self.max_bytes * 0.9
+        rows = self.conn.execute("SELECT url_key, size FROM pages ORDER BY accessed_at ASC").fetchall()
+
+        doomed = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((key,))
+            self.total_bytes -= size
+
+        self.conn.executemany("DELETE FROM pages WHERE url_key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        return count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes,
+            "redirects": len(self.redirects),
+        }
+
+
+def test_page_cache():
+    print("Testing page cache...")
+
+    if os.path.exists("test_cache.db"):
+        os.remove("test_cache.db")
+
+    cache = PageCache("test_cache.db", max_bytes=10_000, ttl=60)
+    html = "<html>" + "Harry Potter " * 1000 + "</html>"
+
+    assert(cache.get("https://en.wikipedia.org/wiki/Harry_Potter") is None)
+    cache.put("https://en.wikipedia.org/wiki/Harry_Potter", html)
+    assert(cache.get("https://en.wikipedia.org/wiki/Harry_Potter") == html)
+    # Stored compressed
+    assert(cache.total_bytes < len(html) / 10)
+
+    # Same page under another spelling of the URL
+    cache.put("https://en.wikipedia.org/wiki/Five_Nights_at_Freddy's", "<html>fnaf</html>")
+    assert(cache.get("https://en.wikipedia.org/wiki/Five_Nights_at_Freddy%27s#Gameplay") == "<html>fnaf</html>")
+    assert(cache.get("HTTPS://EN.WIKIPEDIA.ORG/wiki/Five_Nights_at_Freddy%27s") == "<html>fnaf</html>")
+
+    # Expired entries are misses online, but still replayed offline
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert(cache.get("https://en.wikipedia.org/wiki/Harry_Potter") is None)
+    cache.offline = True
+    assert(cache.get("https://en.wikipedia.org/wiki/Harry_Potter") == html)
+    cache.offline = False
+    cache.ttl = 60
+
+    # Going over the size cap evicts least recently read pages first
+    for i in range(50):
+        cache.put(f"https://en.wikipedia.org/wiki/Page_{i}", os.urandom(400).hex())
+    assert(cache.total_bytes <= 10_000)
+    assert(cache.evictions > 0)
+    assert(cache.get("https://en.wikipedia.org/wiki/Page_49") is not None)
+    assert(cache.get("https://en.wikipedia.org/wiki/Harry_Potter") is None)
+
+    # Redirects are stored under canonical URLs
+    cache.put_redirect("https://en.wikipedia.org/wiki/poem#Forms", "https://en.wikipedia.org/wiki/Poetry")
+    assert(cache.get_redirect("https://en.wikipedia.org/wiki/Poem") == "https://en.wikipedia.org/wiki/Poetry")
+    assert(cache.get_redirect("https://en.wikipedia.org/wiki/Poetry") is None)
+
+    # Size bookkeeping and redirects survive a reopen
+    total = cache.total_bytes
+    cache.close_conn()
+    cache = PageCache("test_cache.db", max_bytes=10_000)
+    assert(cache.total_bytes == total)
+    assert(cache.get_redirect("https://en.wikipedia.org/wiki/poem") == "https://en.wikipedia.org/wiki/Poetry")
+    assert(cache.stats()["redirects"] == 1)
+    cache.close_conn()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_cache.db" + suffix):
+            os.remove("test_cache.db" + suffix)
+
+
+if __name__ == '__main__':
+    test_page_cache()
+    print("Tests passed good job!")
@@ -0,0 +1,264 @@
+"""
+Client-side throttling for the fetch layer, kept per host so one slow site doesn't hold up another:
+    token bucket   at most `rate` requests/s on average, in bursts of up to `burst`
+    concurrency    at most `max_concurrency` requests to the host in flight at once
+    Retry-After    a throttled response (429/503) blocks the host for every thread until the time the
+                   server asked for (or an exponential backoff when it didn't say)
+    AIMD           each successful request raises the rate by about `increase` req/s per second of
+                   traffic (up to max_rate); each throttle or connection error multiplies it by
+                   `decrease` (down to min_rate)
+
+    limiter = RateLimiter()
+    limiter.acquire(host)          # blocks until a request may go out
+    ... send it ...
+    limiter.release(host, "ok")    # or "throttled" / "error", with retry_after for throttles,
+                                   # or "aborted" when the request raised without a server answer
+                                   # to judge by (frees the slot, leaves the rate alone)
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+DEFAULT_RATE = 10.0
+MIN_RATE = 0.5
+MAX_RATE = 50.0
+BURST = 5
+MAX_CONCURRENCY = 10
+INCREASE = 1.0
+DECREASE = 0.5
+# Longest a single Retry-After / backoff may block a host, in seconds
+MAX_BLOCK = 300.0
+
+
+def parse_retry_after(value) -> float:
+    # Retry-After is either delay-seconds or an HTTP date; None when missing or unreadable
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    # Token bucket + concurrency cap + AIMD rate for one host
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: int = BURST,
+        max_concurrency: int = MAX_CONCURRENCY,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        increase: float = INCREASE,
+        decrease: float = DECREASE,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+
+        self._cond = threading.Condition()
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        # Wait for a free slot and a token; returns how long that took
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    timeout = self.blocked_until - now
+                elif self.in_flight >= self.max_concurrency:
+                    timeout = None  # woken by release()
+                elif self.tokens < 1:
+                    timeout = (1 - self.tokens) / self.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return time.monotonic() - start
+                self._cond.wait(timeout)
+
+    def release(self, outcome: str = "ok", retry_after: float = None):
+        # outcome: "ok", "throttled" (429/503), "error" (connection failure / timeout) or
+        # "aborted" (the request raised something else; no signal for AIMD)
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "aborted":
+                pass
+            elif outcome == "ok":
+                # Additive increase, spread over the requests of one second at the current rate
+                self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            else:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.block(retry_after)
+            self._cond.notify_all()
+
+    def block(self, seconds: float):
+        # No request to this host for `seconds` (from now), whichever thread asks
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + min(seconds, MAX_BLOCK))
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    # One HostLimiter per host (created on first use, all with the same settings) plus shared counters
+    def __init__(self, enabled: bool = True, **settings):
+        self.enabled = enabled
+        self.settings = settings
+        self._hosts: dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.throttled = 0
+            self.errors = 0
+            self.retried = 0
+            self.failed = 0
+            self.wait_time = 0.0
+
+    def host(self, host: str) -> HostLimiter:
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = HostLimiter(**self.settings)
+            return self._hosts[host]
+
+    def acquire(self, host: str):
+        if not self.enabled:
+            return
+        waited = self.host(host).acquire()
+        with self._lock:
+            self.wait_time += waited
+
+    def release(self, host: str, outcome: str = "ok", retry_after: float = None):
+        with self._lock:
+            self.requests += 1
+            if outcome == "throttled":
+                self.throttled += 1
+            elif outcome == "error":
+                self.errors += 1
+        if self.enabled:
+            self.host(host).release(outcome, retry_after)
+
+    def block(self, host: str, seconds: float):
+        if self.enabled:
+            self.host(host).block(seconds)
+
+    def count_retry(self):
+        with self._lock:
+            self.retried += 1
+
+    def count_failure(self):
+        with self._lock:
+            self.failed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = dict(self._hosts)
+            summary = {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "retried": self.retried,
+                "failed": self.failed,
+                "wait_time": self.wait_time,
+            }
+        summary["rates"] = {host: limiter.rate for host, limiter in hosts.items()}
+        return summary
+
+
+def test_rate_limiter():
+    print("Testing rate limiter...")
+
+    assert(parse_retry_after("3") == 3.0)
+    assert(parse_retry_after(None) is None and parse_retry_after("soon") is None)
+    assert(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0)  # already past
+
+    # Token bucket: a burst goes out at once, the rest at `rate`
+    limiter = HostLimiter(rate=20.0, burst=5, max_concurrency=100, increase=0)
+    start = time.monotonic()
+    for _ in range(15):
+        limiter.acquire()
+        limiter.release()
+    elapsed = time.monotonic() - start
+    assert(0.4 <= elapsed < 0.8)
+
+    # Concurrency cap
+    limiter = HostLimiter(rate=1000.0, burst=1000, max_concurrency=2)
+    peak = 0
+    active = 0
+    lock = threading.Lock()
+
+    def request():
+        nonlocal peak, active
+        limiter.acquire()
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        limiter.release()
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert(peak == 2)
+
+    # AIMD: halve on a throttle, creep back up on successes
+    limiter = HostLimiter(rate=10.0, burst=1000, max_concurrency=10)
+    limiter.acquire()
+    limiter.release("throttled")
+    assert(limiter.rate == 5.0)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert(5.0 < limiter.rate < 7.0)
+    # A request that raised frees its slot without moving the rate
+    rate = limiter.rate
+    limiter.acquire()
+    limiter.release("aborted")
+    assert(limiter.rate == rate and limiter.in_flight == 0)
+
+    # Retry-After blocks the host
+    limiter.acquire()
+    limiter.release("throttled", retry_after=0.3)
+    start = time.monotonic()
+    limiter.acquire()
+    assert(time.monotonic() - start >= 0.25)
+    limiter.release()
+
+    # Per-host state and counters
+    limiter = RateLimiter(rate=20.0)
+    limiter.acquire("a")
+    limiter.release("a", "throttled")
+    limiter.acquire("b")
+    limiter.release("b")
+    stats = limiter.stats()
+    assert(stats["requests"] == 2 and stats["throttled"] == 1)
+    assert(stats["rates"]["a"] < stats["rates"]["b"])
+
+
+if __name__ == '__main__':
+    test_rate_limiter()
+    print("Tests passed good job!")
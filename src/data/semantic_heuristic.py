@@ -0,0 +1,262 @@
+"""
+Embedding-guided search over a crawled graph: semantic distance to the goal title as a heuristic.
+
+Every title in a graph snapshot gets a unit-length sentence embedding, stored next to the
+snapshot (and dropped with it when the source changes):
+    <snapshot>/embeddings/<model>.npy    float16 [n, d], row i = embedding of titles[i]
+Titles are embedded as the crawler scores them, so vectors already in the shared
+EmbeddingCache (from priority crawls) are reused and the model only runs for the rest.
+
+Two ways to use it, with semantic distance s(v) = 1 - cos(v, goal) in [0, 2]:
+    admissible  h(v) = min(1, scale * s(v)), 0 at the goal. Any other page is at least one
+                hop away, so h never overestimates and shortest_path(heuristic=h) stays exact;
+                the heuristic only reorders the search.
+    greedy      best-first on s(v) alone (greedy_path). Usually expands far fewer pages but the
+                path it returns can be longer than the shortest one.
+
+Build: python semantic_heuristic.py build <WikiGraph_edges.csv | WikiGraph.db> [model]
+"""
+
+import heapq
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from embedding_cache import DEFAULT_EMBEDDING_CACHE_PATH, EmbeddingCache, normalize_title
+from graph_snapshot import load_snapshot
+from sentence_transformer import BATCH_SIZE, MODEL_NAME, embed_sentences, load_model
+
+EMBEDDING_DIR = "embeddings"
+
+# Titles looked up in / added to the embedding cache at a time while building
+_BUILD_CHUNK = 4096
+
+
+def embeddings_path(graph, model_name: str = MODEL_NAME) -> str:
+    return os.path.join(graph.path, EMBEDDING_DIR, model_name.replace("/", "__") + ".npy")
+
+
+def build_title_embeddings(
+    graph,
+    model_name: str = MODEL_NAME,
+    batch_size: int = BATCH_SIZE,
+    cache_path: str = DEFAULT_EMBEDDING_CACHE_PATH,
+) -> dict:
+    """
+    Write the [n, d] embedding matrix for every title in graph. Returns how many titles came
+    from the shared cache and how many had to go through the model.
+    """
+    path = embeddings_path(graph, model_name)
+    titles = graph.titles
+    cache = EmbeddingCache(model_name, cache_path)
+    vectors = None
+    cached = embedded = 0
+
+    try:
+        for start in range(0, len(titles), _BUILD_CHUNK):
+            # The model embeds normalize_title(title), the cache key, as TargetScorer.embed does
+            inputs = [normalize_title(title) for title in titles[start:start + _BUILD_CHUNK]]
+            found = cache.get_many(inputs)
+            missing = [text for text in dict.fromkeys(inputs) if text not in found]
+            cached += sum(text in found for text in inputs)
+            if missing:
+                tokenizer, model, device = load_model(model_name)
+                fresh = embed_sentences(missing, tokenizer, model, device, batch_size).cpu().numpy()
+                new_embeddings = dict(zip(missing, fresh))
+                cache.put_many(new_embeddings)
+                found.update(new_embeddings)
+
+            if vectors is None:
+                vectors = np.empty((len(titles), len(next(iter(found.values())))), dtype=np.float16)
+            vectors[start:start + len(inputs)] = np.stack([found[text] for text in inputs])
+            embedded += len(missing)
+    finally:
+        cache.close_conn()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, vectors if vectors is not None else np.zeros((0, 0), dtype=np.float16))
+    os.replace(tmp_path, path)
+    return {"titles": len(titles), "cached": cached, "embedded": embedded}
+
+
+class TitleEmbeddings:
+    # Unit vectors aligned with a GraphSnapshot's node ids
+    def __init__(self, graph, vectors: np.ndarray):
+        self.graph = graph
+        self.vectors = vectors
+
+    def similarity(self, nodes, target: int) -> np.ndarray:
+        # Cosine similarity of each id in nodes to target
+        goal = self.vectors[target].astype(np.float32)
+        return self.vectors[np.asarray(nodes, dtype=np.int64)].astype(np.float32) @ goal
+
+
+def load_title_embeddings(source: str, model_name: str = MODEL_NAME, build: bool = True) -> TitleEmbeddings:
+    """
+    Embeddings for every title of source's snapshot, built (through the shared embedding cache,
+    loading the model only for titles it hasn't seen) if they are missing and build is set.
+    """
+    graph = load_snapshot(source)
+    path = embeddings_path(graph, model_name)
+    if not os.path.exists(path):
+        if not build:
+            raise FileNotFoundError(path)
+        build_title_embeddings(graph, model_name)
+    return TitleEmbeddings(graph, np.load(path, mmap_mode="r"))
+
+
+def semantic_heuristic(embeddings: TitleEmbeddings, goal: str, scale: float = 1.0):
+    # Admissible heuristic for shortest_path(..., heuristic=...) on unit-weight graphs:
+    # title -> min(1, scale * (1 - cos(title, goal))), 0 at the goal
+    graph = embeddings.graph
+    if goal not in graph:
+        return lambda title: 0
+    target = graph.node_id(goal)
+    cache = {goal: 0}
+
+    def h(title):
+        if title not in cache:
+            try:
+                node = graph.node_id(title)
+            except KeyError:
+                cache[title] = 0
+            else:
+                distance = 1.0 - float(embeddings.similarity([node], target)[0])
+                cache[title] = min(1.0, max(0.0, scale * distance))
+        return cache[title]
+
+    return h
+
+
+def greedy_path(graph, embeddings: TitleEmbeddings, start, goal, stats=None):
+    # Greedy best-first over the CSR arrays: always expand the queued page whose title is closest
+    # to the goal's. Returns (hops, path) like bfs_path; the path is not necessarily the shortest.
+    # stats, if given, gets the number of nodes expanded and edges scanned.
+    if stats is not None:
+        stats.update(expanded=0, edges_scanned=0)
+    if start == goal:
+        return 0, [start]
+    try:
+        source, target = graph.node_id(start), graph.node_id(goal)
+    except KeyError:
+        return float("inf"), []
+
+    parent = {source: None}
+    pq = [(0.0, source)]
+    expanded = scanned = 0
+
+    while pq and target not in parent:
+        _, node = heapq.heappop(pq)
+        expanded += 1
+        neighbors = [v for v in graph.neighbors(node).tolist() if v not in parent]
+        scanned += len(neighbors)
+        if not neighbors:
+            continue
+        for v, sim in zip(neighbors, embeddings.similarity(neighbors, target).tolist()):
+            parent[v] = node
+            heapq.heappush(pq, (1.0 - sim, v))
+
+    if stats is not None:
+        stats.update(expanded=expanded, edges_scanned=scanned)
+    if target not in parent:
+        return float("inf"), []
+
+    path = []
+    cur = target
+    while cur is not None:
+        path.append(graph.titles[cur])
+        cur = parent[cur]
+    path.reverse()
+    return float(len(path) - 1), path
+
+
+def test_semantic_heuristic():
+    import tempfile
+
+    from shortest_path import bfs_path, shortest_path
+
+    print("Testing semantic heuristic...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "WikiGraph_edges.csv")
+        shutil.copy(os.path.join("Poetry", "WikiGraph_edges.csv"), csv_path)
+        graph = load_snapshot(csv_path)
+
+        # Any unit vectors will do for checking the search itself
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((graph.num_nodes, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        embeddings = TitleEmbeddings(graph, vectors.astype(np.float16))
+
+        titles = graph.titles.tolist()
+        starts = [titles[i] for i in np.flatnonzero(graph.out_degrees() > 0)[::60]]
+        for start in starts:
+            for goal in titles[::911]:
+                distance, _ = bfs_path(graph, start, goal)
+                for scale in (1.0, 4.0):
+                    h = semantic_heuristic(embeddings, goal, scale=scale)
+                    assert(0 <= h(start) <= 1 and h(goal) == 0)
+                    assert(shortest_path(graph, start, goal, heuristic=h)[0] == distance)
+
+                hops, path = greedy_path(graph, embeddings, start, goal)
+                assert((hops == float("inf")) == (distance == float("inf")))
+                if path:
+                    assert(hops >= distance and path[0] == start and path[-1] == goal)
+                    assert(all(b in dict(graph[a]) for a, b in zip(path, path[1:])))
+
+
+def test_build_title_embeddings():
+    import csv
+    import importlib.util
+    import tempfile
+
+    from sentence_transformer import TargetScorer
+
+    if importlib.util.find_spec("torch") is None:
+        print("torch is not installed, skipping title embedding build test")
+        return
+
+    print("Testing title embedding build...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "WikiGraph_edges.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([["Source", "Target"], ["C%2B%2B", "Albert_Einstein"]])
+        graph = load_snapshot(csv_path)
+        cache_path = os.path.join(tmp, "embedding_cache.db")
+        counts = build_title_embeddings(graph, cache_path=cache_path)
+        assert(counts == {"titles": 2, "cached": 0, "embedded": 2})
+
+        # The vector cached for C%2B%2B is the one a crawl would embed for it, i.e. of "C++"
+        tokenizer, model, device = load_model()
+        uncached = TargetScorer("C%2B%2B", tokenizer, model, device).target_embedding
+        cache = EmbeddingCache(MODEL_NAME, cache_path)
+        scorer = TargetScorer("Albert_Einstein", tokenizer, model, device, cache=cache)
+        assert(np.allclose(scorer.embed(["C%2B%2B"])[0], uncached, atol=1e-3))
+        cache.close_conn()
+        vectors = np.load(embeddings_path(graph), mmap_mode="r")
+        assert(np.allclose(vectors[graph.node_id("C%2B%2B")].astype(np.float32), uncached, atol=1e-3))
+
+        # A second build reads everything back from the cache
+        assert(build_title_embeddings(graph, cache_path=cache_path)["cached"] == 2)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == "build":
+        # python semantic_heuristic.py build <WikiGraph_edges.csv | WikiGraph.db> [model]
+        source = sys.argv[2]
+        model_name = sys.argv[3] if len(sys.argv) > 3 else MODEL_NAME
+        start = time.perf_counter()
+        counts = build_title_embeddings(load_snapshot(source), model_name)
+        print(
+            f"Embedded {counts['titles']} titles for {source} in {time.perf_counter() - start:.1f} s "
+            f"({counts['cached']} from the cache, {counts['embedded']} through the model)"
+        )
+    else:
+        test_semantic_heuristic()
+        test_build_title_embeddings()
+        print("Tests passed good job!")
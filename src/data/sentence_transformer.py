@@ -1,39 +1,118 @@
-from transformers import AutoTokenizer, AutoModel
-import torch
-import torch.nn.functional as F
+# torch / transformers take seconds to import, so they are only imported once a
+# model is actually needed (priority-queue crawls, semantic scoring), not by BFS crawls or the UI.
 
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-print("Using device:", device)
+import threading
+
+import numpy as np
+
+from embedding_cache import normalize_title
+
+MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+
+# Process-wide (tokenizer, model, device) per model name, reused by every crawl() call
+_models = {}
+_models_lock = threading.Lock()
+
+def load_model(model_name=MODEL_NAME):
+    with _models_lock:
+        if model_name not in _models:
+            import torch
+            from transformers import AutoTokenizer, AutoModel
+
+            device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            print("Using device:", device)
+
+            # Load model from HuggingFace Hub
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModel.from_pretrained(model_name)
+            model.to(device)
+            model.eval()
+            _models[model_name] = (tokenizer, model, device)
+
+        return _models[model_name]
 
 #Mean Pooling - Take attention mask into account for correct averaging
 def mean_pooling(model_output, attention_mask):
+    import torch
+
     token_embeddings = model_output[0] #First element of model_output contains all token embeddings
     input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
     return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
 
-def cos_sim(goal, hyper, tokenizer, model, device):
-    # Sentences we want sentence embeddings for
-    sentences = [goal, hyper]
+# Titles per forward pass when scoring a page's outlinks
+BATCH_SIZE = 64
+
+def embed_sentences(sentences, tokenizer, model, device, batch_size=BATCH_SIZE):
+    # Normalized sentence embeddings, computed in forward passes of at most batch_size sentences
+    import torch
+    import torch.nn.functional as F
 
-    # Tokenize sentences
-    encoded_input = tokenizer(sentences, padding=True, truncation=True, return_tensors='pt').to(device)
+    batches = []
+    for i in range(0, len(sentences), batch_size):
+        encoded_input = tokenizer(sentences[i:i + batch_size], padding=True, truncation=True, return_tensors='pt').to(device)
 
-    # Compute token embeddings
-    with torch.no_grad():
-        model_output = model(**encoded_input)
+        with torch.no_grad():
+            model_output = model(**encoded_input)
 
-    # Perform pooling
-    sentence_embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+        sentence_embeddings = mean_pooling(model_output, encoded_input['attention_mask'])
+        batches.append(F.normalize(sentence_embeddings, p=2, dim=1))
+
+    return torch.cat(batches) if batches else torch.empty(0)
+
+
+class TargetScorer:
+    # Embeds the race target once, then scores candidate titles against it in batches.
+    # With an EmbeddingCache, titles embedded by any earlier crawl skip the model entirely.
+    def __init__(self, target, tokenizer, model, device, batch_size=BATCH_SIZE, cache=None):
+        self.target = target
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.batch_size = batch_size
+        self.cache = cache
+        self.target_embedding = self.embed([target])[0]
+
+    def embed(self, titles: list[str]) -> np.ndarray:
+        # float32 [len(titles), d] unit vectors, from the cache where possible. The model embeds
+        # normalize_title(title), the cache key, so cached and uncached runs score titles the same
+        inputs = [normalize_title(title) for title in titles]
+        if self.cache is None:
+            return embed_sentences(inputs, self.tokenizer, self.model, self.device, self.batch_size).cpu().numpy()
+
+        found = self.cache.get_many(inputs)
+        missing = [text for text in dict.fromkeys(inputs) if text not in found]
+        if missing:
+            fresh = embed_sentences(missing, self.tokenizer, self.model, self.device, self.batch_size).cpu().numpy()
+            new_embeddings = dict(zip(missing, fresh))
+            self.cache.put_many(new_embeddings)
+            found.update(new_embeddings)
+
+        return np.stack([found[text] for text in inputs])
+
+    def score(self, titles: list[str]) -> list[float]:
+        if not titles:
+            return []
+        # Rows are unit length, so the dot product is the cosine similarity
+        return (self.embed(titles) @ self.target_embedding).tolist()
+
+
+def cos_sim(goal, hyper, tokenizer, model, device, verbose=False):
+    import torch.nn.functional as F
+
+    # Sentences we want sentence embeddings for
+    sentences = [goal, hyper]
 
-    # Normalize embeddings
-    sentence_embeddings = F.normalize(sentence_embeddings, p=2, dim=1)
+    # Tokenize, embed, pool and normalize
+    sentence_embeddings = embed_sentences(sentences, tokenizer, model, device)
 
-    print("Sentence embeddings (", goal, " & ", hyper, "):")
-    print(sentence_embeddings)
+    if verbose:
+        print("Sentence embeddings (", goal, " & ", hyper, "):")
+        print(sentence_embeddings)
 
     emb1 = sentence_embeddings[0].unsqueeze(0)  # shape: [1, d]
     emb2 = sentence_embeddings[1].unsqueeze(0)  # shape: [1, d]
 
     cos_sim = F.cosine_similarity(emb1, emb2).item()
-    print("Cosine similarity:", cos_sim)
-    return cos_sim
\ No newline at end of file
+    if verbose:
+        print("Cosine similarity:", cos_sim)
+    return cos_sim
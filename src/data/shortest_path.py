@@ -1,47 +1,51 @@
-import csv
 import heapq
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def read_edge_list(csv_file, weighted=False):
-
-    graph = {}
-
-    with open(csv_file, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            u = row["Source"]
-            v = row["Target"]
-            w = float(row["Weight"]) if weighted and "Weight" in row else 1.0
+import numpy as np
 
-            graph.setdefault(u, []).append((v, w))
-            # graph.setdefault(v, []).append((u, w))  # remove this if graph is directed
+from graph_snapshot import GraphSnapshot, load_snapshot
 
-    return graph
+def read_edge_list(csv_file, weighted=False):
+    # title -> [(neighbor, weight)] mapping, backed by a binary snapshot of csv_file
+    # that is only rebuilt when the CSV changes (see graph_snapshot.py)
+    return load_snapshot(csv_file, weighted=weighted)
 
 
-def shortest_path(graph, start, goal, heuristic=None):
+def shortest_path(graph, start, goal, heuristic=None, stats=None):
+    # Dijkstra, or A* when heuristic(node) gives a lower bound on the distance left to goal.
+    # stats, if given, gets the number of nodes expanded.
 
     pq = [(0, start)]  # (priority, node)
     dist = {start: 0}
     parent = {start: None}
+    expanded = set()
 
     while pq:
-        current_dist, node = heapq.heappop(pq)
+        _, node = heapq.heappop(pq)
 
         if node == goal:
             break
 
-        if current_dist > dist.get(node, float("inf")):
+        # stale entry for a node already expanded with a shorter distance
+        if node in expanded:
             continue
+        expanded.add(node)
+        current_dist = dist[node]
 
         for neighbor, weight in graph.get(node, []):
             g_cost = current_dist + weight
-            f_cost = g_cost + (heuristic(neighbor) if heuristic else 0)
 
             if g_cost < dist.get(neighbor, float("inf")):
                 dist[neighbor] = g_cost
                 parent[neighbor] = node
+                f_cost = g_cost + (heuristic(neighbor) if heuristic else 0)
                 heapq.heappush(pq, (f_cost, neighbor))
 
+    if stats is not None:
+        stats.update(expanded=len(expanded))
+
     # reconstruct path
     if goal not in parent:
         return float("inf"), []
@@ -55,11 +59,250 @@ def shortest_path(graph, start, goal, heuristic=None):
 
     return dist[goal], path
 
-def find_shortest_path(path, target1, target2):
-    graph = read_edge_list(path)
-    distance, path = shortest_path(graph, target1, target2)
+def _expand(graph, frontier, seen, reverse=False):
+    # One BFS level from a sorted frontier: neighbors not yet seen (seen[node] == -1), each paired
+    # with its smallest-id neighbor in the frontier, plus the number of edges scanned
+    nodes, neighbors = graph.gather(frontier, reverse=reverse)
+    unseen = seen[neighbors] == -1
+    nodes, neighbors = nodes[unseen], neighbors[unseen]
+    new, first = np.unique(neighbors, return_index=True)
+    return new, nodes[first], len(unseen)
+
+def _trace(graph, parent, source, target):
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parent[path[-1]]))
+    path.reverse()
+    return [graph.titles[node] for node in path]
+
+def _bfs_tree(graph, source, targets, stats=None):
+    # Level-by-level BFS from source until every id in targets has been reached (or nothing is
+    # left to expand). Returns the flat predecessor array, -1 for nodes not reached.
+    parent = np.full(graph.num_nodes, -1, dtype=np.int32)
+    parent[source] = source
+    frontier = np.array([source], dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    expanded = scanned = 0
+
+    while frontier.size and (parent[targets] == -1).any():
+        expanded += frontier.size
+        frontier, parents, edges = _expand(graph, frontier, parent)
+        parent[frontier] = parents
+        scanned += edges
+
+    if stats is not None:
+        stats.update(expanded=expanded, edges_scanned=scanned)
+    return parent
+
+def bfs_distances(graph, source, reverse=False):
+    # Hop count from source to every node (to source, over in-links, if reverse); -1 if unreachable
+    dist = np.full(graph.num_nodes, -1, dtype=np.int32)
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    depth = 0
+
+    while frontier.size:
+        depth += 1
+        frontier, _, _ = _expand(graph, frontier, dist, reverse=reverse)
+        dist[frontier] = depth
+
+    return dist
+
+def bfs_path(graph, start, goal, stats=None):
+    # Unweighted shortest path over a GraphSnapshot: level-by-level BFS on the CSR arrays with a
+    # flat predecessor array, stopping at the level that reaches goal. Node ids follow title order
+    # and each node keeps its smallest-id predecessor, which is the same path shortest_path()
+    # finds with unit weights (its heap breaks distance ties by title).
+    # stats, if given, gets the number of nodes expanded and edges scanned.
+    if stats is not None:
+        stats.update(expanded=0, edges_scanned=0)
+    if start == goal:
+        return 0, [start]
+    try:
+        source, target = graph.node_id(start), graph.node_id(goal)
+    except KeyError:
+        return float("inf"), []
+
+    parent = _bfs_tree(graph, source, [target], stats)
+    if parent[target] == -1:
+        return float("inf"), []
+
+    path = _trace(graph, parent, source, target)
+    return float(len(path) - 1), path
+
+def bidirectional_bfs_path(graph, start, goal, stats=None):
+    # Same result as bfs_path, from two searches: forward from start and backward over in-links
+    # from goal, each step expanding whichever frontier has fewer edges to scan, until they meet.
+    if stats is not None:
+        stats.update(expanded=0, edges_scanned=0)
+    if start == goal:
+        return 0, [start]
+    try:
+        source, target = graph.node_id(start), graph.node_id(goal)
+    except KeyError:
+        return float("inf"), []
+
+    parent = np.full(graph.num_nodes, -1, dtype=np.int32)
+    parent[source] = source
+    goal_dist = np.full(graph.num_nodes, -1, dtype=np.int32)
+    goal_dist[target] = 0
+    forward = np.array([source], dtype=np.int64)
+    backward = np.array([target], dtype=np.int64)
+    forward_depth = backward_depth = expanded = scanned = 0
+    met = False
+
+    while not met and forward.size and backward.size:
+        forward_cost = (graph.offsets[forward + 1] - graph.offsets[forward]).sum()
+        backward_cost = (graph.reverse_offsets[backward + 1] - graph.reverse_offsets[backward]).sum()
+        if forward_cost <= backward_cost:
+            expanded += forward.size
+            forward, parents, edges = _expand(graph, forward, parent)
+            parent[forward] = parents
+            forward_depth += 1
+            met = (goal_dist[forward] != -1).any()
+        else:
+            expanded += backward.size
+            backward, _, edges = _expand(graph, backward, goal_dist, reverse=True)
+            backward_depth += 1
+            goal_dist[backward] = backward_depth
+            met = (parent[backward] != -1).any()
+        scanned += edges
+
+    if not met:
+        if stats is not None:
+            stats.update(expanded=expanded, edges_scanned=scanned)
+        return float("inf"), []
+
+    # The first meeting fixes the distance. Forward parents are already final up to forward_depth;
+    # past it, walk forward from the meeting nodes through nodes on a shortest path (goal_dist equal
+    # to the distance left), again keeping each node's smallest-id predecessor.
+    distance = forward_depth + backward_depth
+    layer = forward[goal_dist[forward] == backward_depth]
+    for depth in range(forward_depth + 1, distance + 1):
+        expanded += layer.size
+        nodes, neighbors = graph.gather(layer)
+        scanned += len(neighbors)
+        on_path = goal_dist[neighbors] == distance - depth
+        layer, first = np.unique(neighbors[on_path], return_index=True)
+        parent[layer] = nodes[on_path][first]
+
+    if stats is not None:
+        stats.update(expanded=expanded, edges_scanned=scanned)
+    return float(distance), _trace(graph, parent, source, target)
+
+def find_shortest_path(path, target1, target2, weighted=False, bidirectional=True):
+    # Crawled edges all have weight 1, so BFS unless the CSV carries weights
+    graph = read_edge_list(path, weighted=weighted)
+    if weighted:
+        distance, path = shortest_path(graph, target1, target2)
+    elif bidirectional:
+        distance, path = bidirectional_bfs_path(graph, target1, target2)
+    else:
+        distance, path = bfs_path(graph, target1, target2)
 
     return path
 
+def _paths_from_source(graph, start, goals):
+    # (start, goal, path) for each goal, from one BFS that stops once all of them are reached
+    if start not in graph:
+        return [(start, goal, [start] if goal == start else []) for goal in goals]
+    source = graph.node_id(start)
+    ids = {goal: graph.node_id(goal) for goal in set(goals) if goal in graph}
+    parent = _bfs_tree(graph, source, list(ids.values()))
+
+    results = []
+    for goal in goals:
+        target = ids.get(goal)
+        if target is None or parent[target] == -1:
+            results.append((start, goal, []))
+        else:
+            results.append((start, goal, _trace(graph, parent, source, target)))
+    return results
+
+# Snapshot opened once by each pool process
+_worker_graph = None
+
+def _init_worker(snapshot_dir):
+    global _worker_graph
+    _worker_graph = GraphSnapshot(snapshot_dir)
+
+def _worker_paths_from_source(group):
+    return _paths_from_source(_worker_graph, *group)
+
+def find_shortest_paths(path, pairs, processes=None):
+    """
+    Shortest paths for many (start, goal) pairs over one edge list, yielded as (start, goal, path)
+    tuples ([] when goal can't be reached). Pairs are grouped by start and each start gets a
+    single BFS that answers all of its goals. Results stream out one start at a time, in order
+    of each start's first appearance; with processes > 1 the searches run in a process pool.
+    """
+    graph = read_edge_list(path)
+
+    groups = {}
+    for start, goal in pairs:
+        groups.setdefault(start, []).append(goal)
+
+    if not processes or processes <= 1:
+        for group in groups.items():
+            yield from _paths_from_source(graph, *group)
+        return
+
+    # Keep a few searches queued per process so results don't pile up ahead of the consumer
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(graph.path,)) as pool:
+        in_flight = deque()
+        for group in groups.items():
+            in_flight.append(pool.submit(_worker_paths_from_source, group))
+            if len(in_flight) >= processes * 4:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def test_bfs_paths():
+    print("Testing BFS path engines...")
+
+    # Same paths as Dijkstra on the bundled crawl, for every source against a spread of targets
+    graph = read_edge_list(os.path.join("Poetry", "WikiGraph_edges.csv"))
+    titles = graph.titles.tolist()
+    sources = [title for title in titles if graph.out_degrees()[graph.node_id(title)]]
+    for start in sources[::25]:
+        for goal in titles[::997]:
+            expected = shortest_path(graph, start, goal)
+            assert(bfs_path(graph, start, goal) == expected)
+            assert(bidirectional_bfs_path(graph, start, goal) == expected)
+
+    assert(bfs_path(graph, "Poetry", "Poetry") == (0, ["Poetry"]))
+    assert(bfs_path(graph, "Poetry", "Not_a_page") == (float("inf"), []))
+    assert(bidirectional_bfs_path(graph, "Poetry", "Not_a_page") == (float("inf"), []))
+
+    # Searching from both ends touches far fewer nodes (3 links apart here)
+    forward, both = {}, {}
+    start, goal = "Irony", "Metropolitan_Club_(New_York_City)"
+    assert(bfs_path(graph, start, goal, forward) == bidirectional_bfs_path(graph, start, goal, both))
+    assert(0 < both["expanded"] < forward["expanded"] / 10)
+
+
+def test_find_shortest_paths():
+    print("Testing batch path queries...")
+
+    csv_path = os.path.join("Poetry", "WikiGraph_edges.csv")
+    graph = read_edge_list(csv_path)
+    titles = graph.titles.tolist()
+    pairs = [(start, goal) for start in titles[::400] for goal in titles[::301]]
+    pairs += [("Poetry", "Poetry"), ("Not_a_page", "Poetry"), ("Poetry", "Not_a_page"), ("Irony", titles[0])]
+
+    expected = {(start, goal): bfs_path(graph, start, goal)[1] for start, goal in pairs}
+    for processes in (None, 2):
+        results = list(find_shortest_paths(csv_path, pairs, processes=processes))
+        assert(len(results) == len(pairs))
+        assert({(start, goal): path for start, goal, path in results} == expected)
+
+    # Grouped by start, in order of first appearance
+    results = find_shortest_paths(csv_path, [("Irony", "Poetry"), ("Poetry", "Irony"), ("Irony", "Sonnet")])
+    assert([(start, goal) for start, goal, _ in results] == [("Irony", "Poetry"), ("Irony", "Sonnet"), ("Poetry", "Irony")])
+
+
 if __name__ == '__main__':
-    print(find_shortest_path("Magnus_Carlsen_to_Tyler,_the_Creator\WikiGraph_edges.csv", "Magnus_Carlsen", "Tyler,_the_Creator"))
\ No newline at end of file
+    test_bfs_paths()
+    test_find_shortest_paths()
+    print("Tests passed good job!")
+    print(find_shortest_path(os.path.join("Magnus_Carlsen_to_Tyler,_the_Creator", "WikiGraph_edges.csv"), "Magnus_Carlsen", "Tyler,_the_Creator"))
@@ -8,9 +8,16 @@ A queue table to keep track of the order of wikipedia queries:
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         url TEXT UNIQUE,
         added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        priority_rank FLOAT NOT NULL
+        priority_rank FLOAT NOT NULL,
+        claimed_by TEXT,        -- worker holding the entry (multi-process crawls), NULL when free
+        lease_expires REAL,     -- unix time the claim runs out
+        deferred INTEGER NOT NULL DEFAULT 0  -- 1 once a crawl gave up fetching it for now
     )
 
+    CREATE INDEX IF NOT EXISTS queue_priority ON queue (priority_rank DESC, added_at DESC, url)
+    (covering index, so the priority dequeue reads one index entry instead of scanning and sorting the queue;
+     BFS dequeue walks the id primary key the same way)
+
 A sorted list table to keep if pages have already been visited:
     CREATE TABLE IF NOT EXISTS visited (
         url TEXT PRIMARY KEY,
@@ -32,18 +39,80 @@ A table to keep track of directed connections:
 
 If we want to create a csv for analysis in Gephi, then we should be able to export the edge_list table.
 
+A crawled page is written with record_page(): its node, all of its edges and its new queue
+entries go in one transaction, so a page is either fully recorded or not at all. The database
+runs in WAL mode with synchronous=NORMAL by default (one fsync per checkpoint instead of per
+commit); pass journal_mode / synchronous to GraphInterface to change that.
+
+InternedGraphInterface is the same API over an integer-id schema (see its docstring); use
+open_graph() to get whichever class matches an existing database file and
+migrate_to_interned() to convert an old one.
+
+Several crawl processes can share one database by claiming queue entries instead of dequeuing them:
+claim_next() leases the next entry to a worker (queue.claimed_by / queue.lease_expires, unix time),
+record_page(..., claimed_url=url) moves it to visited together with the page's results, and a lease
+that runs out (worker crashed or hung) makes the entry claimable again. Claimed entries stay in
+queue until then, so they still count as seen and as queued.
+
+A page whose fetch keeps failing is deferred (requeue(..., deferred=True) / defer_claim()): it stays
+queued, but neither dequeue_and_mark_visited() nor claim_next() hands it out until
+release_deferred() at the start of the next crawl. get_pending_count() is what is left to crawl.
+
+URLs going into the queue / visited checks are passed through canonical_url() first, so
+Five_Nights_at_Freddy's, Five_Nights_at_Freddy%27s#Gameplay and five_Nights_at_Freddy%27s are one
+page. URLs that name an entry the queue handed out (claimed_url, requeue, release_claim) are used
+as they are. record_redirect() stores a page that turned out to be a redirect: visited, not a node,
+with one edge to its target.
+
+filter_unseen() checks a page's whole outlink set against visited + queue in one query.
+With mirror_seen=True every visited / queued URL is also kept in a Python set so those
+checks skip SQLite entirely; only use it while this object is the database's only writer.
+
 """
 
 import sqlite3 as sql
 import os
 import csv
+import json
+import time
+from urllib.request import pathname2url
+
+from canonical import canonical_url
+
+# Seconds a claimed queue entry stays with its worker before another worker may take it
+LEASE_SECONDS = 120.0
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
 
 class GraphInterface:
-    def __init__(self, db_path):
+    # Page name -> URL, for pages recorded by name
+    URL_PREFIX = "https://en.wikipedia.org/wiki/"
+
+    def __init__(
+        self,
+        db_path,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        mirror_seen: bool = False,
+        timeout: float = 5.0,
+    ):
         self.db_path = db_path
-        self.conn = sql.connect(self.db_path)
+        # timeout: how long to wait on another process's write lock before raising
+        self.conn = sql.connect(self.db_path, timeout=timeout)
         self.cursor = self.conn.cursor()
 
+        # In-memory copy of visited + queued URLs, loaded on first filter_unseen()
+        self.mirror_seen = mirror_seen
+        self._seen = None
+
+        if journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {sorted(JOURNAL_MODES)}")
+        if synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {sorted(SYNCHRONOUS_MODES)}")
+        self.cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.cursor.execute(f"PRAGMA synchronous={synchronous}")
+
     def close_conn(self):
         self.conn.close()
 
@@ -59,6 +128,18 @@ class GraphInterface:
         )
         """)
 
+        # Databases from before priority ranking have no priority_rank column
+        self.cursor.execute("PRAGMA table_info(queue)")
+        if "priority_rank" not in [column[1] for column in self.cursor.fetchall()]:
+            self.cursor.execute("ALTER TABLE queue ADD COLUMN priority_rank FLOAT NOT NULL DEFAULT 0")
+
+        self._add_claim_columns()
+
+        # Priority dequeue order; also added to existing databases
+        self.cursor.execute("""
+        CREATE INDEX IF NOT EXISTS queue_priority ON queue (priority_rank DESC, added_at DESC, url)
+        """)
+
         # Visited pages
         self.cursor.execute("""
         CREATE TABLE IF NOT EXISTS visited (
@@ -87,14 +168,27 @@ class GraphInterface:
 
         self.conn.commit()
 
+    def _add_claim_columns(self):
+        # Worker leases for multi-process crawls and the deferred mark; added to existing queue tables as well
+        self.cursor.execute("PRAGMA table_info(queue)")
+        columns = [column[1] for column in self.cursor.fetchall()]
+        if "claimed_by" not in columns:
+            self.cursor.execute("ALTER TABLE queue ADD COLUMN claimed_by TEXT")
+        if "lease_expires" not in columns:
+            self.cursor.execute("ALTER TABLE queue ADD COLUMN lease_expires REAL")
+        if "deferred" not in columns:
+            self.cursor.execute("ALTER TABLE queue ADD COLUMN deferred INTEGER NOT NULL DEFAULT 0")
+
     def check_if_visited(self, url: str) -> bool:
         # Check if url has been visited, return if it has been
+        url = canonical_url(url)
         self.cursor.execute("SELECT 1 FROM visited WHERE url = ? LIMIT 1", (url,))
         exists = self.cursor.fetchone() is not None
         if exists: return False
         else: return True
 
     def enqueue(self, url: str, priority_rank: float = 0) -> bool:
+        url = canonical_url(url)
         try:
             self.cursor.execute("""
                 INSERT INTO queue (url,priority_rank) 
@@ -106,10 +200,13 @@ class GraphInterface:
             # URL already exists in the queue
             success = False
 
+        if self._seen is not None:
+            self._seen.add(url)
         return success    
 
     # URL will eventually be scraped, add to queue if it isn't already in visited list
     def check_if_visited_then_enqueue(self, url: str, priority_rank: float = 0) -> bool:
+        url = canonical_url(url)
 
         # Check if url has been visited, return if it has been
         self.cursor.execute("SELECT 1 FROM visited WHERE url = ? LIMIT 1", (url,))
@@ -127,10 +224,44 @@ class GraphInterface:
             # URL already exists in the queue
             success = False
 
+        if self._seen is not None:
+            self._seen.add(url)
         return success
 
+    # Of a page's outlinks, the ones not visited and not already queued (input order kept)
+    def filter_unseen(self, urls) -> list[str]:
+        urls = list(dict.fromkeys(canonical_url(url) for url in urls))
+
+        if self.mirror_seen:
+            if self._seen is None:
+                self._seen = self._load_seen()
+            return [url for url in urls if url not in self._seen]
+
+        # Whole link set as one JSON array parameter -> one query, however many links
+        self.cursor.execute("""
+            SELECT candidate.value FROM json_each(?) AS candidate
+            WHERE NOT EXISTS (SELECT 1 FROM visited WHERE url = candidate.value)
+              AND NOT EXISTS (SELECT 1 FROM queue WHERE url = candidate.value)
+            ORDER BY candidate.key
+        """, (json.dumps(urls),))
+        return [url for (url,) in self.cursor.fetchall()]
+
+    def _load_seen(self) -> set[str]:
+        self.cursor.execute("SELECT url FROM visited UNION SELECT url FROM queue")
+        return {url for (url,) in self.cursor.fetchall()}
+
+    # After record_page / record_redirect: the claimed entry and the page itself are visited now
+    def _mirror_visited(self, claimed_url: str = None, page_name: str = None):
+        if self._seen is None:
+            return
+        if claimed_url is not None:
+            self._seen.add(canonical_url(claimed_url))
+        if page_name is not None:
+            self._seen.add(canonical_url(self.URL_PREFIX + page_name))
+
     # We are about to scrape, remove from queue and add to visited list
-    def dequeue_and_mark_visited(self, priority_queue_mode=False) -> str:
+    # with_rank: return (url, priority_rank), so the page can be requeued with its own rank
+    def dequeue_and_mark_visited(self, priority_queue_mode=False, with_rank=False):
 
         # Fetch the most recent entry
         # Previous: ORDER BY added_at ASC
@@ -138,14 +269,16 @@ class GraphInterface:
         if priority_queue_mode:
             # PRIORITY QUEUE W/ RANKING
             self.cursor.execute("""
-                SELECT id, url FROM queue
+                SELECT id, url, priority_rank FROM queue
+                WHERE deferred = 0
                 ORDER BY priority_rank DESC, added_at DESC
                 LIMIT 1
             """)
         else:
             # BREADTH FIRST SEARCH
             self.cursor.execute("""
-                SELECT id, url FROM queue
+                SELECT id, url, priority_rank FROM queue
+                WHERE deferred = 0
                 ORDER BY id ASC, added_at DESC
                 LIMIT 1
             """)
@@ -153,9 +286,9 @@ class GraphInterface:
         row = self.cursor.fetchone()
 
         if row is None:
-            return None  # Queue is empty
+            return (None, None) if with_rank else None  # Queue is empty
 
-        entry_id, url = row
+        entry_id, url, priority_rank = row
 
         print("dequeued id and url: ", entry_id, url)
 
@@ -166,8 +299,103 @@ class GraphInterface:
 
         self.conn.commit()
 
-        return url
+        return (url, priority_rank) if with_rank else url
     
+    # Next (id, url) no live lease holds, in dequeue order
+    def _next_claimable(self, priority_queue_mode: bool, now: float):
+        order = "priority_rank DESC, added_at DESC" if priority_queue_mode else "id ASC"
+        self.cursor.execute(f"""
+            SELECT id, url FROM queue
+            WHERE deferred = 0 AND (claimed_by IS NULL OR lease_expires < ?)
+            ORDER BY {order}
+            LIMIT 1
+        """, (now,))
+        return self.cursor.fetchone()
+
+    # Multi-process dequeue: lease the next entry to worker_id instead of removing it.
+    # The entry leaves the queue when record_page(..., claimed_url=url) stores the page;
+    # if that doesn't happen within lease_seconds any worker can claim it again.
+    def claim_next(self, worker_id: str, lease_seconds: float = LEASE_SECONDS, priority_queue_mode=False) -> str:
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't pick the same entry
+        self.conn.commit()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = self._next_claimable(priority_queue_mode, now)
+            if row is not None:
+                self.cursor.execute(
+                    "UPDATE queue SET claimed_by = ?, lease_expires = ? WHERE id = ?",
+                    (worker_id, now + lease_seconds, row[0])
+                )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+        if row is None:
+            return None  # Queue empty, or every entry is leased
+
+        entry_id, url = row
+        print("claimed id and url: ", entry_id, url)
+        return url
+
+    # A page whose fetch failed goes back in the queue (out of visited / its claim) so it is crawled
+    # again later instead of being stored without links. Pass the rank it was queued with: retry
+    # counts and penalties are the crawler's business, not something to persist.
+    # deferred: the crawl gave up on it for now; it stays queued but isn't handed out until release_deferred()
+    def requeue(self, url: str, priority_rank: float = 0, deferred: bool = False) -> bool:
+        with self.conn:
+            self.cursor.execute("DELETE FROM visited WHERE url = ?", (url,))
+            self.cursor.execute("DELETE FROM queue WHERE url = ?", (url,))
+            self.cursor.execute(
+                "INSERT INTO queue (url, priority_rank, deferred) VALUES (?, ?, ?)", (url, priority_rank, int(deferred))
+            )
+
+        if self._seen is not None:
+            self._seen.add(url)
+        return True
+
+    # Hand a claimed entry back (e.g. its fetch failed) so it can be claimed again right away
+    def release_claim(self, url: str, worker_id: str) -> bool:
+        with self.conn:
+            self.cursor.execute(
+                "UPDATE queue SET claimed_by = NULL, lease_expires = NULL WHERE url = ? AND claimed_by = ?",
+                (url, worker_id)
+            )
+        return self.cursor.rowcount > 0
+
+    # Give up on a claimed entry for now: unclaimed and deferred, so no worker claims it again this crawl
+    def defer_claim(self, url: str, worker_id: str) -> bool:
+        with self.conn:
+            self.cursor.execute(
+                """
+                UPDATE queue SET claimed_by = NULL, lease_expires = NULL, deferred = 1
+                WHERE url = ? AND claimed_by = ?
+                """,
+                (url, worker_id)
+            )
+        return self.cursor.rowcount > 0
+
+    # Make entries deferred by an earlier crawl claimable again; returns how many there were
+    def release_deferred(self) -> int:
+        with self.conn:
+            self.cursor.execute("UPDATE queue SET deferred = 0 WHERE deferred = 1")
+        return self.cursor.rowcount
+
+    # Clear leases that have run out; returns how many entries went back to the queue
+    def release_expired_leases(self) -> int:
+        with self.conn:
+            self.cursor.execute(
+                "UPDATE queue SET claimed_by = NULL, lease_expires = NULL WHERE lease_expires < ?",
+                (time.time(),)
+            )
+        return self.cursor.rowcount
+
+    def get_claimed_count(self) -> int:
+        self.cursor.execute("SELECT COUNT(*) FROM queue WHERE claimed_by IS NOT NULL")
+        (count,) = self.cursor.fetchone()
+        return count
+
     def add_node(self, page_name: str, cats: set) -> bool:
 
         try:
@@ -201,17 +429,76 @@ class GraphInterface:
 
         return success
     
-    def get_all_nodes(self) -> list[tuple]:
+    # A crawled page in one transaction: node, edge to every child, and queue entries for new children
+    # children are page names (edges); scores maps child URL -> priority rank for the ones to queue.
+    # Returns how many URLs were actually queued (already queued / visited ones are skipped).
+    # claimed_url: the queue entry this page was claimed from, moved to visited in the same transaction
+    def record_page(
+        self, page_name: str, cats: set, children: list[str], scores: dict[str, float], claimed_url: str = None
+    ) -> int:
+
+        scores = {canonical_url(url): priority_rank for url, priority_rank in scores.items()}
+        with self.conn:
+            if claimed_url is not None:
+                self.cursor.execute("DELETE FROM queue WHERE url = ?", (claimed_url,))
+                self.cursor.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (claimed_url,))
+            self.cursor.execute(
+                "INSERT OR IGNORE INTO nodes (page_title, page_cats) VALUES (?, ?)",
+                (page_name, str(cats))
+            )
+            self.cursor.executemany(
+                "INSERT INTO edge_list (origin_page, referenced_page) VALUES (?, ?)",
+                [(page_name, child) for child in children]
+            )
+            self.cursor.executemany(
+                """
+                INSERT OR IGNORE INTO queue (url, priority_rank)
+                SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM visited WHERE url = ?)
+                """,
+                [(url, priority_rank, url) for url, priority_rank in scores.items()]
+            )
+            queued = self.cursor.rowcount
+
+        if self._seen is not None:
+            self._seen.update(scores)
+        self._mirror_visited(claimed_url, page_name)
+        return queued
+
+    # A fetched page that was really another page: from_url goes to visited (out of the queue / its
+    # claim) with a single edge to to_url, and is not stored as a node; to_url is recorded on its own
+    def record_redirect(self, from_url: str, to_url: str, claimed_url: str = None) -> bool:
+        from_url, to_url = canonical_url(from_url), canonical_url(to_url)
+        with self.conn:
+            if claimed_url is not None:
+                self.cursor.execute("DELETE FROM queue WHERE url = ?", (claimed_url,))
+                self.cursor.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (claimed_url,))
+            self.cursor.execute("INSERT OR IGNORE INTO visited (url) VALUES (?)", (from_url,))
+            self.cursor.execute(
+                """
+                INSERT INTO edge_list (origin_page, referenced_page)
+                SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM edge_list WHERE origin_page = ? AND referenced_page = ?)
+                """,
+                (from_url.split("/")[-1], to_url.split("/")[-1]) * 2
+            )
+            added = self.cursor.rowcount > 0
 
-        self.cursor.execute("SELECT page_title, page_cats FROM nodes ORDER BY page_title")
-        nodes = self.cursor.fetchall()
-        return nodes
+        if self._seen is not None:
+            self._seen.add(from_url)
+        self._mirror_visited(claimed_url)
+        return added
+
+    # iter_all_nodes / iter_all_edges stream rows from their own cursor, for exports of graphs too big for a list
+    def iter_all_nodes(self):
+        return self.conn.execute("SELECT page_title, page_cats FROM nodes ORDER BY page_title")
+
+    def iter_all_edges(self):
+        return self.conn.execute("SELECT origin_page, referenced_page FROM edge_list ORDER BY origin_page, referenced_page")
+
+    def get_all_nodes(self) -> list[tuple]:
+        return self.iter_all_nodes().fetchall()
     
     def get_all_edges(self) -> list[tuple]:
-
-        self.cursor.execute("SELECT origin_page, referenced_page FROM edge_list ORDER BY origin_page, referenced_page")
-        edges = self.cursor.fetchall()
-        return edges
+        return self.iter_all_edges().fetchall()
 
     def get_node_count(self) -> int:
         self.cursor.execute("SELECT COUNT(*) FROM nodes")
@@ -228,34 +515,507 @@ class GraphInterface:
         (count,) = self.cursor.fetchone()
         return count
 
+    # Queued entries not deferred, claimed ones included: pages still to crawl or in flight
+    def get_pending_count(self) -> int:
+        self.cursor.execute("SELECT COUNT(*) FROM queue WHERE deferred = 0")
+        (count,) = self.cursor.fetchone()
+        return count
+
     def get_visited_size(self) -> int:
         self.cursor.execute("SELECT COUNT(*) FROM visited")
         (count,) = self.cursor.fetchone()
         return count
     
     def export_to_csv(self):
-        output = self.db_path.split('.')[0]
+        output = os.path.splitext(self.db_path)[0]
 
         with open(output + "_nodes.csv", 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["page_name","categories"])
-            for row in self.get_all_nodes():
+            for row in self.iter_all_nodes():
                 writer.writerow(row)
 
         with open(output + "_edges.csv", 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["Source","Target"])
-            for row in self.get_all_edges():
+            for row in self.iter_all_edges():
                 writer.writerow(row)
-    
-def test_graph_interface():
-    print("Testing graph interface class...")
 
-    # Delete db file if it exists
-    if os.path.exists("test.db"):
-        os.remove("test.db")
 
-    g = GraphInterface("test.db")
+class InternedGraphInterface(GraphInterface):
+    """
+    GraphInterface over a schema where every page title is stored once and referenced by id:
+        pages   (page_id INTEGER PRIMARY KEY, title TEXT UNIQUE NOT NULL, url TEXT)
+        queue   (id INTEGER PRIMARY KEY AUTOINCREMENT, page_id INTEGER UNIQUE, added_at, priority_rank,
+                 claimed_by, lease_expires, deferred)
+        visited (page_id INTEGER PRIMARY KEY, scraped_at)
+        nodes   (page_id INTEGER PRIMARY KEY, page_cats TEXT)
+        edges   (origin_id INTEGER, target_id INTEGER, PRIMARY KEY (origin_id, target_id)) WITHOUT ROWID
+
+    A page is identified by its title (the URL path after /wiki/, as the crawler names nodes).
+    url is only stored when it is not the usual https://en.wikipedia.org/wiki/<title>. Edges are unique, so re-crawling a page
+    does not duplicate them. Methods take and return titles / URLs exactly like GraphInterface.
+    """
+
+    def __init__(
+        self,
+        db_path,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        mirror_seen: bool = False,
+        timeout: float = 5.0,
+    ):
+        super().__init__(
+            db_path, journal_mode=journal_mode, synchronous=synchronous, mirror_seen=mirror_seen, timeout=timeout
+        )
+        # title -> page_id, ids never change once assigned
+        self._page_ids: dict[str, int] = {}
+
+    def create_tables(self):
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            page_id INTEGER PRIMARY KEY,
+            title TEXT UNIQUE NOT NULL,
+            url TEXT
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            page_id INTEGER UNIQUE REFERENCES pages(page_id),
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            priority_rank FLOAT NOT NULL
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE INDEX IF NOT EXISTS queue_priority ON queue (priority_rank DESC, added_at DESC, page_id)
+        """)
+
+        self._add_claim_columns()
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS visited (
+            page_id INTEGER PRIMARY KEY REFERENCES pages(page_id),
+            scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS nodes (
+            page_id INTEGER PRIMARY KEY REFERENCES pages(page_id),
+            page_cats TEXT
+        )
+        """)
+
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS edges (
+            origin_id INTEGER REFERENCES pages(page_id),
+            target_id INTEGER REFERENCES pages(page_id),
+            PRIMARY KEY (origin_id, target_id)
+        ) WITHOUT ROWID
+        """)
+
+        self.conn.commit()
+
+    @staticmethod
+    def _title(url: str) -> str:
+        # Everything after /wiki/, so Star_Trek/Green_Lantern and Green_Lantern stay two pages
+        return url.split("/wiki/", 1)[1] if "/wiki/" in url else url.split("/")[-1]
+
+    # Ids for the given titles, adding pages rows for new ones. urls (title -> url) are stored when unusual.
+    # Runs inside the caller's transaction, if any.
+    def _intern(self, titles, urls: dict[str, str] = None) -> dict[str, int]:
+        urls = {title: url for title, url in (urls or {}).items() if url != self.URL_PREFIX + title}
+        new = [title for title in dict.fromkeys(titles) if title not in self._page_ids]
+
+        if new:
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO pages (title, url) VALUES (?, ?)",
+                [(title, urls.get(title)) for title in new]
+            )
+            self.cursor.execute(
+                "SELECT page_id, title FROM pages WHERE title IN (SELECT value FROM json_each(?))",
+                (json.dumps(new),)
+            )
+            for page_id, title in self.cursor.fetchall():
+                self._page_ids[title] = page_id
+
+        # Pages first seen as a bare edge target get their (unusual) URL once they are queued
+        if urls:
+            self.cursor.executemany(
+                "UPDATE pages SET url = ? WHERE page_id = ? AND url IS NULL",
+                [(url, self._page_ids[title]) for title, url in urls.items()]
+            )
+
+        return {title: self._page_ids[title] for title in titles}
+
+    def check_if_visited(self, url: str) -> bool:
+        url = canonical_url(url)
+        self.cursor.execute("""
+            SELECT 1 FROM visited JOIN pages USING (page_id) WHERE pages.title = ? LIMIT 1
+        """, (self._title(url),))
+        exists = self.cursor.fetchone() is not None
+        if exists: return False
+        else: return True
+
+    def enqueue(self, url: str, priority_rank: float = 0) -> bool:
+        url = canonical_url(url)
+        title = self._title(url)
+        try:
+            with self.conn:
+                page_id = self._intern([title], {title: url})[title]
+                self.cursor.execute(
+                    "INSERT INTO queue (page_id, priority_rank) VALUES (?, ?)", (page_id, priority_rank)
+                )
+            success = True
+        except sql.IntegrityError:
+            # Page already exists in the queue
+            success = False
+            self._page_ids.clear()  # anything interned in the rolled back transaction is gone
+
+        if self._seen is not None:
+            self._seen.add(url)
+        return success
+
+    def check_if_visited_then_enqueue(self, url: str, priority_rank: float = 0) -> bool:
+        if not self.check_if_visited(url):
+            return False
+        return self.enqueue(url, priority_rank)
+
+    def _load_seen(self) -> set[str]:
+        self.cursor.execute("""
+            SELECT COALESCE(url, ? || title) FROM pages
+            WHERE page_id IN (SELECT page_id FROM visited UNION SELECT page_id FROM queue)
+        """, (self.URL_PREFIX,))
+        return {url for (url,) in self.cursor.fetchall()}
+
+    def filter_unseen(self, urls) -> list[str]:
+        urls = list(dict.fromkeys(canonical_url(url) for url in urls))
+
+        if self.mirror_seen:
+            return super().filter_unseen(urls)
+
+        titles = {self._title(url): url for url in urls}
+        self.cursor.execute("""
+            SELECT candidate.value FROM json_each(?) AS candidate
+            WHERE NOT EXISTS (
+                SELECT 1 FROM pages
+                WHERE pages.title = candidate.value
+                  AND (pages.page_id IN (SELECT page_id FROM visited) OR pages.page_id IN (SELECT page_id FROM queue))
+            )
+        """, (json.dumps(list(titles)),))
+        unseen = {title for (title,) in self.cursor.fetchall()}
+        return [url for url in urls if self._title(url) in unseen]
+
+    def dequeue_and_mark_visited(self, priority_queue_mode=False, with_rank=False):
+
+        if priority_queue_mode:
+            # PRIORITY QUEUE W/ RANKING
+            self.cursor.execute("""
+                SELECT queue.id, queue.page_id, COALESCE(pages.url, ? || pages.title), queue.priority_rank
+                FROM queue JOIN pages USING (page_id)
+                WHERE queue.deferred = 0
+                ORDER BY queue.priority_rank DESC, queue.added_at DESC
+                LIMIT 1
+            """, (self.URL_PREFIX,))
+        else:
+            # BREADTH FIRST SEARCH
+            self.cursor.execute("""
+                SELECT queue.id, queue.page_id, COALESCE(pages.url, ? || pages.title), queue.priority_rank
+                FROM queue JOIN pages USING (page_id)
+                WHERE queue.deferred = 0
+                ORDER BY queue.id ASC
+                LIMIT 1
+            """, (self.URL_PREFIX,))
+
+        row = self.cursor.fetchone()
+
+        if row is None:
+            return (None, None) if with_rank else None  # Queue is empty
+
+        entry_id, page_id, url, priority_rank = row
+
+        print("dequeued id and url: ", entry_id, url)
+
+        self.cursor.execute("DELETE FROM queue WHERE id = ?", (entry_id,))
+        self.cursor.execute("INSERT INTO visited (page_id) VALUES (?)", (page_id,))
+
+        self.conn.commit()
+
+        return (url, priority_rank) if with_rank else url
+
+    def _next_claimable(self, priority_queue_mode: bool, now: float):
+        order = "queue.priority_rank DESC, queue.added_at DESC" if priority_queue_mode else "queue.id ASC"
+        self.cursor.execute(f"""
+            SELECT queue.id, COALESCE(pages.url, ? || pages.title) FROM queue JOIN pages USING (page_id)
+            WHERE queue.deferred = 0 AND (queue.claimed_by IS NULL OR queue.lease_expires < ?)
+            ORDER BY {order}
+            LIMIT 1
+        """, (self.URL_PREFIX, now))
+        return self.cursor.fetchone()
+
+    def requeue(self, url: str, priority_rank: float = 0, deferred: bool = False) -> bool:
+        title = self._title(url)
+        try:
+            with self.conn:
+                page_id = self._intern([title], {title: url})[title]
+                self.cursor.execute("DELETE FROM visited WHERE page_id = ?", (page_id,))
+                self.cursor.execute("DELETE FROM queue WHERE page_id = ?", (page_id,))
+                self.cursor.execute(
+                    "INSERT INTO queue (page_id, priority_rank, deferred) VALUES (?, ?, ?)",
+                    (page_id, priority_rank, int(deferred))
+                )
+        except BaseException:
+            self._page_ids.clear()
+            raise
+
+        if self._seen is not None:
+            self._seen.add(url)
+        return True
+
+    def release_claim(self, url: str, worker_id: str) -> bool:
+        with self.conn:
+            self.cursor.execute("""
+                UPDATE queue SET claimed_by = NULL, lease_expires = NULL
+                WHERE page_id = (SELECT page_id FROM pages WHERE title = ?) AND claimed_by = ?
+            """, (self._title(url), worker_id))
+        return self.cursor.rowcount > 0
+
+    def defer_claim(self, url: str, worker_id: str) -> bool:
+        with self.conn:
+            self.cursor.execute("""
+                UPDATE queue SET claimed_by = NULL, lease_expires = NULL, deferred = 1
+                WHERE page_id = (SELECT page_id FROM pages WHERE title = ?) AND claimed_by = ?
+            """, (self._title(url), worker_id))
+        return self.cursor.rowcount > 0
+
+    def add_node(self, page_name: str, cats: set) -> bool:
+
+        try:
+            with self.conn:
+                page_id = self._intern([page_name])[page_name]
+                self.cursor.execute("INSERT INTO nodes (page_id, page_cats) VALUES (?, ?)", (page_id, str(cats)))
+            success = True
+        except sql.IntegrityError:
+            # Node already exists
+            success = False
+            self._page_ids.clear()
+
+        return success
+
+    def add_edge(self, from_page_name: str, to_page_name: str) -> bool:
+
+        try:
+            with self.conn:
+                ids = self._intern([from_page_name, to_page_name])
+                self.cursor.execute(
+                    "INSERT INTO edges (origin_id, target_id) VALUES (?, ?)",
+                    (ids[from_page_name], ids[to_page_name])
+                )
+            success = True
+        except sql.IntegrityError:
+            # Edge already stored
+            success = False
+            self._page_ids.clear()
+
+        return success
+
+    def record_page(
+        self, page_name: str, cats: set, children: list[str], scores: dict[str, float], claimed_url: str = None
+    ) -> int:
+
+        scores = {canonical_url(url): priority_rank for url, priority_rank in scores.items()}
+        queue_titles = {self._title(url): url for url in scores}
+        try:
+            with self.conn:
+                ids = self._intern([page_name, *children, *queue_titles], queue_titles)
+
+                if claimed_url is not None:
+                    claimed_title = self._title(claimed_url)
+                    claimed_id = self._intern([claimed_title], {claimed_title: claimed_url})[claimed_title]
+                    self.cursor.execute("DELETE FROM queue WHERE page_id = ?", (claimed_id,))
+                    self.cursor.execute("INSERT OR IGNORE INTO visited (page_id) VALUES (?)", (claimed_id,))
+
+                self.cursor.execute(
+                    "INSERT OR IGNORE INTO nodes (page_id, page_cats) VALUES (?, ?)",
+                    (ids[page_name], str(cats))
+                )
+                self.cursor.executemany(
+                    "INSERT OR IGNORE INTO edges (origin_id, target_id) VALUES (?, ?)",
+                    [(ids[page_name], ids[child]) for child in children]
+                )
+                self.cursor.executemany(
+                    """
+                    INSERT OR IGNORE INTO queue (page_id, priority_rank)
+                    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM visited WHERE page_id = ?)
+                    """,
+                    [(ids[self._title(url)], priority_rank, ids[self._title(url)]) for url, priority_rank in scores.items()]
+                )
+                queued = self.cursor.rowcount
+        except BaseException:
+            self._page_ids.clear()  # anything interned in the rolled back transaction is gone
+            raise
+
+        if self._seen is not None:
+            self._seen.update(scores)
+        self._mirror_visited(claimed_url, page_name)
+        return queued
+
+    def record_redirect(self, from_url: str, to_url: str, claimed_url: str = None) -> bool:
+        from_url, to_url = canonical_url(from_url), canonical_url(to_url)
+        from_title, to_title = self._title(from_url), self._title(to_url)
+        try:
+            with self.conn:
+                ids = self._intern([from_title, to_title], {from_title: from_url, to_title: to_url})
+                if claimed_url is not None:
+                    claimed_title = self._title(claimed_url)
+                    claimed_id = self._intern([claimed_title], {claimed_title: claimed_url})[claimed_title]
+                    self.cursor.execute("DELETE FROM queue WHERE page_id = ?", (claimed_id,))
+                    self.cursor.execute("INSERT OR IGNORE INTO visited (page_id) VALUES (?)", (claimed_id,))
+                self.cursor.execute("INSERT OR IGNORE INTO visited (page_id) VALUES (?)", (ids[from_title],))
+                self.cursor.execute(
+                    "INSERT OR IGNORE INTO edges (origin_id, target_id) VALUES (?, ?)", (ids[from_title], ids[to_title])
+                )
+                added = self.cursor.rowcount > 0
+        except BaseException:
+            self._page_ids.clear()
+            raise
+
+        if self._seen is not None:
+            self._seen.add(from_url)
+        self._mirror_visited(claimed_url)
+        return added
+
+    def iter_all_nodes(self):
+        return self.conn.execute("""
+            SELECT pages.title, nodes.page_cats FROM nodes JOIN pages USING (page_id) ORDER BY pages.title
+        """)
+
+    def iter_all_edges(self):
+        return self.conn.execute("""
+            SELECT origin.title, target.title FROM edges
+            JOIN pages AS origin ON origin.page_id = edges.origin_id
+            JOIN pages AS target ON target.page_id = edges.target_id
+            ORDER BY origin.title, target.title
+        """)
+
+    def get_edge_count(self) -> int:
+        self.cursor.execute("SELECT COUNT(*) FROM edges")
+        (count,) = self.cursor.fetchone()
+        return count
+
+
+def is_interned_db(db_path: str) -> bool:
+    if not os.path.exists(db_path):
+        return False
+    conn = sql.connect(db_path)
+    try:
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pages'").fetchone()
+    finally:
+        conn.close()
+    return row is not None
+
+
+def open_graph(db_path, interned: bool = True, **kwargs) -> GraphInterface:
+    # Existing databases keep their schema; `interned` picks the schema for new ones
+    if os.path.exists(db_path) and os.path.getsize(db_path) > 0:
+        interned = is_interned_db(db_path)
+    cls = InternedGraphInterface if interned else GraphInterface
+    return cls(db_path, **kwargs)
+
+
+def migrate_to_interned(db_path: str, new_db_path: str = None, chunk_size: int = 10000) -> str:
+    """
+    Copy an old (string keyed) WikiGraph.db into the interned schema.
+    Duplicate edges are dropped; queue order, priorities and timestamps are kept.
+    Without new_db_path the database is converted in place and the old file kept as <db>.legacy.
+    The old database is only read (opened read-only), so <db>.legacy is the untouched original.
+    """
+    in_place = new_db_path is None
+    target_path = db_path + ".interned" if in_place else new_db_path
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+
+    old = sql.connect(f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro", uri=True)
+    tables = {name for (name,) in old.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # Databases from before priority ranking have no priority_rank column
+    queue_columns = [column[1] for column in old.execute("PRAGMA table_info(queue)")]
+    rank_column = "priority_rank" if "priority_rank" in queue_columns else "0"
+
+    new = InternedGraphInterface(target_path, journal_mode="DELETE")
+    new.create_tables()
+
+    def chunks(query, table):
+        if table not in tables:
+            return
+        cursor = old.execute(query)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+    with new.conn:
+        for rows in chunks("SELECT url, scraped_at FROM visited ORDER BY scraped_at", "visited"):
+            urls = {new._title(url): url for url, _ in rows}
+            ids = new._intern(list(urls), urls)
+            new.cursor.executemany(
+                "INSERT OR IGNORE INTO visited (page_id, scraped_at) VALUES (?, ?)",
+                [(ids[new._title(url)], scraped_at) for url, scraped_at in rows]
+            )
+
+        for rows in chunks(f"SELECT id, url, added_at, {rank_column} FROM queue ORDER BY id", "queue"):
+            urls = {new._title(url): url for _, url, _, _ in rows}
+            ids = new._intern(list(urls), urls)
+            new.cursor.executemany(
+                "INSERT OR IGNORE INTO queue (id, page_id, added_at, priority_rank) VALUES (?, ?, ?, ?)",
+                [(entry_id, ids[new._title(url)], added_at, rank) for entry_id, url, added_at, rank in rows]
+            )
+
+        for rows in chunks("SELECT page_title, page_cats FROM nodes", "nodes"):
+            ids = new._intern([title for title, _ in rows])
+            new.cursor.executemany(
+                "INSERT OR IGNORE INTO nodes (page_id, page_cats) VALUES (?, ?)",
+                [(ids[title], cats) for title, cats in rows]
+            )
+
+        for rows in chunks("SELECT origin_page, referenced_page FROM edge_list ORDER BY edge_id", "edge_list"):
+            ids = new._intern([title for edge in rows for title in edge])
+            new.cursor.executemany(
+                "INSERT OR IGNORE INTO edges (origin_id, target_id) VALUES (?, ?)",
+                [(ids[origin], ids[target]) for origin, target in rows]
+            )
+
+    new.cursor.execute("VACUUM")
+    old.close()
+    new.close_conn()
+
+    if in_place:
+        # An un-checkpointed WAL is part of the original, so it moves with it
+        os.replace(db_path, db_path + ".legacy")
+        if os.path.exists(db_path + "-wal") and os.path.getsize(db_path + "-wal") > 0:
+            os.replace(db_path + "-wal", db_path + ".legacy-wal")
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        os.replace(target_path, db_path)
+        return db_path
+    return target_path
+
+
+def test_graph_interface(cls=GraphInterface):
+    print(f"Testing {cls.__name__} class...")
+
+    # Delete db files if they exist
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test.db" + suffix):
+            os.remove("test.db" + suffix)
+
+    g = cls("test.db")
     g.create_tables()
 
     # CHECK QUEUE AND DEQUEUE
@@ -296,16 +1056,219 @@ def test_graph_interface():
     # Should not be able to add duplicate nodes
     assert(not g.add_node('a', []))
 
+    # CHECK BULK MEMBERSHIP
+    assert(g.filter_unseen(["a", "new1", "c", "new2", "new1"]) == ["new1", "new2"])
+    assert(g.filter_unseen([]) == [])
+
+    # CHECK RECORD PAGE
+    assert(g.check_if_visited_then_enqueue("b"))
+    assert(g.record_page('b', {'Letters'}, ['a', 'x', 'y'], {"a": 0.5, "x": 0.1, "y": 0.9, "b": 0}) == 2)
+    assert(g.get_all_edges() == [('a', 'b'), ('b', 'a'), ('b', 'x'), ('b', 'y')])
+    assert(('b', "{'Letters'}") not in g.get_all_nodes())  # b was already a node
+    # visited "a" and already queued "b" were skipped
+    assert(g.get_queue_size() == 3)
+    assert(g.dequeue_and_mark_visited(priority_queue_mode=True) == "y")
+    assert(g.filter_unseen(["a", "b", "x", "y", "z"]) == ["z"])
+
+    # Mirrored lookups agree with the database
+    g.mirror_seen = True
+    assert(g.filter_unseen(["a", "b", "x", "y", "z"]) == ["z"])
+    g.record_page('x', set(), ['z'], {"z": 0})
+    assert(g.filter_unseen(["z", "w"]) == ["w"])
+    g.mirror_seen = False
+    assert(g.filter_unseen(["z", "w"]) == ["w"])
+
+    # A failed record_page leaves nothing behind, and pages recorded later keep their own rows
+    try:
+        g.record_page('fail', set(), ['ghost'], {"ghost": [0]})
+        assert(False)
+    except sql.Error:
+        pass
+    assert('fail' not in dict(g.get_all_nodes()))
+    g.record_page('p', set(), ['q'], {})
+    g.record_page('fail', set(), ['ghost'], {})
+    assert(('fail', 'ghost') in g.get_all_edges() and ('p', 'q') in g.get_all_edges())
+
+    # CHECK CANONICAL URLS AND REDIRECTS
+    fnaf = "https://en.wikipedia.org/wiki/Five_Nights_at_Freddy%27s"
+    assert(g.check_if_visited_then_enqueue("https://en.wikipedia.org/wiki/five_Nights_at_Freddy's#Gameplay"))
+    assert(not g.check_if_visited_then_enqueue(fnaf))
+    assert(g.filter_unseen([
+        fnaf, "https://en.wikipedia.org/wiki/Five Nights at Freddy's", "https://en.wikipedia.org/wiki/Poem"
+    ]) == ["https://en.wikipedia.org/wiki/Poem"])
+    assert(g.record_redirect("https://en.wikipedia.org/wiki/poem", "https://en.wikipedia.org/wiki/Poetry"))
+    assert(not g.record_redirect("https://en.wikipedia.org/wiki/Poem", "https://en.wikipedia.org/wiki/Poetry"))
+    assert(("Poem", "Poetry") in g.get_all_edges())
+    assert("Poem" not in dict(g.get_all_nodes()))
+    assert(not g.check_if_visited("https://en.wikipedia.org/wiki/Poem"))
+    assert(g.filter_unseen(["https://en.wikipedia.org/wiki/Poem"]) == [])
+
+    # A failed record_redirect doesn't leave ids for rolled back pages rows behind either
+    try:
+        g.record_redirect("https://en.wikipedia.org/wiki/Verse", "https://en.wikipedia.org/wiki/Poetry", claimed_url=[])
+        assert(False)
+    except (sql.Error, AttributeError):
+        pass
+    g.record_page('r', set(), ['s'], {})
+    assert(g.record_redirect("https://en.wikipedia.org/wiki/Verse", "https://en.wikipedia.org/wiki/Poetry"))
+    assert(("Verse", "Poetry") in g.get_all_edges() and ('r', 's') in g.get_all_edges())
+
+    # With mirror_seen, a page recorded from its claimed entry (here the target of a redirect) is seen too
+    sonnet = "https://en.wikipedia.org/wiki/Sonnet"
+    mirrored = cls("test.db", mirror_seen=True)
+    assert(mirrored.filter_unseen([sonnet, "https://en.wikipedia.org/wiki/Sonnets"]) == [
+        sonnet, "https://en.wikipedia.org/wiki/Sonnets"
+    ])
+    mirrored.record_redirect("https://en.wikipedia.org/wiki/Sonnets", sonnet)
+    mirrored.record_page("Sonnet", set(), ["Poetry"], {}, claimed_url=sonnet)
+    assert(mirrored.filter_unseen([sonnet, "https://en.wikipedia.org/wiki/sonnets"]) == [])
+    mirrored.close_conn()
+    assert(g.filter_unseen([sonnet]) == [])
+
     #Test export to csv
     #g.export_to_csv()
 
     g.close_conn()
 
-    # Delete db file if it exists
-    if os.path.exists("test.db"):
-        os.remove("test.db")
+    # Delete db files if they exist
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test.db" + suffix):
+            os.remove("test.db" + suffix)
+
+def test_claims(cls=GraphInterface):
+    print(f"Testing {cls.__name__} queue claims...")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_claims.db" + suffix):
+            os.remove("test_claims.db" + suffix)
+
+    g = cls("test_claims.db")
+    g.create_tables()
+    other = cls("test_claims.db")
+    for url in ("a", "b", "c"):
+        g.check_if_visited_then_enqueue(url)
+
+    # Two workers never get the same entry
+    assert(g.claim_next("w1") == "a")
+    assert(other.claim_next("w2") == "b")
+    assert(g.get_claimed_count() == 2)
+    # Claimed entries are still queued / seen
+    assert(g.get_queue_size() == 3 and g.filter_unseen(["a", "b", "d"]) == ["d"])
+
+    # Recording the claimed page moves it to visited in the same transaction
+    g.record_page("a", set(), ["d"], {"d": 0}, claimed_url="a")
+    assert(not g.check_if_visited("a") and g.get_queue_size() == 3)
+
+    # A failed fetch hands the entry back; only its holder can release it
+    assert(not g.release_claim("b", "w1"))
+    assert(other.release_claim("b", "w2"))
+    assert(g.claim_next("w1") == "b")
+
+    # A failed fetch goes back in the queue with the rank it is given, out of visited / its claim
+    g.requeue("d", 0.7)
+    assert(g.dequeue_and_mark_visited(priority_queue_mode=True, with_rank=True) == ("d", 0.7))
+    assert(not g.check_if_visited("d"))
+    g.requeue("d", 0.7)
+    assert(g.check_if_visited("d") and g.get_queue_size() == 3)
+    assert(g.claim_next("w1") == "c")
+    g.requeue("c")
+    assert(g.get_claimed_count() == 1 and g.get_queue_size() == 3)
+    g.requeue("a")
+    assert(g.check_if_visited("a") and g.get_queue_size() == 4)
+    assert(g.claim_next("w1") == "d")
+    assert(g.claim_next("w1") == "c")
+    assert(g.claim_next("w1") == "a")
+    for url in ("d", "c", "a"):
+        g.requeue(url)
+
+    # A worker that dies keeps its lease until it runs out, then the entry is claimable again
+    assert(other.claim_next("dead", lease_seconds=-1) == "d")
+    assert(g.release_expired_leases() == 1)
+    assert(g.claim_next("w1", lease_seconds=-1) == "d")
+    assert(g.claim_next("w2") == "d")
+    assert(g.claim_next("w2") == "c")
+    assert(g.claim_next("w2") == "a")
+    assert(g.claim_next("w2") is None)
+
+    # Deferred entries stay queued and seen, but nobody gets them until they are released
+    assert(g.get_pending_count() == g.get_queue_size() == 4)
+    assert(g.defer_claim("d", "w2") and not g.defer_claim("c", "w1"))
+    g.release_claim("c", "w2")
+    g.requeue("a", 0.5, deferred=True)
+    assert(g.get_queue_size() == 4 and g.get_pending_count() == 2 and g.filter_unseen(["a", "d"]) == [])
+    assert(other.claim_next("w1") == "c")
+    assert(other.claim_next("w1") is None)
+    assert(g.release_deferred() == 2 and g.get_pending_count() == 4)
+    assert(g.dequeue_and_mark_visited(priority_queue_mode=True, with_rank=True) == ("a", 0.5))
+    assert(other.claim_next("w1") == "d")
+    # The single-process dequeue skips them too
+    g.requeue("a", 0.9, deferred=True)
+    assert(g.dequeue_and_mark_visited(priority_queue_mode=True) not in ("a", None))
+
+    other.close_conn()
+    g.close_conn()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_claims.db" + suffix):
+            os.remove("test_claims.db" + suffix)
+
+def test_migrate_to_interned():
+    print("Testing migration to the interned schema...")
+
+    for path in ("test_legacy.db", "test_legacy.db.legacy"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    g = GraphInterface("test_legacy.db")
+    g.create_tables()
+    g.check_if_visited_then_enqueue("https://en.wikipedia.org/wiki/Harry_Potter")
+    g.dequeue_and_mark_visited()
+    # Page crawled twice -> duplicated edges in the old schema
+    for _ in range(2):
+        g.record_page("Harry_Potter", {"Novels"}, ["Hogwarts", "J._K._Rowling"], {
+            "https://en.wikipedia.org/wiki/Hogwarts": 0.9,
+            "https://en.wikipedia.org/wiki/J._K._Rowling": 0.4,
+        })
+    assert(g.get_edge_count() == 4)
+    nodes = g.get_all_nodes()
+    g.close_conn()
+    with open("test_legacy.db", "rb") as f:
+        original = f.read()
+
+    migrate_to_interned("test_legacy.db")
+    # The backup is the original file, not one the migration has written to
+    with open("test_legacy.db.legacy", "rb") as f:
+        assert(f.read() == original)
+    assert(is_interned_db("test_legacy.db"))
+
+    g = open_graph("test_legacy.db")
+    assert(isinstance(g, InternedGraphInterface))
+    assert(g.get_all_edges() == [("Harry_Potter", "Hogwarts"), ("Harry_Potter", "J._K._Rowling")])
+    assert(g.get_all_nodes() == nodes)
+    assert(g.get_visited_size() == 1 and g.get_queue_size() == 2)
+    assert(not g.check_if_visited("https://en.wikipedia.org/wiki/Harry_Potter"))
+    # Queue priorities survive
+    assert(g.dequeue_and_mark_visited(priority_queue_mode=True) == "https://en.wikipedia.org/wiki/Hogwarts")
+    # Re-crawling a page no longer duplicates its edges
+    g.record_page("Harry_Potter", {"Novels"}, ["Hogwarts", "J._K._Rowling"], {})
+    assert(g.get_edge_count() == 2)
+    g.close_conn()
+
+    for path in ("test_legacy.db", "test_legacy.db.legacy"):
+        os.remove(path)
 
 if __name__ == '__main__':
 
+    # python sqlite_interface.py migrate <path/to/WikiGraph.db> converts an old database in place
+    import sys
+    if len(sys.argv) == 3 and sys.argv[1] == "migrate":
+        before = os.path.getsize(sys.argv[2])
+        migrate_to_interned(sys.argv[2])
+        print(f"Migrated {sys.argv[2]}: {before} -> {os.path.getsize(sys.argv[2])} bytes (old file kept as .legacy)")
+        sys.exit()
+
     test_graph_interface()
+    test_graph_interface(InternedGraphInterface)
+    test_claims()
+    test_claims(InternedGraphInterface)
+    test_migrate_to_interned()
     print("Tests passed good job!")
\ No newline at end of file
@@ -0,0 +1,457 @@
+"""
+Local stand-in for en.wikipedia.org so crawls can be tested without the network.
+
+Serves canned article HTML laid out like a real Wikipedia page: the article body
+lives in div#mw-content-text and the categories in div#mw-normal-catlinks, with
+some navigation / namespace / fragment links mixed in that the crawler should skip.
+
+    pages = {"A": {"links": ["B", "C"], "cats": ["Letters"]}, ...}
+    with StubWikiServer(pages, delay=0.2) as server:
+        crawl(server.url("A"), 10)
+
+`failures` maps a title to how many 503 responses it returns before serving the page
+(429 Too Many Requests with a Retry-After header instead when retry_after is set).
+`redirects` maps a title to the page it redirects to; like Wikipedia, the target's HTML is
+served under the redirect's URL and names the target in <link rel="canonical">.
+"""
+
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_article_html(title: str, links: list[str], cats: list[str]) -> str:
+    body_links = "\n".join(
+        f'<li><a href="/wiki/{link}" title="{escape(link)}">{escape(link.replace("_", " "))}</a></li>'
+        for link in links
+    )
+    cat_links = "\n".join(
+        f'<li><a href="/wiki/Category:{escape(cat.replace(" ", "_"))}">{escape(cat)}</a></li>'
+        for cat in cats
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><title>{escape(title)} - Wikipedia</title><link rel="canonical" href="/wiki/{title}"></head>
+<body>
+<div id="mw-navigation"><a href="/wiki/Main_Page">Main page</a></div>
+<div id="content">
+<h1 id="firstHeading">{escape(title.replace("_", " "))}</h1>
+<div id="mw-content-text" class="mw-body-content">
+<div class="mw-parser-output">
+<p><b>{escape(title)}</b> is a test article.<sup><a href="#cite_note-1">[1]</a></sup></p>
+<ul>
+{body_links}
+</ul>
+<p>See <a href="/wiki/Help:Contents">help</a> and <a href="/wiki/{title}#History">history</a>.</p>
+</div>
+</div>
+<div id="catlinks" class="catlinks">
+<div id="mw-normal-catlinks" class="mw-normal-catlinks">
+<a href="/wiki/Help:Category" title="Help:Category">Categories</a>:
+<ul>
+{cat_links}
+</ul>
+</div>
+</div>
+</div>
+</body>
+</html>
+"""
+
+
+class StubWikiServer:
+    # Threaded HTTP server on 127.0.0.1 serving /wiki/<title> from a dict of pages
+    def __init__(
+        self,
+        pages: dict[str, dict],
+        delay: float = 0.0,
+        failures: dict[str, int] = None,
+        retry_after: int = None,
+        redirects: dict[str, str] = None,
+    ):
+        self.pages = pages
+        self.redirects = dict(redirects or {})
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.retry_after = retry_after
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so clients can keep the connection alive between requests
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                title = self.path.split("?")[0].split("/wiki/")[-1]
+                with server._lock:
+                    server.request_count += 1
+                    failing = server.failures.get(title, 0) > 0
+                    if failing:
+                        server.failures[title] -= 1
+                if server.delay:
+                    time.sleep(server.delay)
+
+                if failing:
+                    if server.retry_after is not None:
+                        self.send_response(429)
+                        self.send_header("Retry-After", str(server.retry_after))
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                    else:
+                        self.send_error(503)
+                    return
+
+                title = server.redirects.get(title, title)
+                page = server.pages.get(title)
+                if page is None:
+                    self.send_error(404)
+                    return
+
+                body = make_article_html(title, page.get("links", []), page.get("cats", [])).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = None
+
+    def url(self, title: str) -> str:
+        return f"http://127.0.0.1:{self.port}/wiki/{title}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def make_test_pages(count: int, fanout: int = 5) -> dict[str, dict]:
+    # Small deterministic link graph: Page_i links to the next `fanout` pages (wrapping)
+    pages = {}
+    for i in range(count):
+        links = [f"Page_{(i + j) % count}" for j in range(1, fanout + 1)]
+        pages[f"Page_{i}"] = {"links": links, "cats": [f"Group {i % 3}"]}
+    return pages
+
+
+def test_concurrent_crawl():
+    import json
+    import os
+    import tempfile
+
+    import create_wiki_graph
+    from sqlite_interface import InternedGraphInterface, open_graph
+    from wiki_interface import configure_cache
+
+    print("Testing concurrent crawl against stub server...")
+    configure_cache(enabled=False)
+
+    pages = make_test_pages(40)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, delay=0.2) as server:
+        os.chdir(tmp)
+        try:
+            # Sequential baseline
+            events = []
+            start = time.perf_counter()
+            result = create_wiki_graph.crawl(
+                server.url("Page_0"), 8, progress_callback=events.append, trace_path="trace.jsonl"
+            )
+            sequential_time = time.perf_counter() - start
+            assert(result["nodes_processed"] == 8)
+            assert([e["index"] for e in events] == list(range(8)))
+
+            # Per-stage timings: the stub's delay shows up as fetch time
+            assert(all(e["timings"]["fetch"] >= 0.2 for e in events))
+            assert(all(set(e["timings"]) == {"fetch", "parse", "membership", "scoring", "db"} for e in events))
+            stages = result["timings"]["stages"]
+            assert(result["timings"]["pages"] == 8 and stages["fetch"]["share"] > 0.5)
+            with open("trace.jsonl", encoding="utf-8") as f:
+                trace = [json.loads(line) for line in f]
+            assert([line["page"] for line in trace] == [e["current_page"] for e in events])
+
+            # Concurrent run resumes from the same frontier in a fresh folder
+            os.makedirs("concurrent")
+            os.chdir("concurrent")
+            events = []
+            start = time.perf_counter()
+            result = create_wiki_graph.crawl(server.url("Page_0"), 8, progress_callback=events.append, workers=4)
+            concurrent_time = time.perf_counter() - start
+            assert(result["nodes_processed"] == 8)
+            assert([e["index"] for e in events] == list(range(8)))
+            assert(concurrent_time < sequential_time)
+
+            g = open_graph("Page_0/WikiGraph.db")
+            assert(isinstance(g, InternedGraphInterface))
+            assert(g.get_node_count() == 8)
+            assert(g.get_visited_size() == 8)
+            # Each page links to 5 others; every link becomes an edge
+            assert(g.get_edge_count() == 8 * 5)
+            g.close_conn()
+
+            # Cancelling stops new dispatches but still records pages already in flight
+            def cancel_after_two(event):
+                if event["index"] == 1:
+                    create_wiki_graph.global_cancel_check = True
+
+            result = create_wiki_graph.crawl(server.url("Page_0"), 20, progress_callback=cancel_after_two, workers=4)
+            create_wiki_graph.global_cancel_check = False
+            # Up to one page in flight per worker, plus pages finished while the cancel was on its way
+            assert(2 <= result["nodes_processed"] <= 2 + 2 * 3)
+        finally:
+            os.chdir(cwd)
+            configure_cache()
+
+
+def test_failed_fetch_requeue():
+    import os
+    import tempfile
+
+    import create_wiki_graph
+    from sqlite_interface import open_graph
+    from wiki_interface import configure_cache, configure_rate_limit, configure_session
+
+    print("Testing re-queued fetches against stub server...")
+    configure_cache(enabled=False)
+    configure_session(max_retries=0, backoff_factor=0)
+    # Each 503 halves the rate; keep it from dropping far enough to slow the test down
+    configure_rate_limit(rate=50.0, min_rate=20.0)
+
+    pages = make_test_pages(8)
+    cwd = os.getcwd()
+    try:
+        # Page_2 is unavailable twice and then fine, Page_3 never comes back
+        with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, failures={"Page_2": 2, "Page_3": 100}) as server:
+            os.chdir(tmp)
+            events = []
+            result = create_wiki_graph.crawl(
+                server.url("Page_0"), 20, progress_callback=events.append, workers=2, export_csv=False
+            )
+            # Everything but Page_3; the crawl ends once only pages it gave up on are queued
+            assert(result["nodes_processed"] == 7)
+            fetch = result["fetch"]
+            assert(fetch["requeued"] == 2 + create_wiki_graph.MAX_FETCH_ATTEMPTS)
+            assert(fetch["deferred"] == 1)
+            assert(0 < events[-1]["fetch"]["throttled"] <= fetch["throttled"])
+
+            g = open_graph("Page_0/WikiGraph.db")
+            titles = [title for title, _ in g.get_all_nodes()]
+            # Page_2 got its links once it came back; Page_3 was never stored as a dead end
+            assert("Page_2" in titles and ("Page_2", "Page_3") in g.get_all_edges())
+            assert("Page_3" not in titles)
+            # ... and is still queued for the next session
+            assert(g.filter_unseen([server.url("Page_3")]) == [])
+            assert(g.check_if_visited(server.url("Page_3")))
+            assert(g.get_queue_size() == 1 and g.get_pending_count() == 0)
+            g.close_conn()
+            os.chdir(cwd)
+
+        # Same with worker processes: once one gives up on Page_3 the others don't claim it again
+        with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, failures={"Page_3": 100}) as server:
+            os.chdir(tmp)
+            result = create_wiki_graph.crawl(server.url("Page_0"), 20, processes=2, export_csv=False)
+            assert(result["nodes_processed"] == 7)
+            g = open_graph("Page_0/WikiGraph.db")
+            assert(g.get_queue_size() == 1 and g.get_pending_count() == 0 and g.get_claimed_count() == 0)
+            g.close_conn()
+            os.chdir(cwd)
+
+        # A crawl that dies after giving up on a page still has it queued: it is deferred in the
+        # database right away, not held in memory until the crawl ends
+        pages = make_test_pages(20, fanout=3)
+        with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, failures={"Page_3": 100}) as server:
+            os.chdir(tmp)
+
+            class Crashed(Exception):
+                pass
+
+            def crash_once_deferred(event):
+                if event["fetch"]["deferred"]:
+                    raise Crashed()
+
+            try:
+                create_wiki_graph.crawl(server.url("Page_0"), 20, progress_callback=crash_once_deferred, export_csv=False)
+                assert(False)
+            except Crashed:
+                pass
+            g = open_graph("Page_0/WikiGraph.db")
+            assert(g.check_if_visited(server.url("Page_3")) and g.filter_unseen([server.url("Page_3")]) == [])
+            g.close_conn()
+            # The next crawl tries it again
+            result = create_wiki_graph.crawl(server.url("Page_0"), 20, export_csv=False)
+            assert(result["fetch"]["requeued"] == create_wiki_graph.MAX_FETCH_ATTEMPTS)
+            os.chdir(cwd)
+    finally:
+        os.chdir(cwd)
+        configure_rate_limit()
+        configure_session()
+        configure_cache()
+
+
+def test_redirect_crawl():
+    import os
+    import tempfile
+
+    import create_wiki_graph
+    from sqlite_interface import open_graph
+    from wiki_interface import configure_cache
+
+    print("Testing redirects and duplicate spellings against stub server...")
+    configure_cache(enabled=False)
+
+    pages = make_test_pages(10)
+    pages["Page_0"]["links"] += ["Alias", "page_1", "Page_2#History"]
+    pages["Page_1"]["links"] += ["Other_alias"]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, redirects={"Alias": "Page_3", "Other_alias": "Page_3"}) as server:
+        os.chdir(tmp)
+        try:
+            # Another spelling of the seed crawls into the same folder
+            result = create_wiki_graph.crawl(server.url("page_0"), 20, export_csv=False)
+            assert(result["search_topic_name"] == "Page_0")
+            assert(result["nodes_processed"] == 10)
+
+            # Both redirects were fetched once and stored as edges; Page_3's content was only
+            # recorded once, and fetched again only when a redirect to it came after it
+            fetch = result["fetch"]
+            assert(fetch["redirects"] == 2)
+            assert(server.request_count == 10 + fetch["duplicates"])
+            assert(fetch["links_rewritten"] > 0 and fetch["dedup_rate"] > 0)
+
+            g = open_graph("Page_0/WikiGraph.db")
+            titles = [title for title, _ in g.get_all_nodes()]
+            assert(sorted(titles) == sorted(pages))
+            edges = g.get_all_edges()
+            assert(("Alias", "Page_3") in edges and ("Other_alias", "Page_3") in edges)
+            assert(("Page_0", "page_1") not in edges and ("Page_0", "Page_1") in edges)
+            assert(g.get_queue_size() == 0)
+            g.close_conn()
+        finally:
+            os.chdir(cwd)
+            configure_cache()
+
+
+def test_multiprocess_crawl():
+    import os
+    import tempfile
+
+    import create_wiki_graph
+    from sqlite_interface import open_graph
+    from wiki_interface import configure_cache
+
+    print("Testing multi-process crawl against stub server...")
+    configure_cache(enabled=False)
+
+    pages = make_test_pages(40)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages, delay=0.1) as server:
+        os.chdir(tmp)
+        try:
+            # A worker of an earlier run died holding the seed; its lease runs out and the seed is re-crawled
+            os.makedirs("Page_0")
+            g = open_graph("Page_0/WikiGraph.db")
+            g.create_tables()
+            g.check_if_visited_then_enqueue(server.url("Page_0"))
+            assert(g.claim_next("crashed-worker", lease_seconds=0.5) == server.url("Page_0"))
+            g.close_conn()
+
+            events = []
+            result = create_wiki_graph.crawl(server.url("Page_0"), 12, progress_callback=events.append, processes=3)
+            # Budget is shared: 12 pages in total, each fetched once
+            assert(result["nodes_processed"] == 12)
+            assert([e["index"] for e in events] == list(range(12)))
+            assert(len({e["current_page"] for e in events}) == 12)
+            assert(len({e["worker"] for e in events}) > 1)
+            assert(result["timings"]["pages"] == 12 and all(e["timings"]["fetch"] >= 0.1 for e in events))
+
+            g = open_graph("Page_0/WikiGraph.db")
+            assert(g.get_node_count() == 12)
+            assert(g.get_visited_size() == 12)
+            assert(g.get_edge_count() == 12 * 5)
+            assert(g.get_claimed_count() == 0)
+            g.close_conn()
+            assert(os.path.exists("Page_0/WikiGraph_edges.csv"))
+
+            # The cancel flag stops every worker after the page it is on
+            def cancel_after_two(event):
+                if event["index"] == 1:
+                    create_wiki_graph.global_cancel_check = True
+
+            result = create_wiki_graph.crawl(
+                server.url("Page_0"), 20, progress_callback=cancel_after_two, processes=3, export_csv=False
+            )
+            create_wiki_graph.global_cancel_check = False
+            # Up to one page in flight per worker, plus pages finished while the cancel was on its way
+            assert(2 <= result["nodes_processed"] <= 2 + 2 * 3)
+        finally:
+            os.chdir(cwd)
+            configure_cache()
+
+
+def test_target_crawl():
+    import importlib.util
+    import os
+    import tempfile
+
+    import create_wiki_graph
+    from wiki_interface import configure_cache
+
+    # Target races rank the frontier with the sentence transformer
+    if importlib.util.find_spec("torch") is None:
+        print("torch is not installed, skipping target crawl test")
+        return
+
+    print("Testing target crawl against stub server...")
+    configure_cache(enabled=False)
+
+    pages = make_test_pages(40, fanout=3)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp, StubWikiServer(pages) as server:
+        os.chdir(tmp)
+        try:
+            result = create_wiki_graph.crawl(
+                server.url("Page_0"), 40, target_page=server.url("Page_10"), workers=2, export_csv=False
+            )
+            path = result["path"]
+            assert(result["target_found"])
+            assert(result["nodes_processed"] < 40)
+            assert(path[0] == "Page_0" and path[-1] == "Page_10")
+            assert(all(b in pages[a]["links"] for a, b in zip(path, path[1:])))
+            assert(not os.path.exists("Page_0_to_Page_10/WikiGraph_edges.csv"))
+
+            # Resumed race: the way to the target partly comes from the saved graph
+            result = create_wiki_graph.crawl(server.url("Page_0"), 40, target_page=server.url("Page_10"))
+            assert(result["target_found"])
+            assert(result["path"][0] == "Page_0" and result["path"][-1] == "Page_10")
+            assert(os.path.exists("Page_0_to_Page_10/WikiGraph_edges.csv"))
+        finally:
+            os.chdir(cwd)
+            configure_cache()
+
+
+if __name__ == '__main__':
+    test_concurrent_crawl()
+    test_failed_fetch_requeue()
+    test_redirect_crawl()
+    test_multiprocess_crawl()
+    test_target_crawl()
+    print("Tests passed, good job.")
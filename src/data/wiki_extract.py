@@ -0,0 +1,110 @@
+"""
+Streaming link / category extractor for Wikipedia article HTML.
+
+Builds no tree: a single html.parser pass that only keeps state while inside
+div#mw-content-text (article links) and div#mw-normal-catlinks (categories),
+starting at the first of those two divs and stopping once both have closed.
+It tokenizes with the same html.parser that backs BeautifulSoup(..., "html.parser"),
+so it returns the same sets as get_wiki_links / get_wiki_categories.
+"""
+
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+CONTENT_ID = "mw-content-text"
+CATLINKS_ID = "mw-normal-catlinks"
+
+# Where the first section div starts; everything before it (head, navigation) is skipped
+_SECTION_START = re.compile(r"<div\b[^>]*?\bid\s*=\s*[\"']?(?:%s|%s)" % (CONTENT_ID, CATLINKS_ID), re.IGNORECASE)
+
+
+def is_article_href(href: str) -> bool:
+    # Keep only valid Wikipedia article links
+    return href.startswith("/wiki/") and not any(x in href for x in [":", "#"])
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _WikiSectionParser(HTMLParser):
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links = set()
+        # One text buffer per <a> in the category div, in document order
+        self.cat_anchors = []
+        self.found_content = False
+        self.found_cats = False
+
+        # Open <div> count inside each section; 0 = outside / closed
+        self.content_depth = 0
+        self.cats_depth = 0
+        # Category anchors still open (nested / unclosed <a> get the text too, like get_text())
+        self.open_cat_anchors = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self.content_depth:
+                self.content_depth += 1
+            if self.cats_depth:
+                self.cats_depth += 1
+
+            div_id = dict(attrs).get("id")
+            if div_id == CONTENT_ID and not self.found_content:
+                self.found_content = True
+                self.content_depth = 1
+            elif div_id == CATLINKS_ID and not self.found_cats:
+                self.found_cats = True
+                self.cats_depth = 1
+
+        elif tag == "a":
+            if self.content_depth:
+                href = dict(attrs).get("href", None)
+                if href is not None and is_article_href(href):
+                    # Converts any relative links into absolute paths on the same host as the page
+                    self.links.add(urljoin(self.base_url, href))
+            if self.cats_depth:
+                buffer = []
+                self.cat_anchors.append(buffer)
+                self.open_cat_anchors.append(buffer)
+
+    def handle_endtag(self, tag):
+        if tag == "div":
+            if self.content_depth:
+                self.content_depth -= 1
+            if self.cats_depth:
+                self.cats_depth -= 1
+                if not self.cats_depth:
+                    self.open_cat_anchors.clear()
+
+            if self.found_content and self.found_cats and not self.content_depth and not self.cats_depth:
+                raise _StopParsing()
+
+        elif tag == "a" and self.open_cat_anchors:
+            self.open_cat_anchors.pop()
+
+    def handle_data(self, data):
+        for buffer in self.open_cat_anchors:
+            buffer.append(data)
+
+
+def extract_wiki_data(html: str, base_url: str = "https://en.wikipedia.org/") -> dict[str, set[str]]:
+    # Same result as get_wiki_links + get_wiki_categories on BeautifulSoup(html, "html.parser")
+    match = _SECTION_START.search(html)
+    start = match.start() if match else 0
+
+    parser = _WikiSectionParser(base_url)
+    try:
+        parser.feed(html[start:] if start else html)
+        parser.close()
+    except _StopParsing:
+        pass
+
+    if not parser.found_content:
+        print(f"Could not find the main content section")
+
+    # skip the "Categories" label
+    cats = {"".join(buffer) for buffer in parser.cat_anchors[1:]}
+    return {'links': parser.links, 'cats': cats}
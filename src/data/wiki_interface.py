@@ -1,35 +1,459 @@
 #Interface for wikipedia web pages
 #Uses requests and beautiful soup
 
+import threading
+import time
+from collections import deque
+
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import Retry, make_headers
+
+from canonical import canonical_url, declared_url
+from page_cache import CacheMiss, PageCache
+from rate_limiter import RateLimiter, parse_retry_after
+from wiki_extract import extract_wiki_data, is_article_href
 
 # The request needs to imitate a web browser, otherwise will get 403 Error, Client Error: Forbidden
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/122.0.0.0 Safari/537.36"
+                  "Chrome/122.0.0.0 Safari/537.36",
+    # gzip/deflate always, br (and zstd) when the brotli / zstandard packages are installed to decode them
+    **make_headers(accept_encoding=True),
 }
 
+# Fetch layer defaults, see configure_session()
+POOL_SIZE = 10
+TIMEOUT = (3.05, 15)  # (connect, read) seconds; without one a stalled socket hangs the crawl forever
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5  # sleeps 0.5s, 1s, 2s ... between retries
+# Server errors are retried inside the session; throttling responses go through the rate limiter
+# so Retry-After and the backoff hold back every thread fetching from that host, not just one
+RETRY_STATUSES = (500, 502, 504)
+THROTTLE_STATUSES = (429, 503)
+
+_session = None
+_timeout = TIMEOUT
+_max_retries = MAX_RETRIES
+_backoff_factor = BACKOFF_FACTOR
+_session_lock = threading.Lock()
+
+# Per-host token bucket / concurrency cap / AIMD rate for every network fetch, see configure_rate_limit()
+rate_limiter = RateLimiter()
+
+# Link/category extractor used by get_wiki_data, see set_extractor()
+_extractor = "stream"
+
+# Page cache settings, see configure_cache(); the cache file is opened on first use
+_cache_settings = {"enabled": True, "db_path": None, "max_bytes": None, "ttl": None, "offline": False}
+_page_cache = None
+_cache_lock = threading.Lock()
+
+# Redirects learned while the page cache is disabled (with a cache they are stored there, on disk)
+_redirects = {}
+# Redirects followed per lookup at most; MediaWiki doesn't chain them, this only guards against loops
+MAX_REDIRECT_HOPS = 5
+
+# Per-thread scratch space for the connect timing of the request in progress
+_local = threading.local()
+
+
+class FetchError(Exception):
+    # A fetch that failed for now (throttled, server error, network trouble): try the page again later
+    # instead of recording it without links
+    pass
+
+
+class _TimedConnectionMixin:
+    # Records how long TCP connect (+ TLS handshake for https) takes when the pool opens a new socket
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _local.connect_time = getattr(_local, "connect_time", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    # Keep-alive connection pool whose connections report their handshake time
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class FetchStats:
+    # Thread-safe running totals of per-request timings, plus the most recent records
+    def __init__(self, history: int = 200):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+            self.retries = 0
+            self.bytes = 0
+            self.connect_time = 0.0
+            self.ttfb_new = 0.0
+            self.ttfb_reused = 0.0
+            self.transfer_time = 0.0
+            self.total_time = 0.0
+            self.recent.clear()
+
+    def record(self, timing: dict):
+        with self._lock:
+            self.requests += 1
+            self.retries += timing["retries"]
+            self.bytes += timing["bytes"]
+            self.transfer_time += timing["transfer"]
+            self.total_time += timing["total"]
+            if timing["connect"] > 0:
+                self.new_connections += 1
+                self.connect_time += timing["connect"]
+                self.ttfb_new += timing["ttfb"]
+            else:
+                self.ttfb_reused += timing["ttfb"]
+            self.recent.append(timing)
+
+    def summary(self) -> dict:
+        with self._lock:
+            reused = self.requests - self.new_connections
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "retries": self.retries,
+                "bytes": self.bytes,
+                "avg_connect": self.connect_time / self.new_connections if self.new_connections else 0.0,
+                # Time to first byte on fresh vs pooled sockets; the gap is what keep-alive saves per request
+                "avg_ttfb_new": self.ttfb_new / self.new_connections if self.new_connections else 0.0,
+                "avg_ttfb_reused": self.ttfb_reused / reused if reused else 0.0,
+                "avg_transfer": self.transfer_time / self.requests if self.requests else 0.0,
+                "avg_total": self.total_time / self.requests if self.requests else 0.0,
+            }
+
+
+fetch_stats = FetchStats()
+
+
+class LinkStats:
+    # How many extracted outlinks were another spelling of a page (or a known redirect to it) and
+    # got folded into its canonical URL, plus how many redirects the fetches have taught us
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.links = 0
+            self.rewritten = 0
+            self.redirects_learned = 0
+
+    def record_links(self, links: int, rewritten: int):
+        with self._lock:
+            self.links += links
+            self.rewritten += rewritten
+
+    def record_redirect(self):
+        with self._lock:
+            self.redirects_learned += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "links": self.links,
+                "links_rewritten": self.rewritten,
+                "redirects_learned": self.redirects_learned,
+            }
+
+
+link_stats = LinkStats()
+
+
+def _build_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        # 429/503 (with or without Retry-After) are left to fetch_page and the rate limiter
+        respect_retry_after_header=False,
+        # Hand the final 5xx back so raise_for_status() reports it
+        raise_on_status=False,
+    )
+    adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_session(
+    pool_size: int = POOL_SIZE,
+    timeout: tuple[float, float] = TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    backoff_factor: float = BACKOFF_FACTOR,
+) -> requests.Session:
+    """(Re)build the shared keep-alive session used by get_wiki_data."""
+    global _session, _timeout, _max_retries, _backoff_factor
+
+    session = _build_session(pool_size, max_retries, backoff_factor)
+    with _session_lock:
+        old, _session, _timeout = _session, session, timeout
+        _max_retries, _backoff_factor = max_retries, backoff_factor
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(POOL_SIZE, MAX_RETRIES, BACKOFF_FACTOR)
+    return _session
+
+
+def configure_rate_limit(enabled: bool = True, **settings) -> RateLimiter:
+    """
+    Replace the fetch rate limiter; settings are HostLimiter's (rate, burst, max_concurrency,
+    min_rate, max_rate, increase, decrease). enabled=False sends requests unthrottled but still counts them.
+    """
+    global rate_limiter
+
+    rate_limiter = RateLimiter(enabled=enabled, **settings)
+    return rate_limiter
+
+
+def fetch_page(url: str) -> requests.Response:
+    """
+    GET a page through the pooled session and record connect / first byte / transfer timings.
+    Every attempt waits for the host's rate limiter; 429/503 responses are retried (up to the
+    session's max_retries) once the host's Retry-After or backoff has passed.
+    """
+    session = get_session()
+    host = urlsplit(url).netloc
+    limiter = rate_limiter
+    throttle_retries = 0
+
+    while True:
+        limiter.acquire(host)
+        _local.connect_time = 0.0
+        start = time.perf_counter()
+        try:
+            response = session.get(url, timeout=_timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            limiter.release(host, "error")
+            raise
+        except BaseException:
+            # Neither a success nor a sign of overload (bad URL, too many redirects, interrupt...)
+            limiter.release(host, "aborted")
+            raise
+        total = time.perf_counter() - start
+
+        if response.status_code not in THROTTLE_STATUSES:
+            limiter.release(host)
+            break
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        limiter.release(host, "throttled", retry_after)
+        if throttle_retries >= _max_retries:
+            break
+        if retry_after is None:
+            limiter.block(host, _backoff_factor * (2 ** throttle_retries))
+        throttle_retries += 1
+        limiter.count_retry()
+
+    # response.elapsed stops once headers are parsed; the body is read after that
+    ttfb = response.elapsed.total_seconds()
+    retries = response.raw.retries
+    fetch_stats.record({
+        "url": url,
+        "status": response.status_code,
+        "connect": _local.connect_time,
+        "ttfb": ttfb,
+        "transfer": max(total - ttfb, 0.0),
+        "total": total,
+        "bytes": len(response.content),
+        "retries": throttle_retries + (len(retries.history) if retries is not None else 0),
+    })
+    return response
+
+
+def configure_cache(
+    enabled: bool = True,
+    db_path: str = None,
+    max_bytes: int = None,
+    ttl: float = None,
+    offline: bool = False,
+):
+    """Point get_wiki_data at a page cache (None values keep the page_cache defaults)."""
+    global _page_cache
+
+    with _cache_lock:
+        if _page_cache is not None:
+            _page_cache.close_conn()
+            _page_cache = None
+        _cache_settings.update(enabled=enabled, db_path=db_path, max_bytes=max_bytes, ttl=ttl, offline=offline)
+        _redirects.clear()
+
+
+def set_offline(offline: bool):
+    # Replay mode: serve every page from the cache and never touch the network
+    _cache_settings["offline"] = offline
+    if _page_cache is not None:
+        _page_cache.offline = offline
+
+
+def get_page_cache():
+    global _page_cache
+
+    if not _cache_settings["enabled"]:
+        return None
+    if _page_cache is None:
+        with _cache_lock:
+            if _page_cache is None:
+                kwargs = {
+                    name: _cache_settings[name]
+                    for name in ("db_path", "max_bytes", "ttl")
+                    if _cache_settings[name] is not None
+                }
+                _page_cache = PageCache(offline=_cache_settings["offline"], **kwargs)
+    return _page_cache
+
+
+def _redirect_target(url: str):
+    cache = get_page_cache()
+    if cache is not None:
+        return cache.get_redirect(url)
+    return _redirects.get(url)
+
+
+def resolve_url(url: str) -> str:
+    # Canonical URL of the page url leads to, following the redirects learned so far
+    url = canonical_url(url)
+    for _ in range(MAX_REDIRECT_HOPS):
+        target = _redirect_target(url)
+        if target is None or target == url:
+            break
+        url = target
+    return url
+
+
+def learn_redirect(url: str, target: str):
+    # Remember that url serves target's page, so the next lookup goes straight there
+    url, target = canonical_url(url), canonical_url(target)
+    if url == target or _redirect_target(url) == target:
+        return
+    cache = get_page_cache()
+    if cache is not None:
+        cache.put_redirect(url, target)
+    else:
+        with _cache_lock:
+            _redirects[url] = target
+    link_stats.record_redirect()
+
+
+def get_wiki_html(url: str) -> str:
+    # Page HTML from the cache when possible, otherwise from the network (and then cached).
+    # Known redirects are followed first; a page that turns out to live elsewhere (HTTP redirect,
+    # or a wiki redirect naming its target as canonical) is cached under, and remembered as, that URL.
+    url = resolve_url(url)
+    cache = get_page_cache()
+    if cache is not None:
+        html = cache.get(url)
+        if html is not None:
+            learn_redirect(url, declared_url(html, url))
+            return html
+        if cache.offline:
+            raise CacheMiss(f"{url} is not in the page cache (offline mode)")
+
+    response = fetch_page(url)
+    #checks the HTTP status code; if it's 200-299, it does nothing; otherwise, it raises an HTTPError
+    response.raise_for_status()
+
+    page_url = declared_url(response.text, response.url)
+    learn_redirect(url, page_url)
+    if cache is not None:
+        cache.put(page_url, response.text)
+    return response.text
+
+
+def canonical_links(links) -> set[str]:
+    # Outlinks under their canonical URLs, known redirects replaced by their targets
+    resolved = [(link, resolve_url(link)) for link in links]
+    link_stats.record_links(len(resolved), sum(1 for link, url in resolved if link != url))
+    return {url for _, url in resolved}
+
+
+def is_transient_error(exc: Exception) -> bool:
+    # Worth another try later: throttling, server errors, network trouble (not 404s or malformed URLs)
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        return status is not None and (status in THROTTLE_STATUSES or status >= 500)
+    return isinstance(exc, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    ))
+
+
 # Returns a dictionary / object, 'links' is a set of child links, 'cats' is a set of categories for the page
-def get_wiki_data(url: str) -> dict[str, set[str]]:
+# Links are canonical URLs (see canonical_links); resolve_url(url) afterwards says which page was read
+# Raises FetchError when the page couldn't be fetched for now, so the crawler can queue it again
+# timings, if given, gets the seconds spent getting the HTML ("fetch") and extracting from it ("parse")
+def get_wiki_data(url: str, timings: dict = None) -> dict[str, set[str]]:
     try:
 
-        response = requests.get(url, headers=HEADERS)
-        #checks the HTTP status code; if it's 200-299, it does nothing; otherwise, it raises an HTTPError
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, "html.parser")
+        start = time.perf_counter()
+        html = get_wiki_html(url)
+        fetched = time.perf_counter()
 
         # Page hyperlinks, Page categories
-        links = get_wiki_links(soup)
-        cats = get_wiki_categories(soup)
-        
-        return {'links': links, 'cats': cats}
+        data = EXTRACTORS[_extractor](html, url)
+        data['links'] = canonical_links(data['links'])
+        if timings is not None:
+            timings["fetch"] = fetched - start
+            timings["parse"] = time.perf_counter() - fetched
+        return data
 
-    # Couldn't get a response from webpage, return empty set
     except requests.exceptions.RequestException as e:
+        if is_transient_error(e):
+            rate_limiter.count_failure()
+            raise FetchError(f"{url}: {e}") from e
+        # The page itself is missing / the URL is bad, return empty set
+        print(f"Error fetching the page: {e}")
+        return {'links': set(), 'cats': set()}
+
+    # Offline replay of a page that was never cached
+    except CacheMiss as e:
         print(f"Error fetching the page: {e}")
         return {'links': set(), 'cats': set()}
 
@@ -46,7 +470,7 @@ def get_wiki_categories(soup: BeautifulSoup) -> set[str]:
     return set(categories)
 
 # Get a set of hyperlinks within the body section
-def get_wiki_links(soup: BeautifulSoup) -> set[str]:
+def get_wiki_links(soup: BeautifulSoup, base_url: str = "https://en.wikipedia.org/") -> set[str]:
 
     # Limit search to content section
     content_div = soup.find("div", id="mw-content-text")
@@ -62,13 +486,34 @@ def get_wiki_links(soup: BeautifulSoup) -> set[str]:
         href = a_tag["href"]
         
         # Keep only valid Wikipedia article links
-        if href.startswith("/wiki/") and not any(x in href for x in [":", "#"]):
-            # Converts any relative links into absolute paths
-            full_url = urljoin("https://en.wikipedia.org/", href)
+        if is_article_href(href):
+            # Converts any relative links into absolute paths on the same host as the page
+            full_url = urljoin(base_url, href)
             links.append(full_url)
     return set(links)
 
 
+def extract_with_soup(html: str, base_url: str = "https://en.wikipedia.org/") -> dict[str, set[str]]:
+    # Full BeautifulSoup tree, then walk it; slower reference for the streaming extractor
+    soup = BeautifulSoup(html, "html.parser")
+    return {'links': get_wiki_links(soup, base_url=base_url), 'cats': get_wiki_categories(soup)}
+
+
+# Extractor backends: html, base_url -> {'links', 'cats'}
+EXTRACTORS = {
+    "stream": extract_wiki_data,
+    "soup": extract_with_soup,
+}
+
+
+def set_extractor(name: str):
+    global _extractor
+
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of {sorted(EXTRACTORS)}")
+    _extractor = name
+
+
 def test_get_wiki_data():
     print("test_get_wiki_links")
 
@@ -94,6 +539,176 @@ def test_get_wiki_data():
     assert(get_wiki_data("testing invalid url, this should be an error message") == {'links': set(), 'cats': set()})
 
 
+def test_session_pooling():
+    from stub_wiki_server import StubWikiServer, make_test_pages
+    print("test_session_pooling")
+
+    configure_cache(enabled=False)
+    with StubWikiServer(make_test_pages(10), failures={"Page_3": 2}) as server:
+        configure_session(pool_size=2, backoff_factor=0)
+        fetch_stats.reset()
+
+        for i in range(3):
+            wiki_data = get_wiki_data(server.url(f"Page_{i}"))
+            assert(server.url(f"Page_{i + 1}") in wiki_data['links'])
+            assert(f"Group {i % 3}" in wiki_data['cats'])
+
+        # One handshake, then the pooled keep-alive connection is reused
+        stats = fetch_stats.summary()
+        assert(stats['requests'] == 3)
+        assert(stats['new_connections'] == 1)
+        assert(stats['reused_connections'] == 2)
+
+        # Transient 503s are retried by fetch_page once the host's rate limiter lets a request through
+        assert(get_wiki_data(server.url("Page_3"))['links'])
+        assert(fetch_stats.recent[-1]['retries'] == 2)
+
+        # Retries exhausted -> FetchError, so the crawler queues the page again instead of recording a dead end
+        configure_session(max_retries=1, backoff_factor=0)
+        server.failures["Page_4"] = 5
+        try:
+            get_wiki_data(server.url("Page_4"))
+            assert(False)
+        except FetchError:
+            pass
+        # Missing pages are still just empty
+        assert(get_wiki_data(server.url("No_such_page")) == {'links': set(), 'cats': set()})
+
+    configure_session()
+    configure_cache()
+
+
+def test_rate_limited_fetch():
+    from stub_wiki_server import StubWikiServer, make_test_pages
+    print("test_rate_limited_fetch")
+
+    configure_cache(enabled=False)
+    configure_session(backoff_factor=0)
+    limiter = configure_rate_limit(rate=10.0, burst=2)
+    with StubWikiServer(make_test_pages(10), failures={"Page_1": 1}, retry_after=1) as server:
+        # The 429 blocks the host for Retry-After, then the page comes through
+        start = time.perf_counter()
+        assert(get_wiki_data(server.url("Page_1"))['links'])
+        assert(time.perf_counter() - start >= 0.9)
+
+        # ... and the rate was cut for everyone fetching from that host
+        stats = limiter.stats()
+        assert(stats['throttled'] == 1 and stats['retried'] == 1)
+        assert(stats['rates'][f"127.0.0.1:{server.port}"] < 10.0)
+
+        # Token bucket: 2 at once, then about 1 every 1/rate seconds
+        start = time.perf_counter()
+        for i in range(6):
+            get_wiki_data(server.url(f"Page_{i}"))
+        assert(time.perf_counter() - start >= 0.3)
+
+    configure_rate_limit()
+    configure_session()
+    configure_cache()
+
+
+def test_offline_replay():
+    import os
+    from stub_wiki_server import StubWikiServer, make_test_pages
+    print("test_offline_replay")
+
+    configure_cache(db_path="test_replay.db")
+    with StubWikiServer(make_test_pages(10)) as server:
+        online = [get_wiki_data(server.url(f"Page_{i}")) for i in range(3)]
+        assert(server.request_count == 3)
+        # Second read comes from the cache
+        assert(get_wiki_data(server.url("Page_0")) == online[0])
+        assert(server.request_count == 3)
+        urls = [server.url(f"Page_{i}") for i in range(4)]
+
+    # Server is gone; the cached pages replay, anything else is an empty result
+    set_offline(True)
+    assert([get_wiki_data(url) for url in urls[:3]] == online)
+    assert(get_wiki_data(urls[3]) == {'links': set(), 'cats': set()})
+    assert(get_page_cache().stats()['hits'] == 4)
+    set_offline(False)
+
+    configure_cache()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_replay.db" + suffix):
+            os.remove("test_replay.db" + suffix)
+
+
+def test_redirects():
+    import os
+    from stub_wiki_server import StubWikiServer, make_test_pages
+    print("test_redirects")
+
+    pages = make_test_pages(10)
+    # Another spelling of Page_2 and a redirect to Page_1
+    pages["Page_0"]["links"] += ["page_2", "Page%5F2", "Alias"]
+    configure_cache(db_path="test_redirects.db")
+    link_stats.reset()
+    with StubWikiServer(pages, redirects={"Alias": "Page_1"}) as server:
+        data = get_wiki_data(server.url("Page_0"))
+        assert(server.url("page_2") not in data['links'] and server.url("Alias") in data['links'])
+        assert(link_stats.summary()['links_rewritten'] == 2)
+
+        # The redirect serves Page_1, which names itself as canonical: from now on Alias is Page_1
+        alias = get_wiki_data(server.url("Alias"))
+        assert(resolve_url(server.url("alias#History")) == server.url("Page_1"))
+        assert(server.url("Page_2") in alias['links'])
+        assert(link_stats.summary()['redirects_learned'] == 1)
+
+        # ... so Page_1 is served from the cache, and links to Alias point at it
+        assert(get_wiki_data(server.url("Page_1")) == alias)
+        assert(server.request_count == 2)
+        data = get_wiki_data(server.url("Page_0"))
+        assert(server.url("Page_1") in data['links'] and server.url("Alias") not in data['links'])
+
+    # Redirects are kept with the page cache
+    configure_cache(db_path="test_redirects.db", offline=True)
+    assert(resolve_url(server.url("Alias")) == server.url("Page_1"))
+    assert(get_wiki_data(server.url("Alias")) == alias)
+
+    configure_cache()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_redirects.db" + suffix):
+            os.remove("test_redirects.db" + suffix)
+
+
+def test_extractor_parity():
+    import glob
+    import gzip
+    import os
+    print("test_extractor_parity")
+
+    fixtures = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html", "*.html.gz"))
+    assert(fixtures)
+
+    for path in fixtures:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            html = f.read()
+        results = [extractor(html, "https://en.wikipedia.org/wiki/X") for extractor in EXTRACTORS.values()]
+        assert(results[0]['links'] and results[0]['cats'])
+        assert(all(result == results[0] for result in results[1:]))
+
+    # Edge cases: nested label markup, entities, a catlinks div that never closes
+    html = (
+        '<div id="mw-content-text"><a href="/wiki/A">A</a><a href="/wiki/B#x">B</a><a>no href</a>'
+        '<div><a href="/wiki/Help:C">C</a></div><a href="/wiki/D?x=1">D</a></div>'
+        '<a href="/wiki/Outside">outside</a>'
+        '<div id="mw-normal-catlinks"><a href="/wiki/Help:Category">Categories</a>: '
+        '<a href="/wiki/Category:X"><span>Rock &amp; roll</span> music</a><a href="/wiki/Category:Y">Y'
+    )
+    results = [extractor(html, "https://en.wikipedia.org/wiki/X") for extractor in EXTRACTORS.values()]
+    assert(results[0] == {
+        'links': {"https://en.wikipedia.org/wiki/A", "https://en.wikipedia.org/wiki/D?x=1"},
+        'cats': {"Rock & roll music", "Y"},
+    })
+    assert(all(result == results[0] for result in results[1:]))
+
+
 if __name__ == '__main__':
+    test_extractor_parity()
+    test_session_pooling()
+    test_rate_limited_fetch()
+    test_offline_replay()
+    test_redirects()
     test_get_wiki_data()
     print("Tests passed, good job.")
\ No newline at end of file